@@ -18,68 +18,23 @@ from __future__ import annotations
 
 from ply import lex
 
-from austro.shared import AustroException
-
-
-instructions = (
-    "ADD",
-    "AND",
-    "CMP",
-    "DEC",
-    "DIV",
-    "HALT",
-    "ICMP",
-    "IDIV",
-    "IMOD",
-    "IMUL",
-    "INC",
-    "JE",
-    "JGE",
-    "JGT",
-    "JLE",
-    "JLT",
-    "JMP",
-    "JN",
-    "JNE",
-    "JNZ",
-    "JP",
-    "JT",
-    "JV",
-    "JZ",
-    "MOD",
-    "MOV",
-    "MUL",
-    "NOP",
-    "NOT",
-    "OR",
-    "SHL",
-    "SHR",
-    "SUB",
-    "XOR",
-    "SEG",
+from austro.asm.scanner import (
+    LexerException,
+    get_base,
+    instructions,
+    number,
+    reference,
+    tokens,
 )
-tokens = ("LABEL", "OPCODE", "NAME", "REFERENCE", "NUMBER", "COMMA", "COMMENT")
+
+
+__all__ = ["LexerException", "get_base", "get_lexer", "instructions", "tokens"]
 
 t_ignore = " \t"
 t_ignore_COMMENT = r"\#.*"
 t_COMMA = ","
 
 
-def get_base(t_name: str) -> int:
-    if t_name.startswith("0b"):
-        return 2
-    elif t_name.startswith("0x"):
-        return 16
-    elif t_name.startswith("0"):
-        return 8
-    else:
-        return 10
-
-
-number = r"(0b[01]+|0[0-7]+|0o[0-7]+|0x[0-9a-fA-F]+|-?\d+)"
-reference = r"\[\s*" + number + r"\s*\]"
-
-
 def t_newline(t):
     r"\r\n|\n"  # no support to only \r
     t.lexer.lineno += 1
@@ -113,13 +68,9 @@ def t_NUMBER(t):
 
 def t_error(t):
     raise LexerException(
-        "Scanning error. Illegal character '%s' at line %d" % (t.value[0], t.lineno)
+        "Scanning error. Illegal character '%s' at line %d" % (t.value[0], t.lineno), t.lineno
     )
 
 
 def get_lexer() -> lex.Lexer:
     return lex.lex()
-
-
-class LexerException(AustroException):
-    pass
@@ -19,10 +19,20 @@
 # NOTE: This was intended to be a parser, but isn't due to lack of knowledge.
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Mapping, Sequence, TypedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    TypedDict,
+)
 
-from austro.asm.asm_lexer import get_lexer
 from austro.asm.memword import DWord, IWord
+from austro.asm.scanner import Scanner
+from austro.asm.sourcemap import SourceMap
 from austro.shared import AustroException
 
 
@@ -30,6 +40,13 @@ if TYPE_CHECKING:
     from austro.asm.memword import Word
 
 
+# Number of words in each chunk given by iter_assemble
+CHUNK_SIZE = 256
+
+# Lexers to scan the code: the regex scanner, or the original PLY lexer
+LEXERS = ("regex", "ply")
+DEFAULT_LEXER = "regex"
+
 # fmt: off
 OPCODES = {
     # Control Unit instructions
@@ -261,7 +278,7 @@ def memory_words(opcode, op1=None, op2=None):
     raise AssembleException(f"Unknown error while encoding '{opname}'", opcode.lineno)
 
 
-def assemble(code: str) -> AssembleResult:
+def assemble(code: str, lexer: str = DEFAULT_LEXER) -> AssembleResult:
     """Analyzes assembly code and returns a dict of labels and memory words
 
     The returned dict is in the following format:
@@ -286,20 +303,63 @@ def assemble(code: str) -> AssembleResult:
 
     The Word object (instruction) carry lineno attribute that is the associated
     line number in assembly file.
-    """
-    lexer = get_lexer()
-    lexer.input(code)
 
-    # Structures to store labels and memory words
+    The 'sourcemap' key is a SourceMap to look up the line of an address and
+    the addresses of a line.
+    """
     labels: dict[str, int] = {}
     words: list[Word] = []
 
+    for address, chunk in iter_assemble(code, labels=labels, lexer=lexer):
+        words[address : address + len(chunk)] = chunk
+
+    return {
+        "labels": labels,
+        "words": words,
+        "sourcemap": SourceMap.from_words(words, labels),
+    }
+
+
+def iter_assemble(
+    source: str | Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    labels: None | dict[str, int] = None,
+    lexer: str = DEFAULT_LEXER,
+) -> Iterator[Chunk]:
+    """Assemble the code incrementally, yielding chunks of memory words
+
+    The source can be a string, a file object or any iterable of lines, which is read only as
+    far as needed. Words are yielded in chunks of about `chunk_size` words, in address order.
+
+    A jump to a label defined later has its address patched once the label is found. If the
+    jump was already yielded, a chunk with only the patched word is yielded for its address,
+    so the words of all chunks written in order to memory give the complete program. Only
+    the jumps still missing a label are kept until the end.
+
+    If given, `labels` is filled with the address of each label as they are found.
+
+    The `lexer` is one of `LEXERS`, both giving the same tokens.
+    """
+    if labels is None:
+        labels = {}
+
+    # A string is scanned at once
+    tokens = _tokens([source] if isinstance(source, str) else source, lexer)
+
+    def next_token() -> Any:
+        return next(tokens, None)
+
+    # Words not yielded yet, starting at address `base`
+    buffer: list[Word] = []
+    base = 0
+
     # Keep track of declared or used labels
-    pend_labels: list[Word] = []
-    miss_labels: dict[str, list[Word]] = {}
+    pend_labels: list[Any] = []
+    miss_labels: dict[str, list[tuple[int, Word]]] = {}
 
-    def verify_pending_labels():
+    def verify_pending_labels() -> list[Chunk]:
         # Verify if has any label pending an address
+        fixups = []
         while pend_labels:
             lbl = pend_labels.pop()
             if lbl.value in labels:
@@ -307,36 +367,42 @@ def assemble(code: str) -> AssembleResult:
                     f"Error: symbol '{lbl.value}' is already defined", lbl.lineno
                 )
             # Point the label to the next word pending attribution
-            position = len(words)
+            position = base + len(buffer)
             labels[lbl.value] = position
             # Verify if there was any jump instruction missing this label
-            mlbls = miss_labels.get(lbl.value)
-            if mlbls:
-                for mlb in mlbls:
-                    mlb.operand = position
-                del miss_labels[lbl.value]
+            for address, mlb in miss_labels.pop(lbl.value, ()):
+                mlb.operand = position
+                # Jump already yielded, yield it again
+                if address < base:
+                    fixups.append(Chunk(address, [mlb]))
+        return fixups
 
     opcode = None
-    tok = lexer.token()
+    tok = next_token()
     while tok:
+        if len(buffer) >= chunk_size:
+            yield Chunk(base, buffer)
+            base += len(buffer)
+            buffer = []
+
         if tok.type == "LABEL":
             pend_labels.append(tok)
 
         elif tok.type == "OPCODE":
-            verify_pending_labels()
+            yield from verify_pending_labels()
 
             # Store opcode
             opcode = tok
 
             # Get first operator if available
-            tok = lexer.token()
+            tok = next_token()
             if not tok or tok.lineno != opcode.lineno:
-                words.extend(memory_words(opcode))  # non-arg opcode
+                buffer.extend(memory_words(opcode))  # non-arg opcode
                 continue
             op1 = tok
 
             # Comma
-            tok = lexer.token()
+            tok = next_token()
             if not tok or tok.lineno != opcode.lineno:
                 # If instruction is a jump, replace labels by it address
                 jumps = (
@@ -365,44 +431,71 @@ def assemble(code: str) -> AssembleResult:
                         else:
                             op1.value = labels[op1.value]
 
-                words.extend(memory_words(opcode, op1))  # 1-arg opcode
+                buffer.extend(memory_words(opcode, op1))  # 1-arg opcode
                 if no_label:
                     if lbl_name not in miss_labels:
                         miss_labels[lbl_name] = []
-                    miss_labels[lbl_name].append(words[-1])
+                    miss_labels[lbl_name].append((base + len(buffer) - 1, buffer[-1]))
                 continue
             if tok.type != "COMMA":
                 raise AssembleException("Invalid token '%s'" % tok.value, tok.lineno)
 
             # Get second operator if available
-            tok = lexer.token()
+            tok = next_token()
             if not tok or tok.lineno != opcode.lineno:
                 raise AssembleException("Invalid syntax", opcode.lineno)
             op2 = tok
 
-            words.extend(memory_words(opcode, op1, op2))  # 2-arg opcode
+            buffer.extend(memory_words(opcode, op1, op2))  # 2-arg opcode
 
         # At start of line, only labels and opcodes are allowed
         else:
             raise AssembleException("Invalid token '%s'" % tok.value, tok.lineno)
 
-        tok = lexer.token()
+        tok = next_token()
 
     # Add any pending label to labels dict
-    verify_pending_labels()
+    yield from verify_pending_labels()
 
     # Interrupt assembling if has any jump missing label
-    for mlb in miss_labels.items():
-        raise AssembleException("Invalid label '%s'" % mlb[0], mlb[1][0].lineno)
+    for name, missing in miss_labels.items():
+        raise AssembleException("Invalid label '%s'" % name, missing[0][1].lineno)
+
+    if buffer:
+        yield Chunk(base, buffer)
+
+
+def _tokens(lines: Iterable[str], kind: str) -> Iterator[Any]:
+    # Tokens of the lines, scanned one line at a time
+    lexer: Any
+    if kind == "regex":
+        lexer = Scanner()
+    elif kind == "ply":
+        # PLY is imported only when used
+        from austro.asm.asm_lexer import get_lexer
+
+        lexer = get_lexer()
+    else:
+        raise ValueError(f"Unknown lexer '{kind}'")
+
+    for line in lines:
+        # Line numbers are counted by newlines, missing from lines split by str.splitlines()
+        lexer.input(line if line.endswith("\n") else line + "\n")
+        yield from lexer
+
 
-    return {"labels": labels, "words": words}
+class Chunk(NamedTuple):
+    address: int  # address of the first word
+    words: list[Word]
 
 
 class AssembleResult(TypedDict):
     labels: Mapping[str, int]
     words: Sequence[Word]
+    sourcemap: SourceMap
 
 
 class AssembleException(AustroException):
     def __init__(self, message, lineno):
         super().__init__(message + " at line %d" % lineno)
+        self.lineno = lineno
@@ -0,0 +1,298 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Assemble many source files in parallel"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from austro.asm.assembler import AssembleException, assemble
+from austro.asm.scanner import LexerException
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+
+# Pattern of the source files searched in directories
+SOURCE_PATTERN = "*.asm"
+# Default file to remember the results of unchanged files
+CACHE_FILE = ".austrosim-cache.json"
+
+
+class FileError(NamedTuple):
+    lineno: int  # 0 if unknown
+    message: str
+
+
+@dataclass
+class FileResult:
+    path: str
+    digest: str  # SHA-256 of the contents
+    mtime_ns: int
+    size: int
+    image: None | str = None  # binary image written
+    words: int = 0
+    errors: list[FileError] = field(default_factory=list)
+    seconds: float = 0.0
+    cached: bool = False  # result of a previous run, the file is unchanged
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def assemble_file(path: str, image: None | str = None) -> FileResult:
+    """Assemble a file, writing its binary image if requested
+
+    The image has the 16-bit words in little-endian order, and its source map is written next to
+    it with a ".map" suffix. Errors are returned in the result, also of files that can't be read
+    or written.
+    """
+    start = perf_counter()
+
+    source = Path(path)
+    try:
+        data = source.read_bytes()
+        stat = source.stat()
+    except OSError as e:
+        result = _unreadable(path, e)
+        result.seconds = perf_counter() - start
+        return result
+    result = FileResult(path, hashlib.sha256(data).hexdigest(), stat.st_mtime_ns, stat.st_size)
+
+    try:
+        asmd = assemble(data.decode())
+    except (AssembleException, LexerException) as e:
+        result.errors.append(FileError(e.lineno, e.message))
+    except UnicodeDecodeError as e:
+        result.errors.append(FileError(0, f"Invalid text encoding ({e.reason})"))
+    else:
+        words = asmd["words"]
+        result.words = len(words)
+        if image is not None:
+            values = array("H", [word.value for word in words])
+            if sys.byteorder == "big":
+                values.byteswap()
+            try:
+                Path(image).parent.mkdir(parents=True, exist_ok=True)
+                Path(image).write_bytes(values.tobytes())
+                asmd["sourcemap"].save(Path(image).with_suffix(".map"))
+            except OSError as e:
+                result.errors.append(FileError(0, f"Can't write {image} ({e.strerror})"))
+            else:
+                result.image = image
+
+    result.seconds = perf_counter() - start
+    return result
+
+
+def find_sources(paths: Iterable[str | Path], pattern: str = SOURCE_PATTERN) -> list[Path]:
+    """Expand directories to the source files found in them"""
+    sources = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            sources.extend(sorted(p for p in path.rglob(pattern) if p.is_file()))
+        else:
+            sources.append(path)
+    return sources
+
+
+def assemble_files(
+    paths: Iterable[str | Path],
+    output: None | str | Path = None,
+    jobs: None | int = None,
+    cache: None | str | Path = None,
+) -> list[FileResult]:
+    """Assemble the files (or the sources in directories) across a process pool
+
+    With `output`, the binary image of each file is written there, in the same relative path
+    with a ".bin" suffix. With `cache`, the results are saved to that file and a file not
+    changed since then (same modification time and size, or else same contents) is not
+    assembled again.
+    """
+    sources = find_sources(paths)
+    roots = [Path(p) for p in paths if Path(p).is_dir()]
+
+    previous = _load_cache(cache) if cache is not None else {}
+
+    results: dict[int, FileResult] = {}
+    pending: list[tuple[int, str, None | str]] = []
+    for index, source in enumerate(sources):
+        image = None if output is None else str(_image_path(source, roots, Path(output)))
+        result = _cached(source, image, previous.get(str(source)))
+        if result is not None:
+            results[index] = result
+        else:
+            pending.append((index, str(source), image))
+
+    if pending:
+        if jobs == 1 or len(pending) == 1:
+            done = [assemble_file(path, image) for _, path, image in pending]
+        else:
+            workers = jobs or os.process_cpu_count() or 1
+            # A few tasks per worker, to balance without sending each file alone
+            chunksize = max(1, len(pending) // (4 * workers))
+            with ProcessPoolExecutor(workers) as executor:
+                done = list(
+                    executor.map(
+                        assemble_file,
+                        [path for _, path, _ in pending],
+                        [image for _, _, image in pending],
+                        chunksize=chunksize,
+                    )
+                )
+        for (index, _, _), result in zip(pending, done):
+            results[index] = result
+
+    ordered = [results[index] for index in range(len(sources))]
+    if cache is not None:
+        _save_cache(cache, previous, ordered)
+    return ordered
+
+
+def _image_path(source: Path, roots: Sequence[Path], output: Path) -> Path:
+    # Keep the path relative to the directory given, if any
+    for root in roots:
+        if source.is_relative_to(root):
+            return output / source.relative_to(root).with_suffix(".bin")
+    return output / source.with_suffix(".bin").name
+
+
+def _cached(source: Path, image: None | str, entry: None | dict) -> None | FileResult:
+    # Result of a previous run, if the file and its image are unchanged
+    if entry is None or entry.get("image") != image:
+        return None
+    if image is not None and not (
+        Path(image).exists() and Path(image).with_suffix(".map").exists()
+    ):
+        return None
+
+    try:
+        stat = source.stat()
+    except OSError:
+        return None
+    if stat.st_size != entry["size"]:
+        return None
+    if stat.st_mtime_ns != entry["mtime_ns"]:
+        # Touched, but maybe not changed
+        try:
+            data = source.read_bytes()
+        except OSError as e:
+            return _unreadable(str(source), e)
+        if hashlib.sha256(data).hexdigest() != entry["digest"]:
+            return None
+
+    errors = [FileError(*error) for error in entry["errors"]]
+    return FileResult(
+        **{**entry, "mtime_ns": stat.st_mtime_ns, "errors": errors, "cached": True}
+    )
+
+
+def _unreadable(path: str, error: OSError) -> FileResult:
+    # Result of a file that can't be read
+    return FileResult(path, "", 0, 0, errors=[FileError(0, f"Can't read ({error.strerror})")])
+
+
+def _load_cache(cache: str | Path) -> dict[str, dict]:
+    try:
+        with open(cache) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(
+    cache: str | Path, previous: dict[str, dict], results: list[FileResult]
+) -> None:
+    entries = dict(previous)
+    for result in results:
+        entries[result.path] = {**asdict(result), "cached": False}
+    with open(cache, "w") as f:
+        json.dump(entries, f)
+
+
+def _positive(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"not a positive integer: '{value}'")
+    return number
+
+
+def main(argv: None | Sequence[str] = None) -> int:
+    """Command line of `austrosim asm`"""
+    parser = argparse.ArgumentParser(
+        prog="austrosim asm", description="Assemble source files in parallel."
+    )
+    parser.add_argument("paths", nargs="+", help="source files or directories of *.asm files")
+    parser.add_argument("-o", "--output", help="directory to write the binary images")
+    parser.add_argument("--json", help="file to write a JSON summary, '-' for stdout")
+    parser.add_argument("-j", "--jobs", type=_positive, help="number of processes")
+    parser.add_argument(
+        "--cache",
+        default=CACHE_FILE,
+        help=f"file of results to skip unchanged files ({CACHE_FILE})",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="assemble every file")
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    results = assemble_files(
+        args.paths, args.output, args.jobs, None if args.no_cache else args.cache
+    )
+    seconds = perf_counter() - start
+
+    failed = [result for result in results if not result.ok]
+    if args.json is not None:
+        summary = {
+            "files": [asdict(result) for result in results],
+            "failed": len(failed),
+            "seconds": seconds,
+        }
+        if args.json == "-":
+            json.dump(summary, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as f:
+                json.dump(summary, f, indent=2)
+
+    if args.json != "-":
+        for result in results:
+            status = "cached" if result.cached else f"{result.seconds * 1000:.1f} ms"
+            if result.ok:
+                print(f"{result.path}: {result.words} words ({status})")
+            # Messages of errors in a line already end with the line number
+            for _, message in result.errors:
+                print(f"{result.path}: {message}")
+        print(f"{len(results)} files, {len(failed)} failed in {seconds:.2f} s")
+
+    return 1 if failed else 0
@@ -117,7 +117,7 @@ class Word(BaseData, metaclass=_MetaWord):
         if self.is_instruction:
             return f"IWord({self.opcode}, {self.flags}, {self.operand}, lineno={self.lineno})"
         else:
-            return f"DWord({self._value.value})"
+            return f"DWord({self.value})"
 
 
 class IWord(Word):
@@ -0,0 +1,175 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Single-pass assembly scanner, with the same tokens of the PLY lexer"""
+
+from __future__ import annotations
+
+import re
+
+from typing import TYPE_CHECKING
+
+from austro.shared import AustroException
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+instructions = (
+    "ADD",
+    "AND",
+    "CMP",
+    "DEC",
+    "DIV",
+    "HALT",
+    "ICMP",
+    "IDIV",
+    "IMOD",
+    "IMUL",
+    "INC",
+    "JE",
+    "JGE",
+    "JGT",
+    "JLE",
+    "JLT",
+    "JMP",
+    "JN",
+    "JNE",
+    "JNZ",
+    "JP",
+    "JT",
+    "JV",
+    "JZ",
+    "MOD",
+    "MOV",
+    "MUL",
+    "NOP",
+    "NOT",
+    "OR",
+    "SHL",
+    "SHR",
+    "SUB",
+    "XOR",
+    "SEG",
+)
+tokens = ("LABEL", "OPCODE", "NAME", "REFERENCE", "NUMBER", "COMMA", "COMMENT")
+
+
+def get_base(t_name: str) -> int:
+    if t_name.startswith("0b"):
+        return 2
+    elif t_name.startswith("0x"):
+        return 16
+    elif t_name.startswith("0"):
+        return 8
+    else:
+        return 10
+
+
+number = r"(0b[01]+|0[0-7]+|0o[0-7]+|0x[0-9a-fA-F]+|-?\d+)"
+reference = r"\[\s*" + number + r"\s*\]"
+
+# Rules in the order tried by the PLY lexer: function rules in definition order, then string
+# rules by decreasing length. Any other character is an error. Ignored characters are skipped
+# before any rule, and a comment is taken along with the end of its line.
+_RULES = (
+    ("newline", r"(?:\#.*)?(?:\r\n|\n)"),
+    ("LABEL", r"[a-zA-Z_.][a-zA-Z0-9_.]*\s*:"),
+    ("REFERENCE", reference),
+    ("NAME", r"[a-zA-Z_][a-zA-Z0-9_]*"),
+    ("NUMBER", number),
+    ("COMMENT", r"\#.*"),
+    ("COMMA", r","),
+    ("error", r"[^ \t\n]"),
+)
+_MASTER = re.compile(
+    r"[ \t]*(?:" + "|".join(f"(?P<{name}>{rule})" for name, rule in _RULES) + ")", re.VERBOSE
+)
+_INSTRUCTIONS = frozenset(instructions)
+
+
+class Token:
+    """Token with the same attributes of a PLY LexToken"""
+
+    __slots__ = ("lexpos", "lineno", "type", "value")
+
+    def __init__(self, type: str, value: str | int, lineno: int, lexpos: int) -> None:
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self) -> str:
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+class Scanner:
+    """Assembly scanner matching one combined regex over the input
+
+    It has the interface of the PLY lexer used by the assembler: `input()`, then `token()`
+    until None or iteration. As in PLY, the line number is kept between inputs.
+    """
+
+    def __init__(self) -> None:
+        self.lineno = 1
+        self._tokens: Iterator[Token] = iter(())
+
+    def input(self, data: str) -> None:
+        self._tokens = self._scan(data)
+
+    def token(self) -> None | Token:
+        return next(self._tokens, None)
+
+    def __iter__(self) -> Iterator[Token]:
+        return self._tokens
+
+    def _scan(self, data: str) -> Iterator[Token]:
+        for match in _MASTER.finditer(data):
+            kind = match.lastgroup
+            assert kind is not None
+            if kind == "newline":
+                self.lineno += 1
+                continue
+            if kind == "COMMENT":
+                continue
+
+            text = match.group(kind)
+            value: str | int = text
+            if kind == "NAME":
+                if text.upper() in _INSTRUCTIONS:
+                    kind = "OPCODE"
+            elif kind == "NUMBER":
+                value = int(text, get_base(text))
+            elif kind == "REFERENCE":
+                text = text.strip(" \t[]")
+                value = int(text, get_base(text))
+            elif kind == "LABEL":
+                value = text.rstrip(" \t:")
+            elif kind == "error":
+                raise LexerException(
+                    "Scanning error. Illegal character '%s' at line %d" % (text, self.lineno),
+                    self.lineno,
+                )
+
+            yield Token(kind, value, self.lineno, match.start(match.lastindex or 0))
+
+
+class LexerException(AustroException):
+    def __init__(self, message: str, lineno: int = 0) -> None:
+        super().__init__(message)
+        self.lineno = lineno
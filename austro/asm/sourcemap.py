@@ -0,0 +1,106 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Lookup tables between memory addresses and source lines"""
+
+from __future__ import annotations
+
+import json
+
+from array import array
+from bisect import bisect_left
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from pathlib import Path
+
+    from austro.asm.memword import Word
+
+
+class SourceMap:
+    """Source line of each address, and the addresses of each line
+
+    Every word of an instruction, including its operand word, maps to the line of the
+    instruction. Line 0 means no line.
+    """
+
+    def __init__(self, lines: Iterable[int], labels: Mapping[str, int]) -> None:
+        self.lines = array("I", lines)
+        self.labels = dict(labels)
+
+        # Address ranges of each line
+        self._ranges: dict[int, list[range]] = {}
+        start = 0
+        for address in range(1, len(self.lines) + 1):
+            if address == len(self.lines) or self.lines[address] != self.lines[start]:
+                if self.lines[start]:
+                    self._ranges.setdefault(self.lines[start], []).append(range(start, address))
+                start = address
+        self._sorted_lines = sorted(self._ranges)
+
+        self._label_at = {address: name for name, address in self.labels.items()}
+
+    @classmethod
+    def from_words(cls, words: Sequence[Word], labels: Mapping[str, int]) -> SourceMap:
+        # Words not marked as instruction are operands of the preceding instruction
+        lines = []
+        lineno = 0
+        for word in words:
+            if word.is_instruction:
+                lineno = word.lineno
+            lines.append(lineno)
+        return cls(lines, labels)
+
+    def line_of(self, address: int) -> int:
+        """Line of the instruction at the address, 0 if none"""
+        if 0 <= address < len(self.lines):
+            return self.lines[address]
+        return 0
+
+    def ranges(self, line: int) -> list[range]:
+        """Address ranges of the instructions in the line"""
+        return self._ranges.get(line, [])
+
+    def addresses(self, line: int) -> list[int]:
+        """Address of each instruction in the line"""
+        return [r.start for r in self.ranges(line)]
+
+    def next_line(self, line: int) -> int:
+        """The line itself if it has instructions, or the next one with them, 0 if none"""
+        index = bisect_left(self._sorted_lines, line)
+        return self._sorted_lines[index] if index < len(self._sorted_lines) else 0
+
+    def label_at(self, address: int) -> None | str:
+        return self._label_at.get(address)
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "w") as f:
+            json.dump({"lines": self.lines.tolist(), "labels": self.labels}, f)
+
+    @classmethod
+    def load(cls, path: str | Path) -> SourceMap:
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["lines"], data["labels"])
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, SourceMap) and self.lines == o.lines and self.labels == o.labels
+
+    def __repr__(self) -> str:
+        return f"SourceMap({self.lines.tolist()}, {self.labels})"
@@ -2,12 +2,22 @@ from __future__ import annotations
 
 import sys
 
-from PyQt5.QtWidgets import QApplication
 
-from austro.ui.mainwindow import MainWindow
+def main():
+    # Command line tools, the GUI is the default
+    if sys.argv[1:2] == ["asm"]:
+        from austro.asm.batch import main as asm_main
 
+        sys.exit(asm_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["run"]:
+        from austro.simulator.runner import main as run_main
+
+        sys.exit(run_main(sys.argv[2:]))
+
+    from PyQt5.QtWidgets import QApplication
+
+    from austro.ui.mainwindow import MainWindow
 
-def main():
     app = QApplication(sys.argv)
 
     win = MainWindow(app)
@@ -0,0 +1,203 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Simulated cache between the CPU and the memory"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING
+
+from austro.simulator.cpu import CPUException, memory_accesses
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPU
+
+
+# Write policies
+WRITE_BACK = "write-back"  # writes allocate a line, written to memory when evicted
+WRITE_THROUGH = "write-through"  # writes go to memory, a missing line is not allocated
+
+# Replacement policies
+LRU = "lru"
+FIFO = "fifo"
+
+
+# Words of each instruction indexed by the high byte of its word (opcode and flags)
+_SIZES = bytes(memory_accesses(high >> 3, high & 0b111).words for high in range(256))
+
+
+@dataclass
+class CacheStats:
+    """Hits and misses of instruction fetches and data accesses"""
+
+    fetch_hits: int = 0
+    fetch_misses: int = 0
+    read_hits: int = 0
+    read_misses: int = 0
+    write_hits: int = 0
+    write_misses: int = 0
+    writebacks: int = 0  # dirty lines written to memory when evicted
+
+    @property
+    def fetch_hit_rate(self) -> float:
+        return _rate(self.fetch_hits, self.fetch_misses)
+
+    @property
+    def data_hit_rate(self) -> float:
+        return _rate(self.read_hits + self.write_hits, self.read_misses + self.write_misses)
+
+
+def _rate(hits: int, misses: int) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+class Cache:
+    """Set-associative cache of memory lines, holding only the address of each line
+
+    The cache has `size` words in lines of `line_size` words, grouped in sets of `ways` lines.
+    One way makes a direct-mapped cache and `ways=0` a fully associative one. Sizes must be
+    powers of two, so an address is split into line and set with a shift and a mask.
+
+    Each set keeps its lines in a dict ordered by insertion, the first one is evicted. With LRU
+    replacement a hit moves the line to the end, with FIFO the order is never changed.
+
+    Instruction words are accessed on fetch, both words of a two-word instruction at once, and
+    data words when an operand is read or stored. Each line filled from memory and each dirty
+    line written back costs `cache_miss` cycles of the CPU cost model. When no cache is
+    attached, the CPU pays a single `is None` test per access.
+    """
+
+    def __init__(
+        self,
+        cpu: CPU,
+        size: int = 64,
+        line_size: int = 4,
+        ways: int = 1,
+        write_policy: str = WRITE_BACK,
+        replacement: str = LRU,
+    ) -> None:
+        if size <= 0 or size & (size - 1) or line_size <= 0 or line_size & (line_size - 1):
+            raise CPUException("Error: cache size and line size must be powers of two")
+        if line_size > size:
+            raise CPUException("Error: cache line size greater than the cache size")
+        lines = size // line_size
+        if ways == 0:
+            ways = lines
+        if ways < 0 or ways & (ways - 1) or ways > lines:
+            raise CPUException(f"Error: cache ways must be a power of two up to {lines}")
+        if write_policy not in (WRITE_BACK, WRITE_THROUGH):
+            raise CPUException(f"Error: invalid cache write policy '{write_policy}'")
+        if replacement not in (LRU, FIFO):
+            raise CPUException(f"Error: invalid cache replacement '{replacement}'")
+
+        self.cpu = cpu
+        self.size = size
+        self.line_size = line_size
+        self.ways = ways
+        self.write_policy = write_policy
+        self.replacement = replacement
+        self.stats = CacheStats()
+
+        self._shift = line_size.bit_length() - 1
+        self._set_mask = lines // ways - 1
+        self._lru = replacement == LRU
+        self._write_back = write_policy == WRITE_BACK
+        self.reset()
+
+        cpu.cache = self
+
+    def detach(self) -> None:
+        self.cpu.cache = None
+
+    def reset(self) -> None:
+        """Empty the cache and forget the statistics"""
+        self._sets: list[dict[int, None]] = [{} for _ in range(self._set_mask + 1)]
+        self._dirty: set[int] = set()
+        self.stats = CacheStats()
+
+    def fetch(self, address: int, high: int) -> None:
+        """Access the words of an instruction, given the high byte of its first word"""
+        stats = self.stats
+        line = address >> self._shift
+        if self._access(line):
+            stats.fetch_hits += 1
+        else:
+            stats.fetch_misses += 1
+        if _SIZES[high] == 2:
+            line = (address + 1) >> self._shift
+            if self._access(line):
+                stats.fetch_hits += 1
+            else:
+                stats.fetch_misses += 1
+
+    def read(self, address: int) -> None:
+        if self._access(address >> self._shift):
+            self.stats.read_hits += 1
+        else:
+            self.stats.read_misses += 1
+
+    def write(self, address: int) -> None:
+        line = address >> self._shift
+        if self._write_back:
+            if self._access(line):
+                self.stats.write_hits += 1
+            else:
+                self.stats.write_misses += 1
+            self._dirty.add(line)
+        # Write-through, no write allocate: only a line already cached is touched
+        elif line in self._sets[line & self._set_mask]:
+            self._access(line)
+            self.stats.write_hits += 1
+        else:
+            self.stats.write_misses += 1
+
+    def _access(self, line: int) -> bool:
+        """Access a line, filling it on a miss, return whether it was a hit"""
+        lines = self._sets[line & self._set_mask]
+        if line in lines:
+            if self._lru:
+                del lines[line]
+                lines[line] = None
+            return True
+
+        penalty = self.cpu.cost_model.cache_miss
+        if len(lines) == self.ways:
+            victim = next(iter(lines))
+            del lines[victim]
+            if victim in self._dirty:
+                self._dirty.discard(victim)
+                self.stats.writebacks += 1
+                self.cpu.cycles += penalty
+        lines[line] = None
+        self.cpu.cycles += penalty
+        return False
+
+    def report(self) -> dict:
+        """Configuration and statistics of the cache, to be exported as JSON"""
+        stats = self.stats
+        return {
+            "size": self.size,
+            "line_size": self.line_size,
+            "ways": self.ways,
+            "write_policy": self.write_policy,
+            "replacement": self.replacement,
+            **asdict(stats),
+            "fetch_hit_rate": stats.fetch_hit_rate,
+            "data_hit_rate": stats.data_hit_rate,
+        }
@@ -0,0 +1,277 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Static control-flow graph of a loaded program"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple
+
+from austro.asm.assembler import OPCODES
+from austro.simulator.cpu import ARG_TYPES, Memory
+
+
+if TYPE_CHECKING:
+    from austro.asm.assembler import AssembleResult
+
+
+_OP_HALT = OPCODES["HALT"]
+_OP_JMP = OPCODES["JMP"]
+
+# Kinds of edges
+FALLTHROUGH = "fallthrough"
+JUMP = "jump"  # unconditional jump
+TAKEN = "taken"  # conditional jump, when the condition holds
+UNKNOWN = "unknown"  # jump to a register or to an address stored in memory
+
+
+class Edge(NamedTuple):
+    source: int  # start address of the source block
+    target: None | int  # start address of the target block, None if unknown
+    kind: str
+
+
+@dataclass(eq=False)
+class BasicBlock:
+    start: int
+    end: int  # address after the last word of the block
+    instructions: list[int]  # address of each instruction
+    successors: list[Edge] = field(default_factory=list)
+    predecessors: list[Edge] = field(default_factory=list)
+    first_line: int = 0
+    last_line: int = 0
+
+    @property
+    def last(self) -> int:
+        """Address of the last instruction, the jump instruction if the block has one"""
+        return self.instructions[-1]
+
+
+@dataclass(eq=False)
+class Loop:
+    header: int  # start address of the block entering the loop
+    blocks: frozenset[int]  # start address of every block in the loop body
+    back_edges: list[Edge]
+    first_line: int = 0
+    last_line: int = 0
+
+
+class ControlFlowGraph:
+    """Basic blocks and edges of a program, starting at address 0
+
+    Instructions are discovered by following the execution from the entry point, so data words
+    are never taken as code unless the program would execute them. Instruction words which
+    cannot be reached this way (e.g. only reached by register jumps) are added as extra roots
+    when the words carry the instruction flag set by the assembler.
+    """
+
+    def __init__(
+        self, values: tuple[int, ...], instructions: tuple[bool, ...], lines: tuple[int, ...]
+    ):
+        self.size = len(values)
+        self.blocks: dict[int, BasicBlock] = {}
+        self.edges: list[Edge] = []
+        self.back_edges: list[Edge] = []
+        self.loops: list[Loop] = []
+
+        # Block owning each instruction address
+        self._block_of: dict[int, BasicBlock] = {}
+        # Address of the jumps closing a loop
+        self._back_jumps: set[int] = set()
+
+        self._build_blocks(values, instructions, lines)
+        self._find_loops()
+
+    def block_at(self, address: int) -> None | BasicBlock:
+        """Return the block containing the instruction at the address"""
+        return self._block_of.get(address)
+
+    def is_back_edge_source(self, address: int) -> bool:
+        """Whether the instruction at the address is a jump closing a loop"""
+        return address in self._back_jumps
+
+    def _build_blocks(
+        self, values: tuple[int, ...], flagged: tuple[bool, ...], lines: tuple[int, ...]
+    ) -> None:
+        size = self.size
+
+        # Decode every reachable instruction: address => (size, targets, falls through)
+        decoded: dict[int, tuple[int, list[None | int], bool]] = {}
+        leaders = {0} if size else set()
+        roots = [0] + [addr for addr, is_instr in enumerate(flagged) if is_instr]
+        pending = roots[::-1]
+
+        while pending:
+            address = pending.pop()
+            while 0 <= address < size and address not in decoded:
+                length, targets, falls = _decode(values, address)
+                decoded[address] = (length, targets, falls)
+                for target in targets:
+                    if target is not None and 0 <= target < size:
+                        leaders.add(target)
+                        pending.append(target)
+                if targets or not falls:
+                    leaders.add(address + length)
+                if not falls:
+                    break
+                address += length
+
+        # Addresses not reached by the fall through of the preceding instruction
+        fallen = {addr + d[0] for addr, d in decoded.items() if d[2]}
+        leaders.update(addr for addr in decoded if addr not in fallen)
+
+        # Split the instructions in blocks
+        for leader in sorted(leaders):
+            if leader not in decoded:
+                continue
+            instrs = []
+            address = leader
+            while True:
+                instrs.append(address)
+                length, targets, falls = decoded[address]
+                address += length
+                if targets or not falls or address in leaders or address not in decoded:
+                    break
+            block = BasicBlock(leader, address, instrs)
+            block_lines = [lines[a] for a in instrs if lines[a] > 0]
+            if block_lines:
+                block.first_line, block.last_line = min(block_lines), max(block_lines)
+            self.blocks[leader] = block
+            for instr in instrs:
+                self._block_of.setdefault(instr, block)
+
+        # Link blocks
+        for block in self.blocks.values():
+            length, targets, falls = decoded[block.last]
+            opcode = values[block.last] >> 11
+            for target in targets:
+                if target is None or target not in self.blocks:
+                    self._link(Edge(block.start, None, UNKNOWN))
+                else:
+                    kind = JUMP if opcode == _OP_JMP else TAKEN
+                    self._link(Edge(block.start, target, kind))
+            if falls and block.end in self.blocks:
+                self._link(Edge(block.start, block.end, FALLTHROUGH))
+
+    def _link(self, edge: Edge) -> None:
+        self.edges.append(edge)
+        self.blocks[edge.source].successors.append(edge)
+        if edge.target is not None:
+            self.blocks[edge.target].predecessors.append(edge)
+
+    def _find_loops(self) -> None:
+        # Depth-first search from the entry and other roots, an edge reaching a block still in
+        # the search stack is a back edge.
+        state: dict[int, int] = {}  # 1 => in stack, 2 => done
+        for root in self.blocks:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(self.blocks[root].successors))]
+            while stack:
+                start, successors = stack[-1]
+                for edge in successors:
+                    target = edge.target
+                    if target is None:
+                        continue
+                    if state.get(target) == 1:
+                        self.back_edges.append(edge)
+                    elif target not in state:
+                        state[target] = 1
+                        stack.append((target, iter(self.blocks[target].successors)))
+                        break
+                else:
+                    state[start] = 2
+                    stack.pop()
+
+        self._back_jumps = {self.blocks[e.source].last for e in self.back_edges}
+
+        # Natural loop of each header: blocks reaching the back edge without passing the header
+        bodies: dict[int, tuple[set[int], list[Edge]]] = {}
+        for edge in self.back_edges:
+            assert edge.target is not None
+            body, edges = bodies.setdefault(edge.target, ({edge.target}, []))
+            edges.append(edge)
+            work = [edge.source]
+            while work:
+                start = work.pop()
+                if start in body:
+                    continue
+                body.add(start)
+                work.extend(e.source for e in self.blocks[start].predecessors)
+
+        for header, (body, edges) in sorted(bodies.items()):
+            loop = Loop(header, frozenset(body), edges)
+            lines = [self.blocks[b].first_line for b in body if self.blocks[b].first_line]
+            lines += [self.blocks[b].last_line for b in body if self.blocks[b].last_line]
+            if lines:
+                loop.first_line, loop.last_line = min(lines), max(lines)
+            self.loops.append(loop)
+
+
+def build_cfg(program: AssembleResult | Memory) -> ControlFlowGraph:
+    """Build the control-flow graph of an assembled program or a loaded memory
+
+    Graphs are cached by the program words, so building it again for the same program is cheap.
+    """
+    if isinstance(program, Memory):
+        words = [program.get_word(address) for address in range(program.extent)]
+        # Ignore the zeroed memory after the program
+        while words and words[-1].value == 0 and not words[-1].is_instruction:
+            words.pop()
+    else:
+        words = list(program["words"])
+
+    return _build_cfg(
+        tuple(w.value for w in words),
+        tuple(w.is_instruction for w in words),
+        tuple(w.lineno if w.is_instruction else 0 for w in words),
+    )
+
+
+@lru_cache(maxsize=32)
+def _build_cfg(
+    values: tuple[int, ...], instructions: tuple[bool, ...], lines: tuple[int, ...]
+) -> ControlFlowGraph:
+    return ControlFlowGraph(values, instructions, lines)
+
+
+def _decode(values: tuple[int, ...], address: int) -> tuple[int, list[None | int], bool]:
+    """Return size, jump targets and fall through of the instruction at the address
+
+    A jump target is None when it's unknown before running, for jumps to a register or to an
+    address stored in memory.
+    """
+    value = values[address]
+    opcode = value >> 11
+    flags = (value >> 8) & 0b111
+    argtype = ARG_TYPES.get(opcode, "NOARG")
+
+    if argtype in ("DST_ORI", "OP1_OP2"):
+        return (1 if flags & 0b011 == 0 else 2), [], True
+    if argtype == "OP_QNT":
+        return 2, [], True
+    if argtype == "JUMP":
+        # Only jumps to a constant address are known
+        target = value & 0xFF if flags & 0b011 == 2 else None
+        return 1, [target], opcode != _OP_JMP
+    if opcode == _OP_HALT:
+        return 1, [], False
+
+    return 1, [], True
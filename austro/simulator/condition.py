@@ -0,0 +1,142 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Breakpoint conditions compiled to Python code"""
+
+from __future__ import annotations
+
+import ast
+
+from typing import TYPE_CHECKING
+
+from austro.simulator.cpu import CPUException
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from austro.simulator.cpu import Memory, Registers
+
+
+# Name of the number of times the breakpoint was reached, including this one
+HITS = "HITS"
+
+# Nodes allowed in a condition, besides names, memory references and integers
+_ALLOWED = (
+    ast.BoolOp, ast.And, ast.Or,
+    ast.UnaryOp, ast.Not, ast.Invert, ast.UAdd, ast.USub,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.Load,
+)  # fmt: skip
+
+
+def compile_condition(
+    expression: str, registers: Registers, memory: Memory
+) -> Callable[[int], bool]:
+    """Compile a condition to a function of the number of hits
+
+    The condition is a Python expression of integers, register names (in any case), `[address]`
+    for the memory word at an address and HITS, e.g. `AX == 7 and [0x80] > 3`. The expression
+    is parsed once and the registers and memory are bound to the function, which evaluates it
+    without any name lookup by string. Division and modulo by zero give 0, so a condition
+    never fails in the middle of a run.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise CPUException(f"Error: invalid condition '{expression}': {e.msg}") from None
+
+    binder = _Binder(expression, registers)
+    body = binder.visit(tree.body)
+
+    # lambda HITS: <body>
+    function = ast.parse(f"lambda {HITS}: 0", mode="eval")
+    assert isinstance(function.body, ast.Lambda)
+    function.body.body = body
+    ast.fix_missing_locations(function)
+
+    namespace = {
+        "__builtins__": {},
+        "_memory": memory,
+        "_div": _div,
+        "_mod": _mod,
+        **binder.bound,
+    }
+    return eval(compile(function, f"<condition {expression}>", "eval"), namespace)
+
+
+class _Binder(ast.NodeTransformer):
+    """Replace registers by their storage and memory references by memory reads"""
+
+    def __init__(self, expression: str, registers: Registers) -> None:
+        self.expression = expression
+        self.registers = registers
+        self.bound: dict[str, object] = {}
+
+    def error(self, reason: str) -> CPUException:
+        return CPUException(f"Error: invalid condition '{self.expression}': {reason}")
+
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        name = node.id.upper()
+        if name == HITS:
+            return ast.Name(HITS, ast.Load())
+        if name not in self.registers.INDEX or name == "TMP":
+            raise self.error(f"unknown name '{node.id}'")
+
+        # <register>.value
+        self.bound[name] = self.registers.get_reg(name)
+        return ast.Attribute(ast.Name(name, ast.Load()), "value", ast.Load())
+
+    def visit_List(self, node: ast.List) -> ast.expr:
+        if len(node.elts) != 1:
+            raise self.error("a memory reference must have one address")
+
+        # _memory[<address>]
+        return ast.Subscript(
+            ast.Name("_memory", ast.Load()), self.visit(node.elts[0]), ast.Load()
+        )
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        if not isinstance(node.op, (ast.FloorDiv, ast.Mod)):
+            return self.generic_visit(node)
+
+        # _div(<left>, <right>) or _mod(<left>, <right>)
+        function = "_div" if isinstance(node.op, ast.FloorDiv) else "_mod"
+        return ast.Call(
+            ast.Name(function, ast.Load()), [self.visit(node.left), self.visit(node.right)], []
+        )
+
+    def visit_Constant(self, node: ast.Constant) -> ast.expr:
+        if type(node.value) is not int:
+            raise self.error(f"unsupported value {node.value!r}")
+        return node
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, _ALLOWED):
+            syntax = ast.unparse(node) if isinstance(node, ast.expr) else type(node).__name__
+            raise self.error(f"unsupported syntax '{syntax}'")
+        return super().generic_visit(node)
+
+
+def _div(a: int, b: int) -> int:
+    return a // b if b else 0
+
+
+def _mod(a: int, b: int) -> int:
+    return a % b if b else 0
@@ -0,0 +1,225 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Code coverage of the programs run, by address and by source line"""
+
+from __future__ import annotations
+
+import json
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from austro.asm.assembler import OPCODES
+from austro.simulator.cpu import ARG_TYPES, CPUException
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+
+    from austro.asm.memword import Word
+
+
+_OP_JMP = OPCODES["JMP"]
+
+
+class CoverageMap:
+    """Bitmaps of the addresses run and of the outcomes of the conditional jumps
+
+    Coverage is collected by the CPU while assigned to its `coverage` attribute, setting a bit
+    for the address of each instruction fetched and a bit for the outcome of each conditional
+    jump. It's kept on reset, so many runs add to the same map, and maps of runs in other
+    processes (saved, or sent pickled) are combined with `merge`, OR-ing the bitmaps.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        executed: None | bytes = None,
+        taken: None | bytes = None,
+        not_taken: None | bytes = None,
+    ) -> None:
+        self.size = size
+        length = (size + 7) >> 3
+        self.executed = bytearray(executed if executed is not None else length)
+        self.taken = bytearray(taken if taken is not None else length)
+        self.not_taken = bytearray(not_taken if not_taken is not None else length)
+        if not (len(self.executed) == len(self.taken) == len(self.not_taken) == length):
+            raise CPUException(f"Error: coverage bitmaps don't have {size} bits")
+
+    def branch(self, address: int, taken: bool) -> None:
+        """Record the outcome of the conditional jump at the address"""
+        bits = self.taken if taken else self.not_taken
+        bits[address >> 3] |= 1 << (address & 7)
+
+    def is_executed(self, address: int) -> bool:
+        return bool(self.executed[address >> 3] >> (address & 7) & 1)
+
+    def outcomes(self, address: int) -> tuple[bool, bool]:
+        """Whether the conditional jump at the address was taken and was not taken"""
+        bit = 1 << (address & 7)
+        return bool(self.taken[address >> 3] & bit), bool(self.not_taken[address >> 3] & bit)
+
+    def merge(self, other: CoverageMap) -> None:
+        """Add the coverage of another map, of the same address space"""
+        if other.size != self.size:
+            raise CPUException(
+                f"Error: can't merge coverage of {other.size} words into {self.size} words"
+            )
+        for bits, more in (
+            (self.executed, other.executed),
+            (self.taken, other.taken),
+            (self.not_taken, other.not_taken),
+        ):
+            merged = int.from_bytes(bits, "little") | int.from_bytes(more, "little")
+            bits[:] = merged.to_bytes(len(bits), "little")
+
+    def clear(self) -> None:
+        for bits in self.executed, self.taken, self.not_taken:
+            bits[:] = bytes(len(bits))
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "size": self.size,
+                    "executed": self.executed.hex(),
+                    "taken": self.taken.hex(),
+                    "not_taken": self.not_taken.hex(),
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> CoverageMap:
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            data["size"],
+            bytes.fromhex(data["executed"]),
+            bytes.fromhex(data["taken"]),
+            bytes.fromhex(data["not_taken"]),
+        )
+
+    def __eq__(self, o: object) -> bool:
+        return (
+            isinstance(o, CoverageMap)
+            and self.size == o.size
+            and self.executed == o.executed
+            and self.taken == o.taken
+            and self.not_taken == o.not_taken
+        )
+
+
+class LineCoverage(NamedTuple):
+    instructions: int  # instructions in the line
+    executed: int  # instructions run
+    branches: int  # outcomes of its conditional jumps, two by jump
+    branches_covered: int  # outcomes seen
+
+    @property
+    def is_executed(self) -> bool:
+        return self.executed > 0
+
+
+def line_coverage(coverage: CoverageMap, words: Sequence[Word]) -> dict[int, LineCoverage]:
+    """Coverage of each source line with instructions, given the words of the program"""
+    lines: dict[int, LineCoverage] = {}
+    for address, word in enumerate(words):
+        if not word.is_instruction or not word.lineno or address >= coverage.size:
+            continue
+        instructions, executed, branches, covered = lines.get(word.lineno, (0, 0, 0, 0))
+        instructions += 1
+        executed += coverage.is_executed(address)
+        if ARG_TYPES.get(word.opcode) == "JUMP" and word.opcode != _OP_JMP:
+            branches += 2
+            covered += sum(coverage.outcomes(address))
+        lines[word.lineno] = LineCoverage(instructions, executed, branches, covered)
+    return dict(sorted(lines.items()))
+
+
+def _ranges(numbers: Iterable[int]) -> str:
+    """Numbers in ascending order, consecutive ones as a range, e.g. 1-3, 7"""
+    spans: list[list[int]] = []
+    for n in numbers:
+        if spans and spans[-1][1] == n - 1:
+            spans[-1][1] = n
+        else:
+            spans.append([n, n])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in spans)
+
+
+def text_report(lines: dict[int, LineCoverage], name: str) -> str:
+    """Summary of the coverage, with the lines not run and the jumps not fully covered"""
+    run = sum(line.is_executed for line in lines.values())
+    branches = sum(line.branches for line in lines.values())
+    covered = sum(line.branches_covered for line in lines.values())
+    report = [
+        f"{name}: {run}/{len(lines)} lines ({_percent(run, len(lines))}),"
+        f" {covered}/{branches} branches ({_percent(covered, branches)})"
+    ]
+    missed = [n for n, line in lines.items() if not line.is_executed]
+    if missed:
+        report.append(f"lines not run: {_ranges(missed)}")
+    partial = [n for n, line in lines.items() if line.branches_covered < line.branches]
+    if partial:
+        report.append(f"branches not covered: {_ranges(partial)}")
+    return "\n".join(report) + "\n"
+
+
+def _percent(part: int, total: int) -> str:
+    return f"{part / total:.1%}" if total else "-"
+
+
+def json_report(lines: dict[int, LineCoverage]) -> list[dict]:
+    """Coverage of each line, to be exported as JSON"""
+    return [{"line": n, **line._asdict()} for n, line in lines.items()]
+
+
+def lcov_report(
+    coverage: CoverageMap, words: Sequence[Word], source: str, test_name: str = ""
+) -> str:
+    """Coverage in the LCOV tracefile format, for genhtml and other coverage tools
+
+    LCOV counts hits, but the bitmaps only tell if a line was run, so the hits are 0 or 1.
+    """
+    lines = line_coverage(coverage, words)
+    records = [f"TN:{test_name}", f"SF:{source}"]
+
+    branches = hit = 0
+    for address, word in enumerate(words):
+        if not (word.is_instruction and word.lineno and address < coverage.size):
+            continue
+        if ARG_TYPES.get(word.opcode) != "JUMP" or word.opcode == _OP_JMP:
+            continue
+        executed = coverage.is_executed(address)
+        for number, outcome in enumerate(coverage.outcomes(address)):
+            records.append(
+                f"BRDA:{word.lineno},{address},{number},{int(outcome) if executed else '-'}"
+            )
+            branches += 1
+            hit += outcome
+    records += [f"BRF:{branches}", f"BRH:{hit}"]
+
+    for n, line in lines.items():
+        records.append(f"DA:{n},{int(line.is_executed)}")
+    records += [
+        f"LF:{len(lines)}",
+        f"LH:{sum(line.is_executed for line in lines.values())}",
+        "end_of_record",
+    ]
+    return "\n".join(records) + "\n"
@@ -20,19 +20,197 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
-from ctypes import c_int8, c_int16
-from dataclasses import dataclass
+from array import array
+from collections.abc import Buffer
+from dataclasses import dataclass, fields
 from enum import Enum
-from typing import TYPE_CHECKING, Iterator, Sequence, cast, override
+from typing import TYPE_CHECKING, Iterator, NamedTuple, Sequence, cast, override
 
 from austro.asm.assembler import OPCODES, REGISTERS
-from austro.asm.memword import DWord, Word
+from austro.asm.memword import Word
 from austro.shared import AustroException
 from austro.simulator.register import Reg16, RegH, RegL, RegX
 
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import numpy
+
+    from austro.simulator.cache import Cache
+    from austro.simulator.coverage import CoverageMap
+    from austro.simulator.loopdetect import InfiniteLoopDetector
+    from austro.simulator.predictor import BranchPredictor
+    from austro.simulator.profiler import LoopProfiler
     from austro.simulator.register import BaseReg
+    from austro.simulator.ring import EventRing
+    from austro.simulator.shadow import ShadowMemory
+
+    # Subscriber of an event, called with the payload
+    Subscriber = Callable[[tuple], None]
+
+
+# Memory pages of 256 words
+PAGE_BITS = 8
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+_ZERO_PAGE = array("H", bytes(2 * PAGE_SIZE))
+
+# Numbers of each record of the event ring (see austro.simulator.ring): address, instruction
+# word, mask of the registers changed
+RECORD_SIZE = 3
+
+# Argument type of each opcode, as understood by the decoder. Missing opcodes have no arguments
+# ("NOARG").
+ARG_TYPES: dict[int, str] = {
+    **{
+        OPCODES[name]: "DST_ORI"
+        for name in ("MOV", "ADD", "SUB", "MUL", "OR", "AND", "XOR", "DIV", "MOD")
+    },
+    OPCODES["CMP"]: "OP1_OP2",
+    OPCODES["SHR"]: "OP_QNT",
+    OPCODES["SHL"]: "OP_QNT",
+    **{
+        OPCODES[name]: "JUMP"
+        for name in ("JZ", "JNZ", "JN", "JP", "JGE", "JLE", "JV", "JT", "JMP")
+    },
+    OPCODES["INC"]: "OP",
+    OPCODES["DEC"]: "OP",
+    OPCODES["NOT"]: "OP",
+}
+
+# Opcodes dispatched by the UC
+_OP_HALT = OPCODES["HALT"]
+_OP_JMP = OPCODES["JMP"]
+_OP_MOV = OPCODES["MOV"]
+
+# Conditions of the jump instructions over the state registers
+_JUMP_CONDITIONS: dict[int, Callable[[Registers], bool]] = {
+    OPCODES["JZ"]: lambda r: r["Z"] == 1,
+    OPCODES["JNZ"]: lambda r: r["Z"] == 0,
+    OPCODES["JN"]: lambda r: r["N"] == 1,
+    OPCODES["JP"]: lambda r: r["Z"] == 0 and r["N"] == 0,
+    OPCODES["JGE"]: lambda r: r["N"] == 0,
+    OPCODES["JLE"]: lambda r: r["Z"] == 1 or r["N"] == 1,
+    OPCODES["JV"]: lambda r: r["V"] == 1,
+    OPCODES["JT"]: lambda r: r["T"] == 1,
+    OPCODES["JMP"]: lambda r: True,
+}
+
+# Opcodes dispatched by the ALU
+_OP_ADD = OPCODES["ADD"]
+_OP_SUB = OPCODES["SUB"]
+_OP_INC = OPCODES["INC"]
+_OP_DEC = OPCODES["DEC"]
+_OP_CMP = OPCODES["CMP"]
+_OP_OR = OPCODES["OR"]
+_OP_AND = OPCODES["AND"]
+_OP_NOT = OPCODES["NOT"]
+_OP_XOR = OPCODES["XOR"]
+_OP_MUL = OPCODES["MUL"]
+_OP_DIV = OPCODES["DIV"]
+_OP_MOD = OPCODES["MOD"]
+_ALU_ARITH = frozenset((_OP_ADD, _OP_SUB, _OP_INC, _OP_DEC))
+
+# Opcodes dispatched by the Shift Unit
+_OP_SHR = OPCODES["SHR"]
+_OP_SHL = OPCODES["SHL"]
+
+#
+## Lookup tables used by the ALU
+#
+
+# Sign extension of a byte, the same as `ctypes.c_int8(byte).value`
+_SEXT8 = tuple(b - 0x100 if b & 0x80 else b for b in range(0x100))
+
+# Range of results covered by the flag tables: every result of an 8-bit add, sub, inc, dec or
+# cmp with 8-bit operands, signed or not. Results out of range have their flags calculated.
+_FLAGS_MIN = -0x100
+_FLAGS_MAX = 0x200
+# Flags (V, Z) of an 8-bit add, sub, inc or dec, indexed by `result - _FLAGS_MIN`
+_ARITH8_FLAGS = tuple(
+    (int(r >> 8 != 0), int(r & 0xFF == 0)) for r in range(_FLAGS_MIN, _FLAGS_MAX)
+)
+# Flags (N, Z) of a comparison, indexed by `(in1 - in2) - _FLAGS_MIN`
+_CMP_FLAGS = tuple((int(r < 0), int(r == 0)) for r in range(_FLAGS_MIN, _FLAGS_MAX))
+
+
+class Accesses(NamedTuple):
+    words: int  # words of the instruction
+    reads: int  # memory operands read
+    writes: int  # memory operands written
+
+
+def memory_accesses(opcode: int, flags: int) -> Accesses:
+    """Words and memory operands accessed by an instruction, following the decoder"""
+    argtype = ARG_TYPES.get(opcode, "NOARG")
+    if argtype in ("DST_ORI", "OP1_OP2"):
+        order = flags & 0b011
+        # Reg, Reg
+        if order == 0:
+            return Accesses(1, 0, 0)
+        # Reg, Mem
+        if order == 1:
+            return Accesses(2, 1, 0)
+        # Mem, Reg (a MOV doesn't read the memory, a CMP doesn't store)
+        if order == 3:
+            return Accesses(2, int(opcode != _OP_MOV), int(argtype == "DST_ORI"))
+        # Reg, Const
+        return Accesses(2, 0, 0)
+    if argtype == "OP_QNT":
+        return Accesses(2, flags & 0b001, flags & 0b001)
+    if argtype == "JUMP":
+        return Accesses(1, int(flags & 0b011 == 1), 0)
+    if argtype == "OP":
+        return Accesses(1, flags & 0b001, flags & 0b001)
+    return Accesses(1, 0, 0)
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Cycles taken by each stage of an instruction"""
+
+    fetch: int = 1  # instruction word
+    operand_fetch: int = 1  # second word, of a memory address, constant or quantity
+    memory_read: int = 1  # memory operand
+    alu: int = 1
+    mul: int = 4
+    div: int = 8  # division and remainder
+    uc: int = 1
+    shift: int = 1
+    store: int = 1  # memory operand, results stored in registers cost nothing
+    cache_miss: int = 10  # line filled or written back, only with a cache attached
+
+    def __post_init__(self) -> None:
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if type(value) is not int or not 0 <= value < 1 << 16:
+                raise CPUException(
+                    f"Error: invalid cost model, '{field.name}' must be an integer"
+                    f" from 0 to 65535, not {value!r}"
+                )
+
+    def cost(self, opcode: int, flags: int) -> int:
+        """Cycles of an instruction, following the decoder"""
+        words, reads, writes = memory_accesses(opcode, flags)
+        cycles = self.fetch + (words - 1) * self.operand_fetch
+        cycles += reads * self.memory_read + writes * self.store
+
+        if opcode in (_OP_SHR, _OP_SHL):
+            cycles += self.shift
+        elif opcode == _OP_MUL:
+            cycles += self.mul
+        elif opcode in (_OP_DIV, _OP_MOD):
+            cycles += self.div
+        elif opcode >= 16:
+            cycles += self.alu
+        else:
+            cycles += self.uc
+        return cycles
+
+    def table(self) -> array[int]:
+        """Cycles of each instruction indexed by the high byte of its word (opcode and flags)"""
+        return array("I", (self.cost(high >> 3, high & 0b111) for high in range(256)))
 
 
 class StepListener(metaclass=ABCMeta):
@@ -40,6 +218,92 @@ class StepListener(metaclass=ABCMeta):
     def on_fetch(self, registers: Registers, memory: Memory) -> None: ...
 
 
+class MemoryObserver(metaclass=ABCMeta):
+    @abstractmethod
+    def on_write(self, address: int, old: int, new: int) -> None: ...
+
+    @abstractmethod
+    def on_clear(self) -> None: ...
+
+
+class Event(Enum):
+    """Events of the CPU, with the payload tuple given to the subscribers
+
+    Addresses are of the instruction being run.
+    """
+
+    FETCH = "fetch"  # (address, instruction word)
+    DECODE = "decode"  # (address, unit, operation, op1, op2)
+    EXECUTE = "execute"  # (address, unit, operation, result)
+    STORE = "store"  # (address, register, memory address or None, value)
+    MEMORY_WRITE = "memory_write"  # (memory address, old, new)
+    REGISTER_WRITE = "register_write"  # (register, old, new)
+    JUMP = "jump"  # (address, target), only jumps taken
+    HALT = "halt"  # (address,)
+    FAULT = "fault"  # (PC, message)
+
+
+class EventBus(MemoryObserver):
+    """Subscriptions to the CPU events
+
+    The subscribers of each event are a tuple in the attribute of the event value. The CPU
+    tests it before making the payload, so an event without subscribers costs a single test.
+    Memory writes are observed, and register writes hooked, only while subscribed.
+    """
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+
+        self.fetch: tuple[Subscriber, ...] = ()
+        self.decode: tuple[Subscriber, ...] = ()
+        self.execute: tuple[Subscriber, ...] = ()
+        self.store: tuple[Subscriber, ...] = ()
+        self.memory_write: tuple[Subscriber, ...] = ()
+        self.register_write: tuple[Subscriber, ...] = ()
+        self.jump: tuple[Subscriber, ...] = ()
+        self.halt: tuple[Subscriber, ...] = ()
+        self.fault: tuple[Subscriber, ...] = ()
+
+        # Any subscriber of the stages after fetch, which need the instruction address
+        self.stepping = False
+
+    def subscribe(self, event: Event, subscriber: Subscriber) -> None:
+        setattr(self, event.value, (*getattr(self, event.value), subscriber))
+        self._update()
+
+    def unsubscribe(self, event: Event, subscriber: Subscriber) -> None:
+        subscribers = list(getattr(self, event.value))
+        subscribers.remove(subscriber)
+        setattr(self, event.value, tuple(subscribers))
+        self._update()
+
+    def _update(self) -> None:
+        self.stepping = bool(self.decode or self.execute or self.store)
+
+        memory = self.cpu.memory
+        if self.memory_write and self not in memory._observers:
+            memory.attach(self)
+        elif not self.memory_write and self in memory._observers:
+            memory.detach(self)
+
+        registers = self.cpu.registers
+        on_write = self._on_register_write if self.register_write else None
+        registers._set_hooks(on_write, registers._tracked)
+
+    def _on_register_write(self, index: int, old: int, new: int) -> None:
+        for subscriber in self.register_write:
+            subscriber((index, old, new))
+
+    @override
+    def on_write(self, address: int, old: int, new: int) -> None:
+        for subscriber in self.memory_write:
+            subscriber((address, old, new))
+
+    @override
+    def on_clear(self) -> None:
+        pass
+
+
 @dataclass(init=False)
 class Decode:
     unit: int
@@ -49,6 +313,47 @@ class Decode:
     store: None | bool | int = None
 
 
+class FusedPair(NamedTuple):
+    """A compare, increment or decrement followed by a jump, executed as one operation"""
+
+    value: int  # first instruction word
+    operation: int  # ALU operation of the first instruction
+    op1: int
+    op2: None | int  # second register of a CMP, None for a constant or INC/DEC
+    size: int  # number of words of the first instruction
+    jump_value: int  # jump instruction word
+    condition: Callable[[Registers], bool]
+    target: int
+
+
+# Kinds of breaks, watchpoint kinds can be combined
+BREAKPOINT = 0
+WATCH_READ = 1
+WATCH_WRITE = 2
+WATCH_CHANGE = 4  # a write changing the value
+
+
+class Break(NamedTuple):
+    """Reason of a run stopped before halting"""
+
+    pc: int  # address of the instruction
+    kind: int  # BREAKPOINT or the kind of watchpoint
+    address: None | int = None  # memory address of a watchpoint
+    old: None | int = None  # value before a write
+    new: None | int = None  # value read or written
+
+
+class CPUSnapshot(NamedTuple):
+    memory: MemorySnapshot
+    registers: tuple[int, ...]
+    stage: Stage
+    ri_instruction: bool  # metadata of the instruction register
+    ri_lineno: int
+    fused: dict[int, FusedPair]
+    instructions: int = 0
+    cycles: int = 0
+
+
 class Stage(Enum):
     INITIAL = 0
     STOPPED = 1
@@ -60,7 +365,9 @@ class Stage(Enum):
 
 
 class CPU:
+    # Default and maximum number of memory words
     ADDRESS_SPACE = 256
+    MAX_ADDRESS_SPACE = 0x10000
 
     # Execution units
     ALU = 0
@@ -70,14 +377,61 @@ class CPU:
     # Special UC actions
     UC_LOAD = 128
 
-    def __init__(self, *listeners: StepListener) -> None:
+    def __init__(self, *listeners: StepListener, address_space: int = ADDRESS_SPACE) -> None:
+        if not (0 < address_space <= CPU.MAX_ADDRESS_SPACE):
+            raise CPUException(
+                f"Error: address space must be from 1 to {CPU.MAX_ADDRESS_SPACE} words"
+            )
+
         self.listeners: list[StepListener] = []
         if listeners is not None:
             self.listeners.extend(listeners)
 
-        self.memory = Memory(CPU.ADDRESS_SPACE)
+        self.memory = Memory(address_space)
         self.registers = Registers()
         self.stage = Stage.INITIAL
+        self.events = EventBus(self)
+
+        # Instructions fetched and their cycles, as priced by the cost model
+        self.instructions = 0
+        self.cycles = 0
+        self.cost_model = CostModel()
+
+        # Instruction pairs to execute as one operation, by the address of the first
+        self._fused: dict[int, FusedPair] = {}
+        self._fusing = False
+
+        # Memory as left by the last set_memory_block
+        self._image: None | MemorySnapshot = None
+
+        # Optional infinite loop detection (see austro.simulator.loopdetect)
+        self.loop_detector: None | InfiniteLoopDetector = None
+        # Optional uninitialized read detection (see austro.simulator.shadow)
+        self.shadow: None | ShadowMemory = None
+        # Optional cache simulation (see austro.simulator.cache)
+        self.cache: None | Cache = None
+        # Optional branch prediction (see austro.simulator.predictor)
+        self.predictor: None | BranchPredictor = None
+        # Optional loop profiling (see austro.simulator.profiler)
+        self.profiler: None | LoopProfiler = None
+        # Optional code coverage (see austro.simulator.coverage), kept on reset
+        self.coverage: None | CoverageMap = None
+        # Optional batches of instruction records (see austro.simulator.ring)
+        self.ring: None | EventRing = None
+
+        # Breakpoints, a bit by address checked after each fetch
+        self._breakpoints = bytearray((address_space + 7) >> 3)
+        self._breakpoint_count = 0
+        # Conditions of breakpoints (see austro.simulator.condition) and the times reached
+        self._conditions: dict[int, Callable[[int], bool]] = {}
+        self._hits: dict[int, int] = {}
+        # Watchpoints, the kinds by address and a bit by address checked on memory operands.
+        # The bits are None when there is no watchpoint.
+        self._watchpoints: dict[int, int] = {}
+        self._watched: None | bytearray = None
+        self._watch_hit: None | Break = None
+        # Reason of the last run stopped before halting
+        self.last_break: None | Break = None
 
     def set_memory_block(self, words: Sequence[Word], start=0) -> bool:
         assert isinstance(words, (list, tuple))
@@ -88,26 +442,176 @@ class CPU:
                 )
             )
 
-        for word in words:
-            self.memory.set_word(start, word)
-            start += 1
+        end = start + len(words)
+        self.memory.load_words(start, words)
+
+        self._fuse_pairs(start, end)
+        if self.loop_detector is not None:
+            self.loop_detector.reset()
+        if self.shadow is not None:
+            self.shadow.save_image()
+
+        # Memory as loaded, for reset(to_image=True)
+        self._image = self.memory.snapshot()
 
         return True
 
     def start(self) -> bool:
-        while self.stage not in (Stage.HALTED, Stage.STOPPED):
-            next(self)
+        """Run until the program halts, is stopped or reaches a breakpoint or watchpoint
+
+        Return True only if the program halted. A run stopped by a breakpoint or watchpoint
+        leaves the reason in `last_break`, and can be started again from there.
+        """
+        # Fused instructions skip the fetch of the jump and the decoding of both, so they are
+        # used only when there is no listener to be notified
+        self._fusing = not self.listeners and not self.events.stepping
+        previous, self.last_break = self.last_break, None
+        try:
+            # Breakpoints are checked in a separate loop, so a run without them doesn't pay
+            if self._breakpoint_count or self._watched is not None:
+                # After a watchpoint, the next instruction is not checked for a breakpoint yet
+                if (
+                    previous is not None
+                    and previous.kind != BREAKPOINT
+                    and self.poll_break() is not None
+                ):
+                    return False
+                while self.stage not in (Stage.HALTED, Stage.STOPPED):
+                    next(self)
+                    if self.poll_break() is not None:
+                        break
+            else:
+                while self.stage not in (Stage.HALTED, Stage.STOPPED):
+                    next(self)
+        finally:
+            self._fusing = False
+
+        return self.stage == Stage.HALTED
+
+    def poll_break(self) -> None | Break:
+        """Return why the execution should break after the last step, None if it shouldn't
+
+        Used between steps, the instruction at a breakpoint is fetched but not executed and an
+        instruction touching a watchpoint is completed. The break is kept in `last_break`.
+        """
+        hit = self._watch_hit
+        if hit is not None:
+            self._watch_hit = None
+        elif self._breakpoint_count and self.stage == Stage.DECODE:
+            pc = self.registers["PC"]
+            if self._breakpoints[pc >> 3] >> (pc & 7) & 1:
+                hits = self._hits[pc] = self._hits.get(pc, 0) + 1
+                condition = self._conditions.get(pc)
+                if condition is None or condition(hits):
+                    hit = Break(pc, BREAKPOINT)
+
+        if hit is not None:
+            self.last_break = hit
+        return hit
 
-        if self.stage == Stage.STOPPED:
-            return False
+    #
+    ## Breakpoints and watchpoints
+    #
 
-        return True
+    @property
+    def breakpoints(self) -> list[int]:
+        return [a for a in range(self.memory.size) if self._breakpoints[a >> 3] >> (a & 7) & 1]
+
+    def add_breakpoint(self, address: int, condition: None | str = None) -> None:
+        """Break at an address, only when the condition holds if one is given
+
+        See `austro.simulator.condition.compile_condition` for the conditions.
+        """
+        self._check_address(address)
+        if condition is None:
+            self._conditions.pop(address, None)
+        else:
+            # The module imports this one
+            from austro.simulator.condition import compile_condition
+
+            self._conditions[address] = compile_condition(
+                condition, self.registers, self.memory
+            )
+
+        if not self._breakpoints[address >> 3] >> (address & 7) & 1:
+            self._breakpoints[address >> 3] |= 1 << (address & 7)
+            self._breakpoint_count += 1
+            # A jump at a breakpoint must be fetched, so it can't be fused
+            self._fuse_pairs(address, address + 1)
+
+    def remove_breakpoint(self, address: int) -> None:
+        self._check_address(address)
+        if self._breakpoints[address >> 3] >> (address & 7) & 1:
+            self._breakpoints[address >> 3] &= ~(1 << (address & 7))
+            self._breakpoint_count -= 1
+            self._conditions.pop(address, None)
+            self._hits.pop(address, None)
+            self._fuse_pairs(address, address + 1)
+
+    def clear_breakpoints(self) -> None:
+        for address in self.breakpoints:
+            self.remove_breakpoint(address)
+
+    @property
+    def watchpoints(self) -> dict[int, int]:
+        """Kinds of watchpoint by address"""
+        return dict(self._watchpoints)
+
+    def add_watchpoint(self, address: int, kind: int = WATCH_WRITE) -> None:
+        """Watch a memory address, the kinds are combined with the ones already watched"""
+        self._check_address(address)
+        if not kind or kind & ~(WATCH_READ | WATCH_WRITE | WATCH_CHANGE):
+            raise CPUException(f"Error: invalid watchpoint kind: {kind}")
+
+        self._watchpoints[address] = self._watchpoints.get(address, 0) | kind
+        if self._watched is None:
+            self._watched = bytearray(len(self._breakpoints))
+        self._watched[address >> 3] |= 1 << (address & 7)
+
+    def remove_watchpoint(self, address: int) -> None:
+        self._check_address(address)
+        if self._watchpoints.pop(address, None) is not None:
+            assert self._watched is not None
+            self._watched[address >> 3] &= ~(1 << (address & 7))
+            if not self._watchpoints:
+                self._watched = None
+
+    def clear_watchpoints(self) -> None:
+        self._watchpoints.clear()
+        self._watched = None
+        self._watch_hit = None
+
+    def _check_address(self, address: int) -> None:
+        if not (0 <= address < self.memory.size):
+            raise CPUException(f"Error: address {address} outside address space")
+
+    def _watch_read(self, address: int, pc: int) -> None:
+        if self._watchpoints.get(address, 0) & WATCH_READ and self._watch_hit is None:
+            self._watch_hit = Break(pc, WATCH_READ, address, new=self.memory[address])
+
+    def _watch_write(self, address: int, value: int) -> None:
+        kinds = self._watchpoints.get(address, 0)
+        if not kinds & (WATCH_WRITE | WATCH_CHANGE) or self._watch_hit is not None:
+            return
+        # On store, PC is at the last word of the instruction, only INC, DEC and NOT of a
+        # memory operand have a single word
+        registers = self.registers
+        pc = registers["PC"] - (ARG_TYPES.get(registers.get_word("RI").opcode) != "OP")
+        old = self.memory[address]
+        new = value & 0xFFFF
+        if kinds & WATCH_WRITE:
+            self._watch_hit = Break(pc, WATCH_WRITE, address, old, new)
+        elif old != new:
+            self._watch_hit = Break(pc, WATCH_CHANGE, address, old, new)
 
     def __next__(self) -> bool:
         try:
             return self._do_next()
-        except CPUException:
+        except CPUException as e:
             self.stop()
+            if self.events.fault:
+                for subscriber in self.events.fault:
+                    subscriber((self.registers["PC"], e.message))
             raise
 
     def _do_next(self) -> bool:
@@ -125,9 +629,21 @@ class CPU:
 
         # Decode stage
         elif self.stage == Stage.DECODE:
+            if self._fusing:
+                pair = self._fused.get(registers["PC"])
+                # Execute the pair only if the code was not overwritten
+                if pair is not None and registers["RI"] == pair.value:
+                    return self._do_fused(pair)
+            events = self.events
+            if events.stepping:
+                pc = registers["PC"]
             decode = self.decode(registers.get_word("RI"))
             op1_val = None if decode.op1 is None else registers[decode.op1]
             op2_val = None if decode.op2 is None else registers[decode.op2]
+            if events.decode:
+                payload = (pc, decode.unit, decode.operation, decode.op1, decode.op2)
+                for subscriber in events.decode:
+                    subscriber(payload)
             # Next state
             self.stage = Stage.EXECUTE
 
@@ -142,6 +658,9 @@ class CPU:
             # Call UC (Control Unit)
             elif decode.unit == CPU.UC:
                 self.uc(decode.operation, decode.op1, decode.op2)
+                if events.execute:
+                    for subscriber in events.execute:
+                        subscriber((pc, decode.unit, decode.operation, None))
                 if self.stage == Stage.HALTED:  # halt found
                     return True
                 if self.stage == Stage.FETCH:  # a jump found
@@ -150,6 +669,10 @@ class CPU:
             elif decode.unit == CPU.SHIFT:
                 result = self.shift(decode.operation, op1_val, op2_val)
 
+            if events.execute and decode.unit != CPU.UC:
+                for subscriber in events.execute:
+                    subscriber((pc, decode.unit, decode.operation, result))
+
             # Next state: store or fetch
             if self.stage != Stage.FETCH:
                 if type(decode.store) is bool and decode.store or decode.store is not None:
@@ -165,25 +688,161 @@ class CPU:
                 self.uc(CPU.UC_LOAD, decode.op1, result)
             if type(decode.store) is int:
                 assert isinstance(decode.op1, int)
+                watched = self._watched
+                if watched is not None and watched[decode.store >> 3] >> (decode.store & 7) & 1:
+                    self._watch_write(decode.store, registers[decode.op1])
                 memory[decode.store] = registers[decode.op1]
+                if self.cache is not None:
+                    self.cache.write(decode.store)
+            if events.store:
+                assert isinstance(decode.op1, int)
+                address = decode.store if type(decode.store) is int else None
+                for subscriber in events.store:
+                    subscriber((pc, decode.op1, address, registers[decode.op1]))
 
         # Fetch stage
         self.stage = Stage.FETCH
         registers["PC"] += 1
         return self.fetch()
 
+    def _do_fused(self, pair: FusedPair) -> bool:
+        """Execute a fused pair, with the same effects of stepping through both instructions"""
+        registers = self.registers
+        registers.get_word("RI").is_instruction = True
+
+        # First instruction
+        op1 = pair.op1
+        if pair.op2 is not None:  # CMP Reg, Reg
+            self.alu(pair.operation, registers[op1], registers[pair.op2])
+        elif pair.size == 2:  # CMP Reg, Const
+            registers["PC"] += 1
+            registers["MAR"] = registers["PC"]
+            registers["MBR"] = self.memory[registers["MAR"]]
+            self.alu(pair.operation, registers[op1], registers["MBR"])
+        else:  # INC Reg or DEC Reg
+            result = self.alu(pair.operation, registers[op1], 0)
+            registers[op1] = cast(int, result)
+
+        # Jump instruction
+        registers["PC"] += 1
+        self.fetch()
+        # Jump was overwritten, let it be decoded normally
+        if registers["RI"] != pair.jump_value:
+            return True
+        registers.get_word("RI").is_instruction = True
+        registers["TMP"] = pair.target
+        taken = pair.condition(registers)
+        if self.predictor is not None and pair.jump_value >> 11 != _OP_JMP:
+            self.predictor.on_branch(registers["PC"], taken)
+        if self.coverage is not None and pair.jump_value >> 11 != _OP_JMP:
+            self.coverage.branch(registers["PC"], taken)
+        if taken:
+            self._jump_to(pair.target)
+        else:
+            registers["PC"] += 1
+        return self.fetch()
+
+    def _fuse_pairs(self, start: int, end: int) -> None:
+        """Find the instruction pairs in the address range that can be fused"""
+        memory = self.memory
+        fused = self._fused
+
+        # A pair can start up to two words before the range
+        for address in range(max(0, start - 2), end):
+            fused.pop(address, None)
+
+            word = memory.get_word(address)
+            if not word.is_instruction:
+                continue
+
+            opcode, flags, operand = word.opcode, word.flags, word.operand
+            op2 = None
+            # CMP Reg, Reg
+            if opcode == _OP_CMP and flags & 0b011 == 0:
+                size = 1
+                op2 = operand & 0b1111
+            # CMP Reg, Const
+            elif opcode == _OP_CMP and flags & 0b011 == 2:
+                size = 2
+            # INC Reg or DEC Reg
+            elif opcode in (_OP_INC, _OP_DEC) and flags & 0b001 == 0:
+                size = 1
+            else:
+                continue
+
+            # Only jumps to a constant address, and not at a breakpoint
+            if address + size >= memory.size:
+                continue
+            if self._breakpoints[(address + size) >> 3] >> ((address + size) & 7) & 1:
+                continue
+            jump = memory.get_word(address + size)
+            if not (
+                jump.is_instruction
+                and jump.opcode in _JUMP_CONDITIONS
+                and jump.flags & 0b011 == 2
+            ):
+                continue
+
+            op1 = operand >> 4
+            is_8bits = op1 < 8
+            signed = (flags & 0b100) >> 2
+            fused[address] = FusedPair(
+                value=word.value,
+                operation=(opcode << 2) | (is_8bits << 1) | signed,
+                op1=op1,
+                op2=op2,
+                size=size,
+                jump_value=jump.value,
+                condition=_JUMP_CONDITIONS[jump.opcode],
+                target=jump.operand,
+            )
+
     def fetch(self) -> bool:
+        """Load the instruction at PC into RI
+
+        PC can't point past a smaller address space. In the full space of 65536 words, no
+        address is past the end: PC is a 16-bit register and wraps from 0xFFFF to 0, so a
+        program running off the last word goes on from address 0.
+        """
         registers = self.registers
 
         # PC can't be greater than address space
-        if registers["PC"] >= CPU.ADDRESS_SPACE:
+        address = registers["PC"]
+        if address >= self.memory.size:
             raise CPUException("PC register greater than address space")
 
-        registers["MAR"] = registers["PC"]
-        registers.set_word("MBR", self.memory.get_word(registers["MAR"]))
-        registers.set_word("RI", registers.get_word("MBR"))
+        registers["MAR"] = address
+        word = self.memory.get_word(address)
+        registers.set_word("MBR", word)
+        registers.set_word("RI", word)
+        value = word.value
+
+        self.instructions += 1
+        self.cycles += self._costs[value >> 8]
+        if self.cache is not None:
+            self.cache.fetch(address, value >> 8)
+        if self.coverage is not None:
+            self.coverage.executed[address >> 3] |= 1 << (address & 7)
+        if self.ring is not None:
+            # Written here rather than by a subscriber, to cost no call by instruction
+            ring = self.ring
+            records = ring.records
+            index = ring.count * RECORD_SIZE
+            if index == len(records):
+                ring.flush()
+                index = 0
+            elif index:
+                # Registers changed by the previous instruction
+                records[index - 1] = registers._changed
+            registers._changed = 0
+            records[index] = address
+            records[index + 1] = value
+            ring.count += 1
 
         # Emit event
+        if self.events.fetch:
+            for subscriber in self.events.fetch:
+                subscriber((address, value))
         for listener in self.listeners:
             listener.on_fetch(self.registers, self.memory)
 
@@ -193,10 +852,94 @@ class CPU:
     def stop(self) -> None:
         self.stage = Stage.STOPPED
 
-    def reset(self) -> None:
-        self.memory.clear()
+    @property
+    def cost_model(self) -> CostModel:
+        return self._cost_model
+
+    @cost_model.setter
+    def cost_model(self, model: CostModel) -> None:
+        self._cost_model = model
+        # Cycles by the high byte of the instruction word, added on each fetch
+        self._costs = model.table()
+
+    def snapshot(self) -> CPUSnapshot:
+        """Take the machine state, memory pages are shared until written"""
+        ri = self.registers.get_word("RI")
+        return CPUSnapshot(
+            memory=self.memory.snapshot(),
+            registers=self.registers.snapshot(),
+            stage=self.stage,
+            ri_instruction=ri.is_instruction,
+            ri_lineno=ri.lineno,
+            fused=dict(self._fused),
+            instructions=self.instructions,
+            cycles=self.cycles,
+        )
+
+    def restore(self, snapshot: CPUSnapshot) -> None:
+        """Bring the machine back to a snapshot"""
+        self.memory.restore(snapshot.memory)
+        self.registers.restore(snapshot.registers)
+        self.stage = snapshot.stage
+        ri = self.registers.get_word("RI")
+        ri.is_instruction = snapshot.ri_instruction
+        ri.lineno = snapshot.ri_lineno
+        # Breakpoints may have been added to a jump of a pair after the snapshot
+        breakpoints = self._breakpoints
+        self._fused = {
+            address: pair
+            for address, pair in snapshot.fused.items()
+            if not breakpoints[(address + pair.size) >> 3] >> ((address + pair.size) & 7) & 1
+        }
+        self.instructions = snapshot.instructions
+        self.cycles = snapshot.cycles
+        # States seen before the snapshot may be seen again
+        if self.loop_detector is not None:
+            self.loop_detector.reset()
+
+    def fork(self) -> CPU:
+        """Return a copy of this machine, sharing the memory pages until written
+
+        Listeners and memory observers are not carried to the copy.
+        """
+        cpu = CPU(address_space=self.memory.size)
+        cpu.cost_model = self.cost_model
+        cpu.restore(self.snapshot())
+        return cpu
+
+    def reset(self, to_image=False) -> None:
+        """Reset registers and memory
+
+        With `to_image`, memory is brought back as loaded by the last `set_memory_block`,
+        so the program can run again without loading it. Only the pages written since the load
+        are replaced.
+
+        Breakpoints and watchpoints are kept, but not the times each breakpoint was reached.
+        """
+        if to_image and self._image is not None:
+            self.memory.restore(self._image)
+        else:
+            self.memory.clear()
+            self._fused.clear()
+            self._image = None
         self.registers.clear()
         self.stage = Stage.INITIAL
+        self.instructions = 0
+        self.cycles = 0
+        self._watch_hit = None
+        self.last_break = None
+        self._hits.clear()
+        if self.loop_detector is not None:
+            self.loop_detector.reset()
+        if self.shadow is not None:
+            # Not the words brought back by the restore, only those initialized by the load
+            self.shadow.reset()
+        if self.cache is not None:
+            self.cache.reset()
+        if self.predictor is not None:
+            self.predictor.reset()
+        if self.profiler is not None:
+            self.profiler.reset()
 
     #
     ## Implementation of CPU execution units
@@ -214,51 +957,27 @@ class CPU:
                 registers[op1] = op2
             return
 
-        _ = self._opcodes
         opcode = operation
 
-        if opcode in _("HALT"):
+        if opcode == _OP_HALT:
             self.stage = Stage.HALTED
-        elif opcode in _("MOV"):
+            if self.events.halt:
+                for subscriber in self.events.halt:
+                    subscriber((registers["PC"],))
+        elif opcode == _OP_MOV:
             assert isinstance(op1, int)
             assert isinstance(op2, int)
             registers[op1] = registers[op2]
         # Jump instructions
-        elif opcode in _("JZ", "JE"):
+        elif opcode in _JUMP_CONDITIONS:
             assert isinstance(op1, int)
-            if registers["Z"] == 1:
+            taken = _JUMP_CONDITIONS[opcode](registers)
+            if self.predictor is not None and opcode != _OP_JMP:
+                self.predictor.on_branch(registers["PC"], taken)
+            if self.coverage is not None and opcode != _OP_JMP:
+                self.coverage.branch(registers["PC"], taken)
+            if taken:
                 self._jump_to(registers[op1])
-        elif opcode in _("JNZ", "JNE"):
-            assert isinstance(op1, int)
-            if registers["Z"] == 0:
-                self._jump_to(registers[op1])
-        elif opcode in _("JN", "JLT"):
-            assert isinstance(op1, int)
-            if registers["N"] == 1:
-                self._jump_to(registers[op1])
-        elif opcode in _("JP", "JGT"):
-            assert isinstance(op1, int)
-            if registers["Z"] == 0 and registers["N"] == 0:
-                self._jump_to(registers[op1])
-        elif opcode in _("JGE"):
-            assert isinstance(op1, int)
-            if registers["N"] == 0:
-                self._jump_to(registers[op1])
-        elif opcode in _("JLE"):
-            assert isinstance(op1, int)
-            if registers["Z"] == 1 or registers["N"] == 1:
-                self._jump_to(registers[op1])
-        elif opcode in _("JV"):
-            assert isinstance(op1, int)
-            if registers["V"] == 1:
-                self._jump_to(registers[op1])
-        elif opcode in _("JT"):
-            assert isinstance(op1, int)
-            if registers["T"] == 1:
-                self._jump_to(registers[op1])
-        elif opcode in _("JMP"):
-            assert isinstance(op1, int)
-            self._jump_to(registers[op1])
         # opcode == 'NOP' or invalid
         else:
             registers["PC"] += 1
@@ -266,59 +985,69 @@ class CPU:
 
     # Arithmetic and Logic Unit
     def alu(self, operation: int, in1: int, in2: int) -> int | None:
-        _ = self._opcodes
         registers = self.registers
 
         opcode = operation >> 2
-        bits = 8 if operation & 0b10 else 16
+        is_8bits = operation & 0b10
         result = None
 
         # Treat inputs as signed if desired
         signed = operation & 0b1
         if signed:
             # 8-bit inputs
-            if bits == 8:
-                in1 = c_int8(in1).value
-                in2 = c_int8(in2).value
+            if is_8bits:
+                in1 = _SEXT8[in1 & 0xFF]
+                in2 = _SEXT8[in2 & 0xFF]
             # 16-bit inputs
             else:
-                in1 = c_int16(in1).value
-                in2 = c_int16(in2).value
+                in1 = ((in1 & 0xFFFF) ^ 0x8000) - 0x8000
+                in2 = ((in2 & 0xFFFF) ^ 0x8000) - 0x8000
+
+        # Addition, subtraction, increment and decrement: set Overflow and Zero
+        if opcode in _ALU_ARITH:
+            if opcode == _OP_ADD:
+                result = in1 + in2
+            elif opcode == _OP_SUB:
+                result = in1 - in2
+            elif opcode == _OP_INC:
+                result = in1 + 1
+            else:
+                result = in1 - 1
+
+            if is_8bits and _FLAGS_MIN <= result < _FLAGS_MAX:
+                registers["V"], registers["Z"] = _ARITH8_FLAGS[result - _FLAGS_MIN]
+            else:
+                bits = 8 if is_8bits else 16
+                mask = 0xFF if is_8bits else 0xFFFF
+                registers["V"] = int(result >> bits != 0)
+                registers["Z"] = int(result & mask == 0)
+            return result
+
+        # Comparison: set Negative and Zero
+        if opcode == _OP_CMP:
+            tmp = in1 - in2
+            if _FLAGS_MIN <= tmp < _FLAGS_MAX:
+                registers["N"], registers["Z"] = _CMP_FLAGS[tmp - _FLAGS_MIN]
+            else:
+                registers["N"] = int(tmp < 0)
+                registers["Z"] = int(tmp == 0)
+            return None
 
         # Bitwise OR
-        if opcode in _("OR"):
+        if opcode == _OP_OR:
             result = in1 | in2
         # Bitwise AND
-        elif opcode in _("AND"):
+        elif opcode == _OP_AND:
             result = in1 & in2
         # Bitwise NOT
-        elif opcode in _("NOT"):
+        elif opcode == _OP_NOT:
             result = ~in1
-        # Increment
-        elif opcode in _("INC"):
-            result = in1 + 1
-            # Overflow
-            registers["V"] = int(result >> bits != 0)
-        # Decrement
-        elif opcode in _("DEC"):
-            result = in1 - 1
-            # Overflow
-            registers["V"] = int(result >> bits != 0)
         # Bitwise XOR
-        elif opcode in _("XOR"):
+        elif opcode == _OP_XOR:
             result = in1 ^ in2
-        # Addition
-        elif opcode in _("ADD"):
-            result = in1 + in2
-            # Overflow
-            registers["V"] = int(result >> bits != 0)
-        # Subtraction
-        elif opcode in _("SUB"):
-            result = in1 - in2
-            # Overflow
-            registers["V"] = int(result >> bits != 0)
         # Multiplication
-        elif opcode in _("MUL"):
+        elif opcode == _OP_MUL:
+            bits = 8 if is_8bits else 16
             result = in1 * in2
             # Transport handling (excess)
             if not signed:
@@ -331,24 +1060,19 @@ class CPU:
                 registers["N"] = int(result < 0)
                 registers["V"] = int(result >> bits != 0)
         # Division
-        elif opcode in _("DIV"):
+        elif opcode == _OP_DIV:
             result = in1 // in2
             if signed:
                 registers["N"] = int(result < 0)
         # Remainder
-        elif opcode in _("MOD"):
+        elif opcode == _OP_MOD:
             result = in1 % in2
             if signed:
                 registers["N"] = int(result < 0)
-        # Comparison
-        elif opcode in _("CMP"):
-            tmp = in1 - in2
-            registers["N"] = int(tmp < 0)
-            registers["Z"] = int(tmp == 0)
 
         # Zero
         if result is not None:
-            mask = 0xFF if bits == 8 else 0xFFFF
+            mask = 0xFF if is_8bits else 0xFFFF
             registers["Z"] = result & mask == 0 and 1 or 0
 
         return result
@@ -382,6 +1106,7 @@ class CPU:
         # Aliases
         registers = self.registers
         memory = self.memory
+        pc = registers["PC"]
 
         # Argument type
         argtype = self._arg_type(instr_word.opcode)
@@ -405,9 +1130,7 @@ class CPU:
                 if order == 1:
                     dcd.op1 = operand >> 4
                     # Getting memory reference
-                    registers["PC"] = registers["MBR"]
-                    registers["TMP"] = memory[registers["PC"]]
-                    registers["PC"] = registers["MAR"]
+                    self._load_operand(registers["MBR"], pc)
                     dcd.op2 = Registers.INDEX["TMP"]
                 # Reg, Const
                 elif order == 2:
@@ -416,10 +1139,8 @@ class CPU:
                 # Mem, Reg
                 else:
                     dcd.op2 = operand >> 4
-                    # Fetching memory reference
-                    registers["PC"] = registers["MBR"]
-                    registers["TMP"] = memory[registers["PC"]]
-                    registers["PC"] = registers["MAR"]
+                    # Fetching memory reference (a MOV doesn't use it)
+                    self._load_operand(registers["MBR"], pc, instr_word.opcode != _OP_MOV)
                     dcd.op1 = Registers.INDEX["TMP"]
                     # Setting memory address for store stage
                     dcd.store = registers["MBR"]
@@ -434,9 +1155,7 @@ class CPU:
             else:
                 # Fetching memory reference
                 registers["MAR"] = registers["PC"]
-                registers["PC"] = operand
-                registers["TMP"] = memory[registers["PC"]]
-                registers["PC"] = registers["MAR"]
+                self._load_operand(operand, pc)
                 dcd.op1 = Registers.INDEX["TMP"]
                 # Setting memory address for store stage
                 dcd.store = operand
@@ -455,9 +1174,7 @@ class CPU:
             elif order == 1:
                 # Fetching memory reference
                 registers["MAR"] = registers["PC"]
-                registers["PC"] = operand
-                registers["TMP"] = memory[registers["PC"]]
-                registers["PC"] = registers["MAR"]
+                self._load_operand(operand, pc)
                 dcd.op1 = Registers.INDEX["TMP"]
             # End => Constant
             elif order == 2:
@@ -474,9 +1191,7 @@ class CPU:
             else:
                 # Fetching memory reference
                 registers["MAR"] = registers["PC"]
-                registers["PC"] = operand
-                registers["TMP"] = memory[registers["PC"]]
-                registers["PC"] = registers["MAR"]
+                self._load_operand(operand, pc)
                 dcd.op1 = Registers.INDEX["TMP"]
                 # Setting memory address for store stage
                 dcd.store = operand
@@ -505,8 +1220,34 @@ class CPU:
 
         return dcd
 
+    # Helper to load TMP with a memory operand, the address passes through PC
+    def _load_operand(self, address: int, pc: int, used=True) -> None:
+        registers = self.registers
+        registers["PC"] = address
+        registers["TMP"] = self.memory[registers["PC"]]
+        registers["PC"] = registers["MAR"]
+
+        if self.shadow is not None and used:
+            self.shadow.check(address, pc)
+        if self.cache is not None and used:
+            self.cache.read(address)
+
+        watched = self._watched
+        if watched is not None and used and watched[address >> 3] >> (address & 7) & 1:
+            self._watch_read(address, pc)
+
     # Helper to jump instructions
     def _jump_to(self, newpc):
+        # Every loop runs a jump to a lower or the same address
+        if self.loop_detector is not None and newpc <= self.registers["PC"]:
+            self.loop_detector.on_back_jump()
+        if self.profiler is not None:
+            self.profiler.on_jump(self.registers["PC"], newpc)
+
+        if self.events.jump:
+            for subscriber in self.events.jump:
+                subscriber((self.registers["PC"], newpc))
+
         self.registers["PC"] = newpc
         self.stage = Stage.FETCH
 
@@ -515,26 +1256,7 @@ class CPU:
             yield OPCODES[name]
 
     def _arg_type(self, opcode):
-        _ = self._opcodes
-
-        if opcode in _("MOV", "ADD", "SUB", "MUL", "OR", "AND", "XOR", "DIV", "MOD"):
-            return "DST_ORI"
-
-        if opcode in _("CMP"):
-            return "OP1_OP2"
-
-        if opcode in _("SHR", "SHL"):
-            return "OP_QNT"
-
-        if opcode in _(
-            "JZ", "JE", "JNZ", "JNE", "JN", "JLT", "JP", "JGT", "JGE", "JLE", "JV", "JT", "JMP"
-        ):
-            return "JUMP"
-
-        if opcode in _("INC", "DEC", "NOT"):
-            return "OP"
-
-        return "NOARG"
+        return ARG_TYPES.get(opcode, "NOARG")
 
 
 class Registers:
@@ -561,10 +1283,21 @@ class Registers:
 
     def __init__(self) -> None:
         self._regwords: dict[int, RegisterWord] = {}
+        # Hook of register writes, set by the CPU event bus
+        self._on_write: None | Callable[[int, int, int], None] = None
+        # Registers whose changes are added to the `_changed` mask, set by the event ring
+        self._tracked = 0
+        self._changed = 0
+        # Any of the above, so writes without them cost a single test
+        self._hooked = False
+        # Registers holding their own value (8-bit registers are views of the X registers)
+        self._storage: list[BaseReg] = []
 
         # Internal function to set register objects
         def init_register(name: str, register: BaseReg):
             self._regwords[Registers.INDEX[name]] = RegisterWord(register)
+            if not isinstance(register, (RegH, RegL)):
+                self._storage.append(register)
 
         #
         ## Generic registers
@@ -604,8 +1337,16 @@ class Registers:
         init_register("TMP", Reg16())
 
     def clear(self):
-        for w in self._regwords.values():
-            w._reg.value = 0
+        for reg in self._storage:
+            reg.value = 0
+
+    def snapshot(self) -> tuple[int, ...]:
+        """Values of every register"""
+        return tuple(reg.value for reg in self._storage)
+
+    def restore(self, values: tuple[int, ...]) -> None:
+        for reg, value in zip(self._storage, values):
+            reg.value = value
 
     def get_reg(self, key: int | str) -> BaseReg:
         assert isinstance(key, (int, str))
@@ -629,7 +1370,17 @@ class Registers:
         )
 
         # copy value and metadata
-        regword._reg.value = word.value
+        reg = regword._reg
+        if self._hooked and (self._on_write is not None or self._tracked >> key & 1):
+            old = reg.value
+            reg.value = word.value
+            new = reg.value
+            if new != old:
+                self._changed |= (1 << key) & self._tracked
+            if self._on_write is not None:
+                self._on_write(key, old, new)
+        else:
+            reg.value = word.value
         regword.is_instruction = word.is_instruction
         regword.lineno = word.lineno
 
@@ -648,8 +1399,26 @@ class Registers:
         if isinstance(key, str):
             key = Registers.INDEX[key]
 
+        if self._hooked and (self._on_write is not None or self._tracked >> key & 1):
+            reg = self._regwords[key]._reg
+            old = reg.value
+            reg.value = value
+            new = reg.value
+            if new != old:
+                self._changed |= (1 << key) & self._tracked
+            if self._on_write is not None:
+                self._on_write(key, old, new)
+            return
+
         self._regwords[key]._reg.value = value
 
+    def _set_hooks(
+        self, on_write: None | Callable[[int, int, int], None], tracked: int
+    ) -> None:
+        self._on_write = on_write
+        self._tracked = tracked
+        self._hooked = on_write is not None or tracked != 0
+
     def __getitem__(self, key: int | str) -> int:
         assert isinstance(key, (int, str))
 
@@ -663,12 +1432,72 @@ class Registers:
             yield id, word._reg
 
 
+class _Page:
+    """Words of a memory page: values, instruction flags and line numbers"""
+
+    __slots__ = ("instructions", "lines", "owner", "values")
+
+    def __init__(self, owner: object) -> None:
+        # Only the memory holding the owner token can write to the page, any other copies it
+        self.owner = owner
+        self.values = array("H", bytes(2 * PAGE_SIZE))
+        self.instructions = bytearray(PAGE_SIZE)
+        self.lines = array("I", bytes(4 * PAGE_SIZE))
+
+    def copy(self, owner: object) -> _Page:
+        page = _Page.__new__(_Page)
+        page.owner = owner
+        page.values = array("H", self.values)
+        page.instructions = bytearray(self.instructions)
+        page.lines = array("I", self.lines)
+        return page
+
+
+class MemorySnapshot:
+    """Memory contents at some point, sharing the pages with the memory until written"""
+
+    def __init__(self, size: int, pages: tuple[None | _Page, ...]) -> None:
+        self.size = size
+        self._pages = pages
+
+
 class Memory:
+    """Sparse memory of 16-bit words
+
+    The address space is split in pages of `PAGE_SIZE` words, each allocated on the first
+    write to it. Reading a word of a page never written gives zero.
+
+    Pages are copy-on-write: a snapshot shares the pages with the memory, and the first write
+    to a shared page copies only that page.
+    """
+
     def __init__(self, size: int) -> None:
         self._size = size
-        self._space: list[Word] = []
-        for i in range(size):
-            self._space.append(DWord())
+        self._pages: list[None | _Page] = [None] * ((size + PAGE_SIZE - 1) >> PAGE_BITS)
+        # Token owning the pages this memory can write in place
+        self._token = object()
+
+        self._observers: list[MemoryObserver] = []
+
+    def attach(self, observer: MemoryObserver) -> None:
+        """Notify the observer of every write to this memory"""
+        self._observers.append(observer)
+
+    def detach(self, observer: MemoryObserver) -> None:
+        self._observers.remove(observer)
+
+    def _notify(self, address: int, old: int, new: int) -> None:
+        for observer in self._observers:
+            observer.on_write(address, old, new)
+
+    def _page(self, address: int) -> _Page:
+        # Page of the address to write, allocated or copied if needed
+        page = self._pages[address >> PAGE_BITS]
+        if page is None:
+            page = self._pages[address >> PAGE_BITS] = _Page(self._token)
+        elif page.owner is not self._token:
+            page = self._pages[address >> PAGE_BITS] = page.copy(self._token)
+        return page
 
     def set_word(self, address: int, word: Word) -> None:
         assert isinstance(address, int)
@@ -677,19 +1506,25 @@ class Memory:
         if not (0 <= address < self._size):
             raise CPUException("Address out of memory range")
 
-        space_word = self._space[address]
-        space_word.is_instruction = word.is_instruction
-        space_word.value = word.value
+        page = self._page(address)
+        offset = address & PAGE_MASK
+        old = page.values[offset]
+        page.values[offset] = word.value
+        page.instructions[offset] = word.is_instruction
         if word.is_instruction:
-            space_word.lineno = word.lineno
+            page.lines[offset] = word.lineno
+
+        if self._observers:
+            self._notify(address, old, word.value)
 
     def get_word(self, address: int) -> Word:
+        """Return a view of the word at the address"""
         assert isinstance(address, int)
 
         if not (0 <= address < self._size):
             raise CPUException("Address out of memory range")
 
-        return self._space[address]
+        return MemoryWord(self, address)
 
     def __setitem__(self, address: int, data: int) -> None:
         assert isinstance(address, int)
@@ -698,7 +1533,14 @@ class Memory:
         if not (0 <= address < self._size):
             raise CPUException("Address out of memory range")
 
-        self._space[address].value = data
+        values = self._page(address).values
+        offset = address & PAGE_MASK
+        if self._observers:
+            old = values[offset]
+            values[offset] = data & 0xFFFF
+            self._notify(address, old, values[offset])
+        else:
+            values[offset] = data & 0xFFFF
 
     def __getitem__(self, address: int) -> int:
         assert isinstance(address, int)
@@ -706,26 +1548,262 @@ class Memory:
         if not (0 <= address < self._size):
             raise CPUException("Address out of memory range")
 
-        return self._space[address].value
+        page = self._pages[address >> PAGE_BITS]
+        if page is None:
+            return 0
+        return page.values[address & PAGE_MASK]
 
     def __iter__(self) -> Iterator[tuple[int, Word]]:
-        for w in enumerate(self._space):
-            yield w
+        for address in range(self._size):
+            yield address, MemoryWord(self, address)
+
+    #
+    ## Bulk operations, checking the range once per call
+    #
+
+    def _check_range(self, address: int, count: int) -> None:
+        if not (0 <= address and 0 <= count and address + count <= self._size):
+            raise CPUException("Address out of memory range")
+
+    def _spans(self, address: int, count: int) -> Iterator[tuple[int, int, int, int]]:
+        # Split a range by pages: page number, offset in the page, length, position in the range
+        position = 0
+        while position < count:
+            start = address + position
+            offset = start & PAGE_MASK
+            length = min(PAGE_SIZE - offset, count - position)
+            yield start >> PAGE_BITS, offset, length, position
+            position += length
+
+    def load_words(self, address: int, words: Sequence[Word]) -> None:
+        """Write words with their metadata, the same as `set_word` for each one"""
+        self._check_range(address, len(words))
+
+        observers = self._observers
+        for number, offset, length, position in self._spans(address, len(words)):
+            page = self._page(number << PAGE_BITS)
+            values, instructions, lines = page.values, page.instructions, page.lines
+            for index in range(offset, offset + length):
+                word = words[position + index - offset]
+                old = values[index]
+                values[index] = word.value
+                instructions[index] = word.is_instruction
+                if word.is_instruction:
+                    lines[index] = word.lineno
+                if observers:
+                    self._notify((number << PAGE_BITS) | index, old, values[index])
+
+    def load(self, address: int, data: Sequence[int] | Buffer) -> None:
+        """Write data words from a sequence of ints or a buffer of 16-bit words
+
+        A buffer (e.g. an `array("H")`, a NumPy `uint16` array or bytes in native order) is
+        copied straight to the memory pages.
+        """
+        words = _as_words(data)
+        self._check_range(address, len(words))
+
+        for number, offset, length, position in self._spans(address, len(words)):
+            page = self._page(number << PAGE_BITS)
+            old = page.values[offset : offset + length] if self._observers else None
+            with memoryview(page.values) as values:
+                values[offset : offset + length] = words[position : position + length]
+            page.instructions[offset : offset + length] = bytes(length)
+            if old is not None:
+                base = (number << PAGE_BITS) | offset
+                for index, new in enumerate(page.values[offset : offset + length]):
+                    self._notify(base + index, old[index], new)
+
+    def read(self, address: int, count: int) -> array[int]:
+        """Return a copy of the values in a range"""
+        self._check_range(address, count)
+
+        result = array("H", bytes(2 * count))
+        for number, offset, length, position in self._spans(address, count):
+            page = self._pages[number]
+            if page is not None:
+                result[position : position + length] = page.values[offset : offset + length]
+        return result
+
+    def view(self, address: int, count: int) -> memoryview:
+        """Return a read-only view of the values in a range
+
+        A range in a single page is viewed without copying, and it's only valid until the next
+        write to memory. Other ranges are copied.
+        """
+        self._check_range(address, count)
+
+        if count and address >> PAGE_BITS == (address + count - 1) >> PAGE_BITS:
+            page = self._pages[address >> PAGE_BITS]
+            values = _ZERO_PAGE if page is None else page.values
+            offset = address & PAGE_MASK
+            return memoryview(values)[offset : offset + count].toreadonly()
+
+        return memoryview(self.read(address, count)).toreadonly()
+
+    def numpy(self, address: int, count: int) -> numpy.ndarray:
+        """Return the values in a range as a read-only NumPy array (see `view`)"""
+        import numpy
+
+        return numpy.frombuffer(self.view(address, count), dtype=numpy.uint16)
+
+    def fill(self, address: int, count: int, value: int) -> None:
+        """Write the same data word to a range"""
+        self._check_range(address, count)
+
+        for number, offset, length, _ in self._spans(address, count):
+            # A page never written is already zeroed
+            if value == 0 and self._pages[number] is None and not self._observers:
+                continue
+            page = self._page(number << PAGE_BITS)
+            old = page.values[offset : offset + length] if self._observers else None
+            page.values[offset : offset + length] = array("H", [value & 0xFFFF]) * length
+            page.instructions[offset : offset + length] = bytes(length)
+            if old is not None:
+                base = (number << PAGE_BITS) | offset
+                for index in range(length):
+                    self._notify(base + index, old[index], value & 0xFFFF)
+
+    def copy(self, source: int, target: int, count: int) -> None:
+        """Copy the values of a range to another, written as data words
+
+        The ranges can overlap.
+        """
+        self.load(target, self.read(source, count))
+
+    def compare(self, address: int, data: Sequence[int] | Buffer) -> None | int:
+        """Compare a range with the data words, return the first address differing or None"""
+        words = _as_words(data)
+        values = self.read(address, len(words))
+        if memoryview(values) == words:
+            return None
+
+        for index, (value, word) in enumerate(zip(values, words)):
+            if value != word:
+                return address + index
+        return None
 
     def clear(self):
-        for word in self._space:
-            word.value = 0
+        self._pages = [None] * len(self._pages)
+
+        for observer in self._observers:
+            observer.on_clear()
+
+    def snapshot(self) -> MemorySnapshot:
+        """Take the current contents, without copying any page"""
+        snapshot = MemorySnapshot(self._size, tuple(self._pages))
+        # Every page is now shared with the snapshot
+        self._token = object()
+        return snapshot
+
+    def restore(self, snapshot: MemorySnapshot) -> None:
+        """Bring back the contents of a snapshot, without copying any page"""
+        if snapshot.size != self._size:
+            raise CPUException("Snapshot of a memory with another size")
+
+        old_pages = self._pages
+        self._pages = list(snapshot._pages)
+        self._token = object()
+
+        # Observers see the words changed by the restore as written
+        if self._observers:
+            for number, (old_page, new_page) in enumerate(zip(old_pages, self._pages)):
+                if old_page is new_page:
+                    continue
+                old_values = _ZERO_PAGE if old_page is None else old_page.values
+                new_values = _ZERO_PAGE if new_page is None else new_page.values
+                if old_values == new_values:
+                    continue
+                base = number << PAGE_BITS
+                for offset, (old, new) in enumerate(zip(old_values, new_values)):
+                    if old != new:
+                        self._notify(base | offset, old, new)
 
     @property
     def size(self) -> int:
         return self._size
 
+    @property
+    def extent(self) -> int:
+        """Address after the last allocated page, every word from there on is zero"""
+        for number in range(len(self._pages) - 1, -1, -1):
+            if self._pages[number] is not None:
+                return min((number + 1) << PAGE_BITS, self._size)
+        return 0
+
+
+def _as_words(data: Sequence[int] | Buffer) -> memoryview:
+    # View data as 16-bit words, copying only when not a buffer. Ints are truncated to 16 bits,
+    # as when written one by one.
+    if not isinstance(data, Buffer):
+        return memoryview(array("H", [value & 0xFFFF for value in data]))
+
+    view = memoryview(data)
+    # The length of the view is of the first dimension only
+    if view.ndim != 1:
+        raise CPUException(f"Data buffer is not one-dimensional ({view.ndim} dimensions)")
+    if view.format == "H":
+        return view
+    if not view.c_contiguous:
+        raise CPUException("Data buffer is not contiguous")
+    if view.format in ("h", "B", "b", "c") and view.nbytes % 2 == 0:
+        # Signed words or raw bytes of words
+        return view.cast("B").cast("H")
+    raise CPUException(
+        f"Data buffer is not of 16-bit words (format '{view.format}', {view.nbytes} bytes)"
+    )
+
+
+class MemoryWord(Word):
+    """View of a memory word, reading and writing through the memory"""
+
+    bits = 16
+
+    def __init__(self, memory: Memory, address: int) -> None:
+        self._memory = memory
+        self._address = address
+
+    @property
+    def address(self) -> int:
+        return self._address
+
+    @Word.value.getter
+    @override
+    def value(self) -> int:
+        return self._memory[self._address]
+
+    @value.setter  # type: ignore[no-redef]
+    @override
+    def value(self, val: int) -> None:
+        self._memory[self._address] = val
+
+    @Word.is_instruction.getter
+    @override
+    def is_instruction(self) -> bool:
+        page = self._memory._pages[self._address >> PAGE_BITS]
+        return page is not None and bool(page.instructions[self._address & PAGE_MASK])
+
+    @is_instruction.setter  # type: ignore[no-redef]
+    @override
+    def is_instruction(self, switch: bool) -> None:
+        self._memory._page(self._address).instructions[self._address & PAGE_MASK] = switch
+
+    @property  # type: ignore[override]
+    def lineno(self) -> int:
+        page = self._memory._pages[self._address >> PAGE_BITS]
+        return 0 if page is None else page.lines[self._address & PAGE_MASK]
+
+    @lineno.setter
+    def lineno(self, lineno: int) -> None:
+        self._memory._page(self._address).lines[self._address & PAGE_MASK] = lineno
+
 
 class RegisterWord(Word):
     bits = 16
 
     def __init__(self, register: BaseReg):
         self._reg = register
+        self._instruction = False
+        self.lineno = 0
 
     @Word.value.getter
     @override
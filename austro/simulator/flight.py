@@ -0,0 +1,159 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Flight recorder of the last instructions run, to diagnose faults"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, NamedTuple
+
+from austro.simulator.cpu import CPU, CPUException, Event, Registers, Stage
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPUSnapshot
+
+
+# Default number of instructions kept
+RECORDER_SIZE = 64
+
+# Name of each register index
+_NAMES = {index: name for name, index in Registers.INDEX.items()}
+# Registers written by every instruction, left out of the deltas
+_INTERNAL = frozenset(Registers.INDEX[name] for name in ("PC", "MAR", "MBR", "RI", "TMP"))
+
+
+class FlightRecord(NamedTuple):
+    pc: int
+    word: int  # instruction word
+    lineno: int  # 0 if unknown
+    deltas: dict[str, tuple[int, int]]  # (old, new) by register name
+
+    def __str__(self) -> str:
+        deltas = ", ".join(
+            f"{name}: {old} -> {new}" for name, (old, new) in self.deltas.items()
+        )
+        line = f"line {self.lineno}" if self.lineno else "no line"
+        return f"{self.pc:5}  0x{self.word:04X}  {line:10}  {deltas}".rstrip()
+
+
+class FlightRecorder:
+    """Keep the last instructions run with the registers they changed
+
+    Instructions are kept in a circular buffer, only their address and word written when
+    fetched, and the machine state is taken every `size` instructions (memory pages are shared,
+    not copied). The register changes and lines are found only when the records are taken, by
+    running again the last instructions from a state taken before them, so the recorder is
+    cheap enough to be always attached.
+    """
+
+    def __init__(self, cpu: CPU, size: int = RECORDER_SIZE) -> None:
+        self.cpu = cpu
+        self.size = size
+
+        self._pcs = array("H", bytes(2 * size))
+        self._words = array("H", bytes(2 * size))
+        self.clear()
+
+        cpu.events.subscribe(Event.FETCH, self._on_fetch)
+
+    def detach(self) -> None:
+        self.cpu.events.unsubscribe(Event.FETCH, self._on_fetch)
+
+    def clear(self) -> None:
+        self._count = 0  # instructions kept
+        self._fetches = 0  # instructions fetched since cleared
+        # Last two states taken, by the number of the instruction just fetched
+        self._states: list[tuple[int, CPUSnapshot]] = []
+
+    def records(self) -> list[FlightRecord]:
+        """The instructions kept, the oldest first"""
+        memory = self.cpu.memory
+        first = self._fetches - self._count
+        deltas = self._replay(first)
+
+        records = []
+        for number in range(first, self._fetches):
+            slot = number % self.size
+            pc = self._pcs[slot]
+            lineno = memory.get_word(pc).lineno if pc < memory.size else 0
+            changes = deltas[number - first] if number - first < len(deltas) else {}
+            records.append(FlightRecord(pc, self._words[slot], lineno, changes))
+        return records
+
+    def dump(self) -> list[str]:
+        """The records as text lines"""
+        return [str(record) for record in self.records()]
+
+    def _on_fetch(self, payload: tuple) -> None:
+        number = self._fetches
+        slot = number % self.size
+        self._pcs[slot] = payload[0]
+        self._words[slot] = payload[1]
+        if self._count < self.size:
+            self._count += 1
+        self._fetches = number + 1
+
+        if slot == 0:
+            self._states = [*self._states[-1:], (number, self.cpu.snapshot())]
+
+    def _replay(self, first: int) -> list[dict[str, tuple[int, int]]]:
+        # Run again on a copy from the last state before the instruction `first`, recording
+        # the register changes of each instruction from it
+        states = [state for state in self._states if state[0] <= first]
+        if not states:
+            return []
+        number, state = states[-1]
+
+        cpu = CPU(address_space=self.cpu.memory.size)
+        cpu.restore(state)
+        # The state is taken during the fetch
+        cpu.stage = Stage.DECODE
+
+        deltas: list[dict[str, tuple[int, int]]] = [{}] if number == first else []
+        diverged = False
+
+        def on_fetch(payload: tuple) -> None:
+            nonlocal number, diverged
+            number += 1
+            if first <= number < self._fetches:
+                if payload[0] != self._pcs[number % self.size]:
+                    # The machine was not left running (e.g. it was restored)
+                    diverged = True
+                deltas.append({})
+
+        def on_register_write(payload: tuple) -> None:
+            index, old, new = payload
+            if number >= first and old != new and index not in _INTERNAL:
+                name = _NAMES[index]
+                changes = deltas[-1]
+                # First value before the instruction, last one after
+                changes[name] = (changes[name][0] if name in changes else old, new)
+
+        cpu.events.subscribe(Event.FETCH, on_fetch)
+        cpu.events.subscribe(Event.REGISTER_WRITE, on_register_write)
+
+        # The last instruction is not run yet when stopped after its fetch
+        end = self._fetches - 1 if self.cpu.stage == Stage.DECODE else self._fetches
+        while number < end and not diverged and cpu.stage not in (Stage.HALTED, Stage.STOPPED):
+            try:
+                next(cpu)
+            except CPUException:
+                break
+
+        return [] if diverged else deltas
@@ -0,0 +1,126 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Infinite loop detection by hashing the machine state"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, override
+
+from austro.simulator.cfg import build_cfg
+from austro.simulator.cpu import CPUException, MemoryObserver
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPU
+
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def _word_hash(address: int, value: int) -> int:
+    """Hash of a memory word, zero for a zeroed word (splitmix64 finalizer)"""
+    if value == 0:
+        return 0
+    key = (address << 16) | value
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return key ^ (key >> 31)
+
+
+class InfiniteLoopDetector(MemoryObserver):
+    """Detect a program that will never halt
+
+    The CPU has no input, so when the complete machine state repeats, the program will repeat
+    itself forever. The state is hashed on every jump to a lower or the same address (every
+    loop has one of these) and compared to a checkpoint replaced at doubling intervals (Brent's
+    cycle detection). Any loop is then detected in at most twice its length plus the run before
+    entering it, with no stored history.
+
+    The memory hash is a XOR of the hash of each word, updated on every write, so each check
+    costs the same whatever the memory size. Registers are few and hashed on each check.
+    """
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+
+        self._memory_hash = 0
+        memory = cpu.memory
+        for address in range(memory.extent):
+            self._memory_hash ^= _word_hash(address, memory[address])
+
+        self.reset()
+
+        cpu.memory.attach(self)
+        cpu.loop_detector = self
+
+    def detach(self) -> None:
+        self.cpu.memory.detach(self)
+        self.cpu.loop_detector = None
+
+    def reset(self) -> None:
+        """Forget the states seen, as when a new program is loaded"""
+        self._checkpoint: None | int = None
+        self._power = 1
+        self._steps = 0
+
+    @override
+    def on_write(self, address: int, old: int, new: int) -> None:
+        self._memory_hash ^= _word_hash(address, old) ^ _word_hash(address, new)
+
+    @override
+    def on_clear(self) -> None:
+        self._memory_hash = 0
+
+    def on_back_jump(self) -> None:
+        registers = self.cpu.registers
+        state = hash((self._memory_hash, *(reg.value for _, reg in registers)))
+
+        if state == self._checkpoint:
+            pc = registers["PC"]
+            raise InfiniteLoopException(pc, registers.get_word("RI").lineno, self._lines(pc))
+
+        # Move the checkpoint forward at powers of two
+        self._steps += 1
+        if self._steps == self._power:
+            self._checkpoint = state
+            self._power *= 2
+            self._steps = 0
+
+    def _lines(self, pc: int) -> None | tuple[int, int]:
+        # Lines of the innermost loop closed by the jump
+        cfg = build_cfg(self.cpu.memory)
+        block = cfg.block_at(pc)
+        if block is None:
+            return None
+        loops = [loop for loop in cfg.loops if block.start in loop.blocks and loop.first_line]
+        if not loops:
+            return None
+        loop = min(loops, key=lambda loop: len(loop.blocks))
+        return loop.first_line, loop.last_line
+
+
+class InfiniteLoopException(CPUException):
+    def __init__(self, pc: int, lineno: int, lines: None | tuple[int, int] = None) -> None:
+        message = f"Infinite loop detected at address {pc}"
+        if lineno:
+            message += f" (line {lineno})"
+        super().__init__(message)
+
+        self.pc = pc
+        self.lineno = lineno
+        self.lines = lines
@@ -0,0 +1,257 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Timing of the instructions run in a pipeline"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, NamedTuple
+
+from austro.asm.assembler import OPCODES
+from austro.simulator.cpu import CPU, Event, memory_accesses
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import Accesses
+
+
+_OP_MOV = OPCODES["MOV"]
+_OP_CMP = OPCODES["CMP"]
+
+# Memory accesses of each instruction indexed by the high byte of its word (opcode and flags)
+_ACCESSES = tuple(memory_accesses(high >> 3, high & 0b111) for high in range(256))
+
+# Registers with a value of their own, an 8-bit register is a part of its X register
+_GENERAL = 16
+
+
+def _storage(register: int) -> int:
+    return 8 + (register >> 1) if register < 8 else register
+
+
+class PipelineStats(NamedTuple):
+    instructions: int
+    cycles: int
+    data_stalls: int  # cycles waiting for a register written by a previous instruction
+    structural_stalls: int  # cycles waiting for the memory, busy with another stage
+    bubbles: int  # cycles of the instructions fetched after a jump taken, then discarded
+
+    @property
+    def cpi(self) -> float:
+        """Cycles per instruction"""
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+
+class PipelineModel:
+    """Time the instructions run as if the stages of consecutive instructions overlapped
+
+    Each instruction goes through FETCH, DECODE, EXECUTE and STORE in order, a cycle each, and
+    a new instruction is fetched every cycle. The CPU still runs one instruction at a time, the
+    model only follows the events, so the results of a program are the same with or without it.
+
+    Hazards delay an instruction:
+
+    - data: the registers read on decode must have been stored by the previous instructions,
+      there is no forwarding;
+    - structural: there is a single memory port, so the second word of an instruction and its
+      memory operands, read on decode, and its memory result, written on store, hold the
+      fetch of the next instructions;
+    - control: jumps are resolved on execute, so the instructions fetched after a jump taken
+      are discarded (predicted not taken).
+
+    Stalls and bubbles are counted by the address of the instruction delayed, bubbles by the
+    jump causing them. Subscribing to the decode stage keeps instructions from being fused.
+    """
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+
+        size = cpu.memory.size
+        self._counts = array("I", bytes(4 * size))
+        self._stalls = array("I", bytes(4 * size))
+        self._bubbles = array("I", bytes(4 * size))
+        self.clear()
+
+        events = cpu.events
+        events.subscribe(Event.FETCH, self._on_fetch)
+        events.subscribe(Event.DECODE, self._on_decode)
+        events.subscribe(Event.JUMP, self._on_jump)
+        events.subscribe(Event.HALT, self._on_end)
+        events.subscribe(Event.FAULT, self._on_end)
+
+    def detach(self) -> None:
+        events = self.cpu.events
+        events.unsubscribe(Event.FETCH, self._on_fetch)
+        events.unsubscribe(Event.DECODE, self._on_decode)
+        events.unsubscribe(Event.JUMP, self._on_jump)
+        events.unsubscribe(Event.HALT, self._on_end)
+        events.unsubscribe(Event.FAULT, self._on_end)
+
+    def clear(self) -> None:
+        """Forget the instructions timed, as when the program is run again"""
+        for counters in self._counts, self._stalls, self._bubbles:
+            counters[:] = array("I", bytes(4 * len(counters)))
+
+        self.instructions = 0
+        self.cycles = 0
+        self.data_stalls = 0
+        self.structural_stalls = 0
+        self.bubbles = 0
+
+        # Instruction fetched and not timed yet: address, accesses, sources, destination, taken
+        self._pending: None | list = None
+        # Cycle of the next fetch, and the first cycle each later stage is free
+        self._fetch_at = 0
+        self._decode_free = 0
+        self._execute_free = 0
+        self._store_free = 0
+        # First cycle the value of each general register can be read
+        self._ready = [0] * _GENERAL
+        # Cycles the memory port is taken by decode or store, at or after the next fetch
+        self._port: set[int] = set()
+
+    @property
+    def stats(self) -> PipelineStats:
+        return PipelineStats(
+            self.instructions,
+            self.cycles,
+            self.data_stalls,
+            self.structural_stalls,
+            self.bubbles,
+        )
+
+    def by_address(self) -> dict[int, tuple[int, int, int]]:
+        """Times run, stalls and bubbles of each instruction, by its address"""
+        return {
+            pc: (count, self._stalls[pc], self._bubbles[pc])
+            for pc, count in enumerate(self._counts)
+            if count
+        }
+
+    def report(self) -> dict:
+        """Timing of the whole program and by instruction, to be exported as JSON"""
+        memory = self.cpu.memory
+        return {
+            **self.stats._asdict(),
+            "cpi": self.stats.cpi,
+            "addresses": [
+                {
+                    "pc": pc,
+                    "line": memory.get_word(pc).lineno,
+                    "count": count,
+                    "stalls": stalls,
+                    "bubbles": bubbles,
+                }
+                for pc, (count, stalls, bubbles) in self.by_address().items()
+            ],
+        }
+
+    def _on_fetch(self, payload: tuple) -> None:
+        if self._pending is not None:
+            self._time(*self._pending)
+        pc, word = payload
+        self._pending = [pc, _ACCESSES[word >> 8], [], None, False]
+
+    def _on_decode(self, payload: tuple) -> None:
+        pending = self._pending
+        if pending is None:
+            return
+        _, unit, operation, op1, op2 = payload
+        sources = [] if op2 is None or op2 >= _GENERAL else [op2]
+        if op1 is not None and op1 < _GENERAL:
+            if unit == CPU.UC:
+                # A MOV stores the first operand, a jump reads its address from it
+                if operation == _OP_MOV:
+                    pending[3] = op1
+                else:
+                    sources.append(op1)
+            else:
+                sources.append(op1)
+                # An ALU operation is the opcode above two bits of flags, a CMP stores nothing
+                if unit == CPU.SHIFT or operation >> 2 != _OP_CMP:
+                    pending[3] = op1
+        pending[2] = sources
+
+    def _on_jump(self, payload: tuple) -> None:
+        if self._pending is not None:
+            self._pending[4] = True
+
+    def _on_end(self, payload: tuple) -> None:
+        if self._pending is not None:
+            self._time(*self._pending)
+            self._pending = None
+
+    def _time(
+        self, pc: int, accesses: Accesses, sources: list[int], dest: None | int, taken: bool
+    ) -> None:
+        """Place the stages of an instruction in the first cycles free"""
+        port = self._port
+
+        # Fetch, when the memory is not taken by a previous instruction
+        fetch = self._fetch_at
+        while fetch in port:
+            fetch += 1
+        structural = fetch - self._fetch_at
+
+        # Decode, reading the registers and the words after the instruction word
+        start = max(fetch + 1, self._decode_free)
+        ready = max((self._ready[_storage(s)] for s in sources), default=0)
+        data = max(0, ready - start)
+        decode = start + data
+        extra = accesses.words - 1 + accesses.reads
+        cycle = decode
+        while extra:
+            if cycle in port:
+                structural += 1
+            else:
+                port.add(cycle)
+                extra -= 1
+            cycle += 1
+        decode_end = max(decode, cycle - 1)
+
+        execute = max(decode_end + 1, self._execute_free)
+        store = max(execute + 1, self._store_free)
+        if accesses.writes:
+            while store in port:
+                store += 1
+                structural += 1
+            port.add(store)
+
+        self._decode_free = decode_end + 1
+        self._execute_free = execute + 1
+        self._store_free = store + 1
+        if dest is not None:
+            self._ready[_storage(dest)] = store + 1
+
+        # The next instruction is fetched when this one leaves the fetch stage, or after the
+        # jump is resolved
+        bubbles = execute + 1 - start if taken else 0
+        self._fetch_at = start + bubbles
+
+        # Forget the port cycles already passed
+        if len(port) > 64:
+            self._port = {c for c in port if c >= self._fetch_at}
+
+        self.instructions += 1
+        self.cycles = store + 1
+        self.data_stalls += data
+        self.structural_stalls += structural
+        self.bubbles += bubbles
+        self._counts[pc] += 1
+        self._stalls[pc] += data + structural
+        self._bubbles[pc] += bubbles
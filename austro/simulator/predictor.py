@@ -0,0 +1,238 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Branch predictors observing the conditional jumps"""
+
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from array import array
+from typing import TYPE_CHECKING, NamedTuple, override
+
+from austro.simulator.cpu import CPUException
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPU
+
+
+class BranchStats(NamedTuple):
+    branches: int  # conditional jumps executed
+    correct: int  # outcomes predicted
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.branches if self.branches else 0.0
+
+
+class BranchPredictor(metaclass=ABCMeta):
+    """Predict the outcome of each conditional jump, before the CPU resolves it
+
+    The CPU calls `on_branch` with the address of every conditional jump executed (JMP is not
+    a branch) and whether it was taken. The prediction is counted by address in arrays of the
+    address space size, and the predictor is then updated with the outcome. When no predictor
+    is attached, the CPU pays a single `is None` test per jump.
+    """
+
+    name = ""
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+        self._branches = array("I", bytes(4 * cpu.memory.size))
+        self._correct = array("I", bytes(4 * cpu.memory.size))
+
+        cpu.predictor = self
+
+    def detach(self) -> None:
+        self.cpu.predictor = None
+
+    def reset(self) -> None:
+        """Forget the branches seen and the predictor state"""
+        size = self.cpu.memory.size
+        self._branches = array("I", bytes(4 * size))
+        self._correct = array("I", bytes(4 * size))
+
+    def on_branch(self, pc: int, taken: bool) -> None:
+        self._branches[pc] += 1
+        if self.predict(pc, taken) == taken:
+            self._correct[pc] += 1
+
+    @abstractmethod
+    def predict(self, pc: int, taken: bool) -> bool:
+        """Return the prediction for the jump at the address, then learn the actual outcome"""
+
+    @property
+    def stats(self) -> BranchStats:
+        return BranchStats(sum(self._branches), sum(self._correct))
+
+    def by_address(self) -> dict[int, BranchStats]:
+        """Statistics of each conditional jump executed, by its address"""
+        return {
+            pc: BranchStats(count, self._correct[pc])
+            for pc, count in enumerate(self._branches)
+            if count
+        }
+
+    def by_line(self) -> dict[int, BranchStats]:
+        """Statistics of the conditional jumps by source line, 0 for jumps without a line"""
+        lines: dict[int, BranchStats] = {}
+        memory = self.cpu.memory
+        for pc, stats in self.by_address().items():
+            lineno = memory.get_word(pc).lineno
+            branches, correct = lines.get(lineno, (0, 0))
+            lines[lineno] = BranchStats(branches + stats.branches, correct + stats.correct)
+        return dict(sorted(lines.items()))
+
+    def report(self) -> dict:
+        """Accuracy of the predictor in total, by address and by line, to be exported as JSON"""
+        stats = self.stats
+        return {
+            "predictor": self.name,
+            "branches": stats.branches,
+            "correct": stats.correct,
+            "accuracy": stats.accuracy,
+            "addresses": [
+                {"pc": pc, **s._asdict(), "accuracy": s.accuracy}
+                for pc, s in self.by_address().items()
+            ],
+            "lines": [
+                {"line": line, **s._asdict(), "accuracy": s.accuracy}
+                for line, s in self.by_line().items()
+            ],
+        }
+
+
+class StaticPredictor(BranchPredictor):
+    """Always predict the same outcome"""
+
+    def __init__(self, cpu: CPU, taken: bool = True) -> None:
+        super().__init__(cpu)
+        self.taken = taken
+        self.name = "taken" if taken else "not-taken"
+
+    @override
+    def predict(self, pc: int, taken: bool) -> bool:
+        return self.taken
+
+
+class _TablePredictor(BranchPredictor):
+    """Predictor with a table of states indexed by the low bits of the address"""
+
+    def __init__(self, cpu: CPU, size: int = 256) -> None:
+        if size <= 0 or size & (size - 1):
+            raise CPUException("Error: predictor table size must be a power of two")
+        self.size = size
+        self._mask = size - 1
+        super().__init__(cpu)
+        self._table = self._new_table()
+
+    def _new_table(self) -> bytearray:
+        return bytearray(self.size)
+
+    @override
+    def reset(self) -> None:
+        super().reset()
+        self._table = self._new_table()
+
+
+class OneBitPredictor(_TablePredictor):
+    """Predict the last outcome of the jump"""
+
+    name = "1bit"
+
+    @override
+    def predict(self, pc: int, taken: bool) -> bool:
+        index = pc & self._mask
+        prediction = self._table[index] == 1
+        self._table[index] = taken
+        return prediction
+
+
+class TwoBitPredictor(_TablePredictor):
+    """Saturating counters from 0 to 3, predicting taken from 2, starting weakly not taken
+
+    A loop jump is mispredicted only once per loop exit, instead of twice with a single bit.
+    """
+
+    name = "2bit"
+
+    @override
+    def _new_table(self) -> bytearray:
+        return bytearray(b"\x01" * self.size)
+
+    @override
+    def predict(self, pc: int, taken: bool) -> bool:
+        table = self._table
+        index = pc & self._mask
+        counter = table[index]
+        if taken:
+            if counter < 3:
+                table[index] = counter + 1
+        elif counter > 0:
+            table[index] = counter - 1
+        return counter >= 2
+
+
+class GsharePredictor(TwoBitPredictor):
+    """Two-bit counters indexed by the address XOR the global history of outcomes
+
+    The history keeps the last outcomes of every branch, as many as the bits of the table
+    index, so jumps depending on the outcome of previous jumps are predicted as well.
+    """
+
+    name = "gshare"
+
+    def __init__(self, cpu: CPU, size: int = 1024) -> None:
+        super().__init__(cpu, size)
+        self._history = 0
+
+    @override
+    def reset(self) -> None:
+        super().reset()
+        self._history = 0
+
+    @override
+    def predict(self, pc: int, taken: bool) -> bool:
+        prediction = super().predict(pc ^ self._history, taken)
+        self._history = ((self._history << 1) | taken) & self._mask
+        return prediction
+
+
+# Predictors by name, as given in the command line
+PREDICTORS: dict[str, type[_TablePredictor]] = {
+    "1bit": OneBitPredictor,
+    "2bit": TwoBitPredictor,
+    "gshare": GsharePredictor,
+}
+
+
+def create_predictor(cpu: CPU, spec: str) -> BranchPredictor:
+    """Attach a predictor given as NAME[:SIZE]
+
+    The name is one of taken, not-taken, 1bit, 2bit or gshare, and the size is of its table.
+    """
+    name, _, size = spec.partition(":")
+    if name in ("taken", "not-taken") and not size:
+        return StaticPredictor(cpu, name == "taken")
+    if name not in PREDICTORS:
+        raise CPUException(f"Error: invalid predictor '{spec}'")
+    if not size:
+        return PREDICTORS[name](cpu)
+    try:
+        return PREDICTORS[name](cpu, int(size, 0))
+    except ValueError:
+        raise CPUException(f"Error: invalid predictor size '{size}'") from None
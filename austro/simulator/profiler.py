@@ -0,0 +1,124 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Profile of the loops run, found by their backward jumps"""
+
+from __future__ import annotations
+
+from array import array
+from itertools import accumulate
+from typing import TYPE_CHECKING, NamedTuple
+
+from austro.simulator.cpu import Stage
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPU
+
+
+class LoopProfile(NamedTuple):
+    jump: int  # address of the backward jump closing the loop
+    header: int  # address jumped to, the first instruction of the loop
+    first_line: int  # lines of the instructions from the header to the jump, 0 if unknown
+    last_line: int
+    iterations: int  # backward jumps taken
+    instructions: int  # instructions run from the header to the jump, nested loops included
+
+
+class LoopProfiler:
+    """Count the iterations and instructions of each loop
+
+    A loop is the address range from the target of a backward jump (target <= PC) to the jump
+    itself, and its iterations are the times the jump was taken. The CPU tells the profiler of
+    every jump taken, and the instructions between two jumps run straight, from the target of
+    the first to the second. Each run is added to a difference array, two integers by jump, so
+    the times each address was run is the running sum of the array, taken only on report.
+
+    The profiler follows the runs from the address 0 or the last reset, so attach it before
+    running. When detached, the CPU pays a single `is None` test per jump.
+    """
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+        self.reset()
+
+        cpu.profiler = self
+
+    def detach(self) -> None:
+        self.cpu.profiler = None
+
+    def reset(self) -> None:
+        """Forget the runs counted, as when the program is run again"""
+        size = self.cpu.memory.size
+        # Runs starting at each address, less the runs ended at the previous address
+        self._runs = array("q", bytes(8 * (size + 1)))
+        # Iterations and target by address of the backward jumps
+        self._iterations = array("I", bytes(4 * size))
+        self._targets = array("I", bytes(4 * size))
+        # Start of the current run
+        self._start = 0
+
+    def on_jump(self, pc: int, target: int) -> None:
+        runs = self._runs
+        runs[self._start] += 1
+        runs[pc + 1] -= 1
+        self._start = target
+        if target <= pc:
+            self._iterations[pc] += 1
+            self._targets[pc] = target
+
+    def counts(self) -> list[int]:
+        """Times each address was run, up to the current instruction"""
+        runs = array("q", self._runs)
+        # Close the current run at the instruction fetched
+        pc = self.cpu.registers["PC"]
+        if self.cpu.stage != Stage.INITIAL and self._start <= pc < len(runs) - 1:
+            runs[self._start] += 1
+            runs[pc + 1] -= 1
+        return list(accumulate(runs[:-1]))
+
+    def loops(self) -> list[LoopProfile]:
+        """Loops run, the hottest first, by the instructions run in them"""
+        memory = self.cpu.memory
+        counts = self.counts()
+        profiles = []
+        for jump, iterations in enumerate(self._iterations):
+            if not iterations:
+                continue
+            header = self._targets[jump]
+            instructions = 0
+            lines = []
+            for address in range(header, jump + 1):
+                word = memory.get_word(address)
+                if word.is_instruction:
+                    instructions += counts[address]
+                    if word.lineno:
+                        lines.append(word.lineno)
+            first_line, last_line = (min(lines), max(lines)) if lines else (0, 0)
+            profiles.append(
+                LoopProfile(jump, header, first_line, last_line, iterations, instructions)
+            )
+        profiles.sort(key=lambda loop: (-loop.instructions, loop.jump))
+        return profiles
+
+    def report(self) -> list[dict]:
+        """Loops run, the hottest first, to be exported as JSON"""
+        total = self.cpu.instructions
+        return [
+            {**loop._asdict(), "share": loop.instructions / total if total else 0.0}
+            for loop in self.loops()
+        ]
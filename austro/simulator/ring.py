@@ -0,0 +1,111 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Instruction records delivered to listeners in batches"""
+
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from array import array
+from typing import TYPE_CHECKING
+
+from austro.simulator.cpu import RECORD_SIZE, Event, Registers
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPU
+
+
+__all__ = ["BATCH_SIZE", "RECORD_SIZE", "BatchListener", "EventRing"]
+
+# Default number of records by batch
+BATCH_SIZE = 4096
+
+# Registers in the masks, leaving out those written by every instruction
+_TRACKED = sum(1 << index for index in range(Registers.INDEX["T"] + 1)) & ~sum(
+    1 << Registers.INDEX[name] for name in ("MAR", "MBR", "RI")
+)
+
+
+class BatchListener(metaclass=ABCMeta):
+    @abstractmethod
+    def on_batch(self, records: memoryview) -> None:
+        """Receive a batch of records
+
+        The records are flat, RECORD_SIZE numbers each, and only valid during the call. Bit `n`
+        of a mask is set if the register of index `n` (see Registers.INDEX) was written with a
+        new value, so an 8-bit register is seen as written only when written by its own name.
+        """
+
+
+class EventRing:
+    """Buffer the instructions run and deliver them to the listeners in batches
+
+    While attached to the CPU, each instruction fetched is written by the CPU itself to a
+    preallocated array, and the registers track the changes of each instruction in a mask, so
+    no Python function is called by instruction or by register write. The listeners are called
+    when the buffer is full, when the program halts or faults and on `flush`, so they handle
+    thousands of instructions by call. A CPU has a single ring.
+    """
+
+    def __init__(self, cpu: CPU, *listeners: BatchListener, size: int = BATCH_SIZE) -> None:
+        self.cpu = cpu
+        self.listeners = list(listeners)
+        self.size = size
+
+        # Records written by the CPU, and how many
+        self.records = array("I", bytes(4 * RECORD_SIZE * size))
+        self.count = 0
+
+        registers = cpu.registers
+        registers._changed = 0
+        registers._set_hooks(registers._on_write, _TRACKED)
+        cpu.ring = self
+
+        events = cpu.events
+        events.subscribe(Event.HALT, self._on_end)
+        events.subscribe(Event.FAULT, self._on_end)
+
+    def detach(self) -> None:
+        """Deliver the records left and stop recording"""
+        self.flush()
+        cpu = self.cpu
+        cpu.ring = None
+        cpu.registers._set_hooks(cpu.registers._on_write, 0)
+        cpu.events.unsubscribe(Event.HALT, self._on_end)
+        cpu.events.unsubscribe(Event.FAULT, self._on_end)
+
+    def flush(self) -> None:
+        """Deliver the records buffered
+
+        The last record has only the registers changed so far, if its instruction was not run
+        to the end (e.g. at a breakpoint).
+        """
+        count = self.count
+        if not count:
+            return
+
+        registers = self.cpu.registers
+        self.records[RECORD_SIZE * count - 1] = registers._changed
+        registers._changed = 0
+        self.count = 0
+        with memoryview(self.records) as view, view[: RECORD_SIZE * count] as records:
+            for listener in self.listeners:
+                listener.on_batch(records)
+
+    def _on_end(self, payload: tuple) -> None:
+        self.flush()
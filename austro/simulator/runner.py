@@ -0,0 +1,371 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Run a program without the GUI"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+from typing import TYPE_CHECKING
+
+from austro.asm.assembler import AssembleException, assemble
+from austro.asm.scanner import LexerException
+from austro.simulator.cache import Cache
+from austro.simulator.coverage import (
+    CoverageMap,
+    json_report,
+    lcov_report,
+    line_coverage,
+    text_report,
+)
+from austro.simulator.cpu import (
+    BREAKPOINT,
+    CPU,
+    WATCH_CHANGE,
+    WATCH_READ,
+    WATCH_WRITE,
+    CostModel,
+    CPUException,
+)
+from austro.simulator.flight import FlightRecorder
+from austro.simulator.loopdetect import InfiniteLoopDetector
+from austro.simulator.pipeline import PipelineModel
+from austro.simulator.predictor import create_predictor
+from austro.simulator.profiler import LoopProfiler
+from austro.simulator.traceevents import BLOCK, INSTRUCTION, LOOP, TraceExporter
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from austro.asm.memword import Word
+    from austro.asm.sourcemap import SourceMap
+    from austro.simulator.cpu import Break
+
+
+# Letters of the watchpoint kinds in the command line
+WATCH_KINDS = {"r": WATCH_READ, "w": WATCH_WRITE, "c": WATCH_CHANGE}
+_KIND_NAMES = {
+    BREAKPOINT: "breakpoint",
+    WATCH_READ: "read",
+    WATCH_WRITE: "write",
+    WATCH_CHANGE: "change",
+}
+
+# Registers shown in the report
+REPORT_REGISTERS = ("AX", "BX", "CX", "DX", "SP", "BP", "SI", "DI", "PC", "N", "Z", "V", "T")
+
+
+def parse_break(spec: str) -> tuple[int, None | str]:
+    """Parse a breakpoint as LOCATION [if CONDITION]"""
+    location, _, condition = spec.partition(" if ")
+    try:
+        return int(location, 0), condition.strip() or None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid location '{location}'") from None
+
+
+def parse_watch(spec: str) -> tuple[int, int]:
+    """Parse a watchpoint as ADDRESS[:KINDS], kinds are letters of r(ead), w(rite), c(hange)"""
+    address, _, letters = spec.partition(":")
+    kind = 0
+    for letter in letters or "w":
+        if letter not in WATCH_KINDS:
+            raise argparse.ArgumentTypeError(f"invalid watchpoint kind '{letter}'")
+        kind |= WATCH_KINDS[letter]
+    return int(address, 0), kind
+
+
+def parse_cache(spec: str) -> dict:
+    """Parse a cache as comma separated KEY=VALUE, e.g. size=64,line=4,ways=2,write=through"""
+    options: dict = {}
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        if key in ("size", "line", "ways"):
+            try:
+                options["line_size" if key == "line" else key] = int(value, 0)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"invalid cache {key} '{value}'") from None
+        elif key == "write":
+            options["write_policy"] = f"write-{value}"
+        elif key == "replacement":
+            options["replacement"] = value
+        else:
+            raise argparse.ArgumentTypeError(f"invalid cache option '{key}'")
+    return options
+
+
+def describe(hit: Break, sourcemap: SourceMap) -> dict:
+    """Description of a break, to be reported"""
+    event = {"kind": _KIND_NAMES[hit.kind], "pc": hit.pc, "line": sourcemap.line_of(hit.pc)}
+    if hit.address is not None:
+        event.update(address=hit.address, old=hit.old, new=hit.new)
+    return event
+
+
+def main(argv: None | Sequence[str] = None) -> int:
+    """Command line of `austrosim run`"""
+    parser = argparse.ArgumentParser(
+        prog="austrosim run", description="Run a program and report its breaks."
+    )
+    parser.add_argument("path", help="source file")
+    parser.add_argument(
+        "-b",
+        "--break",
+        dest="lines",
+        type=parse_break,
+        action="append",
+        default=[],
+        help="line to break at (or the next line with instructions), as LINE [if CONDITION]",
+    )
+    parser.add_argument(
+        "--break-at",
+        dest="addresses",
+        type=parse_break,
+        action="append",
+        default=[],
+        help="address to break at, as ADDRESS [if CONDITION]",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        type=parse_watch,
+        action="append",
+        default=[],
+        help="memory address to watch, as ADDRESS[:KINDS] with kinds of r, w, c (w)",
+    )
+    parser.add_argument(
+        "--address-space", type=int, default=CPU.ADDRESS_SPACE, help="number of memory words"
+    )
+    parser.add_argument(
+        "--costs",
+        help="JSON file of the cycles of each stage (see austro.simulator.cpu.CostModel)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=parse_cache,
+        help="simulate a cache, as size=WORDS,line=WORDS,ways=N (0 for fully associative),"
+        "write=back|through,replacement=lru|fifo",
+    )
+    parser.add_argument(
+        "--predictor",
+        help="simulate a branch predictor, as NAME[:SIZE] with names taken, not-taken, 1bit,"
+        " 2bit, gshare and the size of their table",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="time the program in a pipeline, reporting its hazards",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="report the loops run, the hottest first"
+    )
+    parser.add_argument(
+        "--coverage",
+        metavar="FILE",
+        help="record the lines and branches run in FILE, added to the coverage already there",
+    )
+    parser.add_argument("--lcov", metavar="FILE", help="write the coverage to FILE as LCOV")
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write the execution to FILE as Chrome trace events, timed in cycles",
+    )
+    parser.add_argument(
+        "--trace-slices",
+        choices=(INSTRUCTION, BLOCK, LOOP),
+        default=INSTRUCTION,
+        help="slices of the trace timeline: each instruction, basic block or loop iteration",
+    )
+    parser.add_argument("--json", action="store_true", help="write a JSON report to stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.path) as f:
+            asmd = assemble(f.read())
+    except (AssembleException, LexerException) as e:
+        print(f"{args.path}:{e.lineno}: {e.message}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"{args.path}: {e.strerror}", file=sys.stderr)
+        return 1
+
+    try:
+        cpu = CPU(address_space=args.address_space)
+        cache = None if args.cache is None else Cache(cpu, **args.cache)
+        predictor = None if args.predictor is None else create_predictor(cpu, args.predictor)
+        pipeline = PipelineModel(cpu) if args.pipeline else None
+        profiler = LoopProfiler(cpu) if args.profile else None
+    except CPUException as e:
+        print(f"{args.path}: {e.message}", file=sys.stderr)
+        return 1
+    if args.costs is not None:
+        try:
+            with open(args.costs) as f:
+                cpu.cost_model = CostModel(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"{args.costs}: invalid cost model ({e})", file=sys.stderr)
+            return 1
+        except CPUException as e:
+            print(f"{args.costs}: {e.message}", file=sys.stderr)
+            return 1
+    if args.coverage is not None or args.lcov is not None:
+        cpu.coverage = CoverageMap(cpu.memory.size)
+        if args.coverage is not None and os.path.exists(args.coverage):
+            try:
+                cpu.coverage.merge(CoverageMap.load(args.coverage))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"{args.coverage}: invalid coverage ({e})", file=sys.stderr)
+                return 1
+            except CPUException as e:
+                print(f"{args.coverage}: {e.message}", file=sys.stderr)
+                return 1
+    tracer = None
+    if args.trace is not None:
+        try:
+            tracer = TraceExporter(cpu, args.trace, args.trace_slices)
+        except OSError as e:
+            print(f"{args.trace}: {e.strerror}", file=sys.stderr)
+            return 1
+    InfiniteLoopDetector(cpu)
+    # Last instructions, reported on faults
+    recorder = FlightRecorder(cpu)
+
+    sourcemap = asmd["sourcemap"]
+    events = []
+    try:
+        cpu.set_memory_block(asmd["words"])
+
+        for line, condition in args.lines:
+            for address in sourcemap.addresses(sourcemap.next_line(line)):
+                cpu.add_breakpoint(address, condition)
+        for address, condition in args.addresses:
+            cpu.add_breakpoint(address, condition)
+        for address, kind in args.watch:
+            cpu.add_watchpoint(address, kind)
+
+        while not cpu.start():
+            assert cpu.last_break is not None
+            events.append(describe(cpu.last_break, sourcemap))
+            if not args.json:
+                print(_format_event(events[-1], cpu))
+    except CPUException as e:
+        _write_coverage(args, cpu, asmd["words"])
+        if tracer is not None:
+            tracer.close()
+        trace = recorder.records()
+        if args.json:
+            report: dict[str, object] = {
+                "breaks": events,
+                "error": e.message,
+                "trace": [r._asdict() for r in trace],
+            }
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            print(f"{args.path}: {e.message}", file=sys.stderr)
+            if trace:
+                print("Last instructions:", file=sys.stderr)
+            for record in trace:
+                print(f"  {record}", file=sys.stderr)
+        return 1
+
+    _write_coverage(args, cpu, asmd["words"])
+    if tracer is not None:
+        tracer.close()
+
+    registers = {name: cpu.registers[name] for name in REPORT_REGISTERS}
+    if args.json:
+        report = {
+            "breaks": events,
+            "registers": registers,
+            "instructions": cpu.instructions,
+            "cycles": cpu.cycles,
+        }
+        if cache is not None:
+            report["cache"] = cache.report()
+        if predictor is not None:
+            report["predictor"] = predictor.report()
+        if pipeline is not None:
+            report["pipeline"] = pipeline.report()
+        if profiler is not None:
+            report["loops"] = profiler.report()
+        if cpu.coverage is not None:
+            report["coverage"] = json_report(line_coverage(cpu.coverage, asmd["words"]))
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print("halted: " + " ".join(f"{name}={value}" for name, value in registers.items()))
+        print(f"{cpu.instructions} instructions, {cpu.cycles} cycles")
+        if cache is not None:
+            stats = cache.stats
+            print(
+                f"cache: {stats.fetch_hit_rate:.1%} of fetches and {stats.data_hit_rate:.1%} of"
+                f" data accesses hit, {stats.writebacks} lines written back"
+            )
+        if predictor is not None:
+            total = predictor.stats
+            print(
+                f"{predictor.name}: {total.accuracy:.1%} of {total.branches} branches predicted"
+            )
+            for line, branch in predictor.by_line().items():
+                print(f"  line {line}: {branch.accuracy:.1%} of {branch.branches}")
+        if pipeline is not None:
+            timing = pipeline.stats
+            print(
+                f"pipeline: {timing.cycles} cycles, CPI {timing.cpi:.2f}, {timing.data_stalls}"
+                f" data stalls, {timing.structural_stalls} structural stalls,"
+                f" {timing.bubbles} bubbles"
+            )
+        if profiler is not None:
+            print("Hot loops:")
+            for loop in profiler.loops():
+                share = loop.instructions / cpu.instructions
+                print(
+                    f"  lines {loop.first_line}-{loop.last_line}: {loop.iterations} iterations,"
+                    f" {loop.instructions} instructions ({share:.1%})"
+                )
+        if cpu.coverage is not None:
+            lines = line_coverage(cpu.coverage, asmd["words"])
+            print(text_report(lines, args.path), end="")
+
+    return 0
+
+
+def _write_coverage(args: argparse.Namespace, cpu: CPU, words: Sequence[Word]) -> None:
+    if cpu.coverage is None:
+        return
+    if args.coverage is not None:
+        cpu.coverage.save(args.coverage)
+    if args.lcov is not None:
+        with open(args.lcov, "w") as f:
+            f.write(lcov_report(cpu.coverage, words, os.path.abspath(args.path)))
+
+
+def _format_event(event: dict, cpu: CPU) -> str:
+    where = f"line {event['line']} (address {event['pc']})"
+    if event["kind"] == "breakpoint":
+        return f"break at {where}: " + " ".join(
+            f"{name}={cpu.registers[name]}" for name in ("AX", "BX", "CX", "DX")
+        )
+    return (
+        f"{event['kind']} of [{event['address']}] at {where}: {event['old']} -> {event['new']}"
+    )
@@ -0,0 +1,101 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Shadow memory to detect reads of uninitialized data"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple, override
+
+from austro.simulator.cpu import MemoryObserver
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import CPU
+
+
+class UninitializedRead(NamedTuple):
+    pc: int  # address of the instruction
+    address: int  # address read
+    lineno: int  # line of the instruction, 0 if unknown
+
+
+class ShadowMemory(MemoryObserver):
+    """Track which memory addresses were ever written
+
+    A bit is set for every address written, either when loading the program or at runtime. The
+    decoder checks the bit of each memory operand it reads, and any read of an address never
+    written is recorded once by instruction and address.
+
+    Only writes after the shadow is attached are seen, so attach it before loading the program.
+    The addresses initialized when the program is loaded are kept by the CPU as those of its
+    image, so each run after `CPU.reset(to_image=True)` starts from them, with no reads.
+    When disabled, the decoder pays a single `is None` test per memory operand.
+    """
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+        self.reads: list[UninitializedRead] = []
+
+        self._bits = bytearray((cpu.memory.size + 7) >> 3)
+        # Bits as left by the last program loaded
+        self._image = bytes(len(self._bits))
+        self._seen: set[tuple[int, int]] = set()
+
+        cpu.memory.attach(self)
+        cpu.shadow = self
+
+    def detach(self) -> None:
+        self.cpu.memory.detach(self)
+        self.cpu.shadow = None
+
+    def is_initialized(self, address: int) -> bool:
+        return bool(self._bits[address >> 3] >> (address & 7) & 1)
+
+    def mark(self, start: int, count: int = 1) -> None:
+        """Mark an address range as initialized"""
+        for address in range(start, start + count):
+            self._bits[address >> 3] |= 1 << (address & 7)
+
+    def save_image(self) -> None:
+        """Keep the addresses initialized so far as those of the program loaded"""
+        self._image = bytes(self._bits)
+
+    def reset(self) -> None:
+        """Forget the reads and the addresses written since the program was loaded"""
+        self._bits[:] = self._image
+        self._seen.clear()
+        self.reads.clear()
+
+    def check(self, address: int, pc: int) -> None:
+        """Record the read of a memory operand if the address was never written"""
+        if self._bits[address >> 3] >> (address & 7) & 1:
+            return
+
+        if (pc, address) not in self._seen:
+            self._seen.add((pc, address))
+            lineno = self.cpu.memory.get_word(pc).lineno
+            self.reads.append(UninitializedRead(pc, address, lineno))
+
+    @override
+    def on_write(self, address: int, old: int, new: int) -> None:
+        self._bits[address >> 3] |= 1 << (address & 7)
+
+    @override
+    def on_clear(self) -> None:
+        self._image = bytes(len(self._bits))
+        self.reset()
@@ -0,0 +1,222 @@
+# Copyright (C) 2013  Wagner Macedo <wagnerluis1982@gmail.com>
+#
+# This file is part of Austro Simulator.
+#
+# Austro Simulator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Austro Simulator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Export of the execution as Chrome trace events, for chrome://tracing or Perfetto"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from austro.asm.assembler import OPCODES
+from austro.simulator.cfg import build_cfg
+from austro.simulator.cpu import CPUException, Event, Registers
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from austro.simulator.cfg import ControlFlowGraph, Loop
+    from austro.simulator.cpu import CPU
+
+
+# Slices of the timeline
+INSTRUCTION = "instruction"
+BLOCK = "block"
+LOOP = "loop"
+
+# Mnemonic of each opcode, the first of its aliases
+_MNEMONICS: dict[int, str] = {}
+for _name, _opcode in OPCODES.items():
+    _MNEMONICS.setdefault(_opcode, _name)
+
+# Registers and flags of the counter tracks
+_REGISTERS = tuple(
+    (name, Registers.INDEX[name]) for name in ("AX", "BX", "CX", "DX", "SP", "BP", "SI", "DI")
+)
+_FLAGS = tuple((name, Registers.INDEX[name]) for name in ("N", "Z", "V", "T"))
+
+_PID = 1
+_TID = 1
+
+
+class TraceExporter:
+    """Write the instructions run as trace events to a file, as they run
+
+    Each instruction, basic block or loop iteration is a complete event ("X") lasting the
+    cycles counted by the CPU for its instructions, one microsecond of the timeline by cycle.
+    Cycles are taken at each fetch, so the cache misses of a data access land in the next.
+    Loop iterations nest in the iterations of their outer loops. With `counters`, the general
+    registers and the flags are counter tracks ("C"), with an event whenever one changed.
+
+    Events are written one by one and never kept, so the trace of a long run doesn't need to
+    fit in memory. The file is in the JSON array format, whose closing bracket is written by
+    `close` but is optional for the viewers, so they load a trace cut short as well.
+    """
+
+    def __init__(
+        self, cpu: CPU, path: str | Path, slices: str = INSTRUCTION, counters: bool = True
+    ) -> None:
+        if slices not in (INSTRUCTION, BLOCK, LOOP):
+            raise CPUException(f"Error: invalid trace slices '{slices}'")
+
+        self.cpu = cpu
+        self.slices = slices
+        self.counters = counters
+
+        self._file = open(path, "w")
+        # Every event after the first is written with a leading comma
+        self._file.write(
+            f'[{{"name":"process_name","ph":"M","pid":{_PID},'
+            f'"args":{{"name":"Austro Simulator"}}}}'
+        )
+        self._write_event(
+            f'"name":"thread_name","ph":"M","pid":{_PID},"tid":{_TID},'
+            f'"args":{{"name":"{slices}s"}}'
+        )
+
+        # Cycles at the fetch of the last instruction, its cost included
+        self._last = cpu.cycles
+        self._registers: tuple[int, ...] = ()
+        self._flags: tuple[int, ...] = ()
+
+        # Current block: address and first cycle
+        self._block: None | tuple[int, int] = None
+        # Loops being run, the innermost last, with the first cycle of their iteration
+        self._loops: list[tuple[Loop, int]] = []
+        # Graph of the program, built at the first instruction run
+        self._cfg: None | ControlFlowGraph = None
+        self._headers: dict[int, Loop] = {}
+
+        events = cpu.events
+        events.subscribe(Event.FETCH, self._on_fetch)
+        events.subscribe(Event.HALT, self._on_end)
+        events.subscribe(Event.FAULT, self._on_end)
+
+    def close(self) -> None:
+        """End the slices still open, stop recording and close the file"""
+        if self._file.closed:
+            return
+        self._on_end(())
+        events = self.cpu.events
+        events.unsubscribe(Event.FETCH, self._on_fetch)
+        events.unsubscribe(Event.HALT, self._on_end)
+        events.unsubscribe(Event.FAULT, self._on_end)
+
+        self._file.write("\n]\n")
+        self._file.close()
+
+    def _on_fetch(self, payload: tuple) -> None:
+        pc, word = payload
+        start, end = self._last, self.cpu.cycles
+        self._last = end
+
+        if self.slices == INSTRUCTION:
+            lineno = self.cpu.memory.get_word(pc).lineno
+            self._write_slice(_MNEMONICS.get(word >> 11, "?"), start, end, pc, lineno)
+        else:
+            if self._cfg is None:
+                self._cfg = build_cfg(self.cpu.memory)
+                self._headers = {loop.header: loop for loop in self._cfg.loops}
+            if self.slices == BLOCK:
+                self._next_block(pc, start)
+            else:
+                self._next_loop(pc, start)
+
+        if self.counters:
+            self._write_counters(start)
+
+    def _on_end(self, payload: tuple) -> None:
+        end = self.cpu.cycles
+        if self._block is not None:
+            self._end_block(end)
+        while self._loops:
+            loop, start = self._loops.pop()
+            self._write_loop(loop, start, end)
+
+    def _next_block(self, pc: int, start: int) -> None:
+        # A block ends at the start of another or at any jump taken away from its end
+        assert self._cfg is not None
+        block = self._cfg.block_at(pc)
+        current = self._block
+        if current is not None:
+            if block is not None and block.start == current[0] and pc != block.start:
+                return
+            self._end_block(start)
+        self._block = (pc if block is None else block.start, start)
+
+    def _end_block(self, end: int) -> None:
+        assert self._block is not None
+        address, start = self._block
+        self._block = None
+        assert self._cfg is not None
+        block = self._cfg.block_at(address)
+        lines = (block.first_line, block.last_line) if block is not None else (0, 0)
+        self._write_slice(_slice_name("block", address, *lines), start, end, address, lines[0])
+
+    def _next_loop(self, pc: int, start: int) -> None:
+        assert self._cfg is not None
+        block = self._cfg.block_at(pc)
+        loops = self._loops
+
+        # Loops left
+        while loops and (block is None or block.start not in loops[-1][0].blocks):
+            left, begin = loops.pop()
+            self._write_loop(left, begin, start)
+
+        # Next iteration, or a loop entered
+        loop = self._headers.get(pc)
+        if loop is not None:
+            if loops and loops[-1][0] is loop:
+                self._write_loop(loop, loops.pop()[1], start)
+            loops.append((loop, start))
+
+    def _write_loop(self, loop: Loop, start: int, end: int) -> None:
+        name = _slice_name("loop", loop.header, loop.first_line, loop.last_line)
+        self._write_slice(name, start, end, loop.header, loop.first_line)
+
+    def _write_slice(self, name: str, start: int, end: int, pc: int, lineno: int) -> None:
+        self._write_event(
+            f'"name":"{name}","cat":"{self.slices}","ph":"X","ts":{start},"dur":{end - start},'
+            f'"pid":{_PID},"tid":{_TID},"args":{{"pc":{pc},"line":{lineno}}}'
+        )
+
+    def _write_counters(self, ts: int) -> None:
+        registers = self.cpu.registers
+        values = tuple(registers[index] for _, index in _REGISTERS)
+        if values != self._registers:
+            self._registers = values
+            self._write_counter("registers", ts, zip((n for n, _ in _REGISTERS), values))
+        flags = tuple(registers[index] for _, index in _FLAGS)
+        if flags != self._flags:
+            self._flags = flags
+            self._write_counter("flags", ts, zip((n for n, _ in _FLAGS), flags))
+
+    def _write_counter(self, name: str, ts: int, values: zip[tuple[str, int]]) -> None:
+        args = ",".join(f'"{register}":{value}' for register, value in values)
+        self._write_event(f'"name":"{name}","ph":"C","ts":{ts},"pid":{_PID},"args":{{{args}}}')
+
+    def _write_event(self, fields: str) -> None:
+        self._file.write(f",\n{{{fields}}}")
+
+
+def _slice_name(kind: str, address: int, first_line: int, last_line: int) -> str:
+    """Name of a block or loop slice, e.g. loop 4 (lines 6-7)"""
+    if not first_line:
+        return f"{kind} {address}"
+    if first_line == last_line:
+        return f"{kind} {address} (line {first_line})"
+    return f"{kind} {address} (lines {first_line}-{last_line})"
@@ -22,7 +22,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, override
 
-from PyQt5.QtCore import QRect, QRegExp, QSize, Qt
+from PyQt5.QtCore import QPoint, QRect, QRegExp, QSize, Qt, pyqtSignal
 from PyQt5.QtGui import (
     QColor,
     QFont,
@@ -39,14 +39,19 @@ from austro.asm.assembler import OPCODES, REGISTERS
 
 
 if TYPE_CHECKING:
-    from PyQt5.QtGui import QPaintEvent, QTextDocument
+    from PyQt5.QtGui import QMouseEvent, QPaintEvent, QTextDocument
 
 
 class CodeEditor(QPlainTextEdit):
+    # Emitted when a breakpoint is toggled by a click in the line numbers
+    breakpointsChanged = pyqtSignal()
+
     def __init__(self, parent: None | QWidget = None):
         super().__init__(parent)
         self.setTabStopWidth(40)
         self.lineNumberArea = LineNumberArea(self)
+        # Lines marked with a breakpoint
+        self.breakpoints: set[int] = set()
 
         self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
         self.updateRequest.connect(self.updateLineNumberArea)
@@ -77,9 +82,17 @@ class CodeEditor(QPlainTextEdit):
 
         areaWidth = self.lineNumberArea.width()
         rightMargin = LineNumberArea.RIGHT_MARGIN
+        lineHeight = self.fontMetrics().height()
 
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
+                if blockNumber in self.breakpoints:
+                    painter.save()
+                    painter.setRenderHint(QPainter.Antialiasing)
+                    painter.setPen(Qt.NoPen)
+                    painter.setBrush(QColor("#D03030"))
+                    painter.drawEllipse(2, int(top) + 2, lineHeight - 4, lineHeight - 4)
+                    painter.restore()
                 number = str(blockNumber)
                 painter.drawText(
                     0,
@@ -102,11 +115,21 @@ class CodeEditor(QPlainTextEdit):
             maxdigs //= 10
             digits += 1
 
-        space = 3 + self.fontMetrics().width("9") * digits
+        # Space for the breakpoint marker and the digits
+        space = self.fontMetrics().height() + 3 + self.fontMetrics().width("9") * digits
         rightMargin = self.lineNumberArea.RIGHT_MARGIN
 
         return space + rightMargin
 
+    def lineAt(self, y: int) -> int:
+        """Line number at a vertical position of the line number area"""
+        return self.cursorForPosition(QPoint(0, y)).blockNumber() + 1
+
+    def toggleBreakpoint(self, lineNo: int) -> None:
+        self.breakpoints ^= {lineNo}
+        self.lineNumberArea.update()
+        self.breakpointsChanged.emit()
+
     @override
     def resizeEvent(self, e) -> None:
         QPlainTextEdit.resizeEvent(self, e)
@@ -194,6 +217,14 @@ class LineNumberArea(QWidget):
 
         self.codeEditor.lineNumberAreaPaintEvent(event)
 
+    @override
+    def mousePressEvent(self, event: None | QMouseEvent) -> None:
+        if event is None:
+            raise ValueError("missing mouse event object")
+
+        if event.button() == Qt.LeftButton:
+            self.codeEditor.toggleBreakpoint(self.codeEditor.lineAt(event.pos().y()))
+
 
 class HighlightingRule:
     pattern: None | QRegExp = None
@@ -21,8 +21,10 @@ from PyQt5.QtWidgets import (
     QTreeView,
 )
 
-from austro.asm import asm_lexer, assembler
+from austro.asm import assembler, scanner
 from austro.simulator.cpu import CPU, CPUException, Stage, StepListener
+from austro.simulator.flight import FlightRecorder
+from austro.simulator.loopdetect import InfiniteLoopDetector
 from austro.ui.codeeditor import AssemblyHighlighter, CodeEditor
 from austro.ui.models import DataModel, GeneralMemoryModel, MemoryModel, RegistersModel
 
@@ -30,6 +32,7 @@ from austro.ui.models import DataModel, GeneralMemoryModel, MemoryModel, Registe
 if TYPE_CHECKING:
     from PyQt5.QtWidgets import QApplication, QMainWindow
 
+    from austro.asm.sourcemap import SourceMap
     from austro.simulator.cpu import Memory, Registers
 
 
@@ -84,6 +87,12 @@ class MainWindow:
     def __init__(self, qApp: QApplication):
         self.listener = ModelsUpdater(self)
         self.cpu = CPU(self.listener)
+        # Stop running programs which will never halt
+        self.loopDetector = InfiniteLoopDetector(self.cpu)
+        # Last instructions, shown on faults
+        self.flightRecorder = FlightRecorder(self.cpu)
+        # Lines of the loaded program
+        self.sourceMap: None | SourceMap = None
 
         qApp.lastWindowClosed.connect(self.stop)
 
@@ -102,6 +111,7 @@ class MainWindow:
         self.asmEdit = self.gui.findChild(CodeEditor, "asmEdit")
         self.asmEdit.setFocus()
         AssemblyHighlighter(self.asmEdit.document())
+        self.asmEdit.breakpointsChanged.connect(self.syncBreakpoints)
 
         # Get console area
         self.console = self.gui.findChild(QPlainTextEdit, "txtConsole")
@@ -272,7 +282,7 @@ class MainWindow:
         self.actionRun.triggered.connect(self.runAction)
 
         self.actionStep = self.gui.findChild(QAction, "actionStep")
-        self.actionStep.triggered.connect(self.nextInstruction)
+        self.actionStep.triggered.connect(self.stepAction)
 
         self.actionStop = self.gui.findChild(QAction, "actionStop")
         self.actionStop.triggered.connect(self.stopAction)
@@ -302,7 +312,7 @@ class MainWindow:
             # Assemble the program
             assembly = editor.toPlainText()
             asmd = assembler.assemble(assembly)
-        except (asm_lexer.LexerException, assembler.AssembleException) as e:
+        except (scanner.LexerException, assembler.AssembleException) as e:
             self.console.clear()
             self.console.appendPlainText("Attempt to load failed (%s)" % datetime.now())
             self.console.appendPlainText(e.message)
@@ -311,7 +321,10 @@ class MainWindow:
             try:
                 # Reset and set the memory with the written program
                 self.cpu.reset()
+                self.flightRecorder.clear()
                 self.cpu.set_memory_block(asmd["words"])
+                self.sourceMap = asmd["sourcemap"]
+                self.syncBreakpoints()
                 self.refreshModels()
             except CPUException as e:
                 self.console.appendPlainText("Attempt to load failed (%s)" % datetime.now())
@@ -325,23 +338,60 @@ class MainWindow:
         def do_action():
             if self.cpu.stage not in (Stage.HALTED, Stage.STOPPED):
                 self.nextInstruction()
-                QTimer.singleShot(200, do_action)
+                if self.cpu.poll_break() is not None:
+                    self.breakAction()
+                else:
+                    QTimer.singleShot(200, do_action)
             else:
                 self.restoreEditor()
 
         do_action()
 
+    def stepAction(self):
+        self.nextInstruction()
+        # Watchpoints are reported on steps too
+        if self.cpu.poll_break() is not None:
+            self.breakAction()
+
     def nextInstruction(self):
         try:
             next(self.cpu)
         except CPUException as e:
             self.console.appendPlainText("Execution failed (%s)" % datetime.now())
             self.console.appendPlainText(e.message)
+            trace = self.flightRecorder.dump()
+            if trace:
+                self.console.appendPlainText("Last instructions:")
+                self.console.appendPlainText("\n".join(trace))
 
         if self.cpu.stage in (Stage.HALTED, Stage.STOPPED):
             self.refreshModels()
             self.restoreEditor()
 
+    def breakAction(self):
+        # Pause the run, it can be continued by Run or Step
+        hit = self.cpu.last_break
+        assert hit is not None and self.sourceMap is not None
+        lineNo = self.sourceMap.line_of(hit.pc)
+        if hit.address is None:
+            self.console.appendPlainText(f"Breakpoint at line {lineNo}")
+        else:
+            self.console.appendPlainText(
+                f"Watchpoint [{hit.address}] at line {lineNo}: {hit.old} -> {hit.new}"
+            )
+        self.refreshModels()
+        self.actionRun.setEnabled(True)
+        self.actionStep.setEnabled(True)
+
+    def syncBreakpoints(self):
+        # Set the breakpoints of the editor lines on the addresses of the loaded program
+        if self.sourceMap is None:
+            return
+        self.cpu.clear_breakpoints()
+        for lineNo in self.asmEdit.breakpoints:
+            for address in self.sourceMap.addresses(self.sourceMap.next_line(lineNo)):
+                self.cpu.add_breakpoint(address)
+
     def stop(self):
         self.cpu.stop()
 
@@ -398,6 +448,9 @@ class MainWindow:
         self.stateRegsModel.refresh()
         self.memoryModel.refresh()
         self.memoryModel2.refresh()
+        self.gui.statusBar().showMessage(
+            f"{self.cpu.instructions} instructions, {self.cpu.cycles} cycles"
+        )
 
     def about(self):
         QMessageBox.about(self.gui, "About Austro Simulator", _about_)
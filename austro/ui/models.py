@@ -16,7 +16,7 @@
 # along with Austro Simulator.  If not, see <http://www.gnu.org/licenses/>.
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Iterable
+from typing import TYPE_CHECKING, Iterable, Sequence, override
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QBrush, QColor
@@ -28,6 +28,8 @@ from austro.ui.datamodel import DataItem, DataModel
 if TYPE_CHECKING:
     from PyQt5.QtCore import QObject
 
+    from austro.asm.memword import Word
+
 
 class RegistersModel(DataModel):
     def __init__(
@@ -57,15 +59,45 @@ class RegistersModel(DataModel):
         return super().data(index, role)
 
 
+class MemoryItem(DataItem):
+    """Item of a memory word, its row is the address"""
+
+    def __init__(self, address: int, word: Word, parent: DataItem):
+        super().__init__((address, word), parent)
+
+    @override
+    def row(self) -> int:
+        return self._itemData[0]
+
+
+class MemoryRootItem(DataItem):
+    """Root of the memory words, each item created on the first access"""
+
+    def __init__(self, header: Sequence[str], memory: Memory):
+        super().__init__(header)
+        self.memory = memory
+        self._items: dict[int, MemoryItem] = {}
+
+    @override
+    def child(self, row) -> DataItem:
+        item = self._items.get(row)
+        if item is None:
+            item = self._items[row] = MemoryItem(row, self.memory.get_word(row), self)
+        return item
+
+    @override
+    def childCount(self) -> int:
+        return self.memory.size
+
+
 # Model for memory data vision
 class MemoryModel(DataModel):
     def __init__(self, memory, parent: None | QObject = None):
         assert isinstance(memory, Memory), "It's not a memory object"
         super().__init__(("Addr.", "Data (%s)"), parent)
 
-        for addr in range(memory.size):
-            item = (addr, memory.get_word(addr))
-            self._rootItem.appendChild(DataItem(item))
+        # Memory can be large, so rows are created as the view asks for them
+        self._rootItem = MemoryRootItem(self._rootItem._itemData, memory)
 
     def data(self, index, role):
         if role == Qt.TextAlignmentRole:
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Protocol
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU, CPUException, Event
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from austro.asm.memword import Word
+
+
+class Run(Protocol):
+    def __call__[T](
+        self,
+        program: str | Sequence[Word],
+        attach: Callable[..., T],
+        *args,
+        stepping: bool = False,
+        fault: None | str = None,
+        **options,
+    ) -> T: ...
+
+
+@pytest.fixture
+def run() -> Run:
+    """Run a program in a new CPU, returning what `attach` gave for it
+
+    `attach` is called with the CPU, `args` and `options` before the program is loaded, usually
+    the class of the observer under test. With `stepping`, a DECODE subscriber keeps the CPU
+    from fusing instructions. With `fault`, the run must end with a CPUException matching it.
+    """
+
+    def run[T](
+        program: str | Sequence[Word],
+        attach: Callable[..., T],
+        *args,
+        stepping: bool = False,
+        fault: None | str = None,
+        **options,
+    ) -> T:
+        cpu = CPU()
+        attached = attach(cpu, *args, **options)
+        if stepping:
+            cpu.events.subscribe(Event.DECODE, lambda payload: None)
+        cpu.set_memory_block(
+            assemble(program)["words"] if isinstance(program, str) else program
+        )
+        if fault is None:
+            cpu.start()
+        else:
+            with pytest.raises(CPUException, match=fault):
+                cpu.start()
+        return attached
+
+    return run
@@ -1,12 +1,28 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import pytest
 
 from ply.lex import LexToken
 
 from austro.asm.asm_lexer import LexerException
-from austro.asm.assembler import OPCODES, AssembleException, assemble, memory_words
+from austro.asm.assembler import (
+    LEXERS,
+    OPCODES,
+    AssembleException,
+    assemble,
+    iter_assemble,
+    memory_words,
+)
 from austro.asm.memword import DWord, IWord
+from austro.asm.sourcemap import SourceMap
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from austro.asm.memword import Word
 
 
 class Test_assemble:
@@ -43,6 +59,7 @@ class Test_assemble:
                 IWord(4, 2, 4, lineno=11),
                 IWord(1, 0, 0, lineno=12),
             ],
+            "sourcemap": SourceMap([3, 3, 4, 4, 8, 8, 9, 10, 10, 11, 12], {"loop": 4}),
         }
 
     def test_jump_forward(self):
@@ -65,6 +82,7 @@ class Test_assemble:
                 IWord(3, 2, 3, lineno=3),
                 IWord(1, 0, 0, lineno=6),
             ],
+            "sourcemap": SourceMap([2, 2, 3, 6], {"quit": 3}),
         }
 
     def test_jump_with_register(self):
@@ -76,6 +94,7 @@ class Test_assemble:
             "words": [
                 IWord(4, 0, 128, lineno=1),
             ],
+            "sourcemap": SourceMap([1], {}),
         }
 
     def test_jump_with_memory_reference(self):
@@ -87,6 +106,7 @@ class Test_assemble:
             "words": [
                 IWord(4, 1, 128, lineno=1),
             ],
+            "sourcemap": SourceMap([1], {}),
         }
 
     def test_inc_with_memory_reference(self):
@@ -98,6 +118,7 @@ class Test_assemble:
             "words": [
                 IWord(17, 1, 128, lineno=1),
             ],
+            "sourcemap": SourceMap([1], {}),
         }
 
     def test_shift_with_memory_reference(self):
@@ -110,6 +131,7 @@ class Test_assemble:
                 IWord(12, 1, 128, lineno=1),
                 DWord(1),
             ],
+            "sourcemap": SourceMap([1, 1], {}),
         }
 
     def test_error_scanning(self):
@@ -179,6 +201,91 @@ class Test_assemble:
         e_info.match(r"Error: symbol 'rambo' is already defined at line 4")
 
 
+class Test_iter_assemble:
+    CODE = """
+        mov cx, 3
+        jmp start
+        nop
+        nop
+        start:
+        dec cx
+        jnz start
+        halt
+    """
+
+    def test_chunks(self) -> None:
+        """#iter_assemble chunks should give the same words as #assemble"""
+        words: list[Word] = []
+        for address, chunk in iter_assemble(self.CODE, chunk_size=2):
+            assert len(chunk) <= 3
+            words[address : address + len(chunk)] = chunk
+
+        assert words == assemble(self.CODE)["words"]
+
+    def test_forward_jump_fixup(self) -> None:
+        """A forward jump already yielded should be yielded again once patched"""
+        labels: dict[str, int] = {}
+        # Words as they were when yielded
+        chunks = [
+            (address, [repr(w) for w in words])
+            for address, words in iter_assemble(self.CODE, chunk_size=2, labels=labels)
+        ]
+
+        assert labels == {"start": 5}
+        assert chunks[:2] == [
+            (0, ["IWord(2, 2, 160, lineno=2)", "DWord(3)"]),
+            (2, ["IWord(11, 2, 0, lineno=3)", "IWord(0, 0, 0, lineno=4)"]),
+        ]
+        # Address 2 patched after the label is found
+        assert (2, ["IWord(11, 2, 5, lineno=3)"]) in chunks[2:]
+
+    def test_reads_lines_lazily(self):
+        """Chunks should be yielded before the whole source is read"""
+        read = []
+
+        def lines():
+            for lineno in range(1, 1001):
+                read.append(lineno)
+                yield "inc ax\n"
+
+        chunks = iter_assemble(lines(), chunk_size=10)
+        assert next(chunks) == (0, [IWord(17, 0, 0x80, lineno=n) for n in range(1, 11)])
+        assert len(read) < 20
+
+        assert sum(len(words) for _, words in chunks) == 990
+
+    def test_file_object(self, tmp_path: Path):
+        source = tmp_path / "program.asm"
+        source.write_text(self.CODE)
+
+        with source.open() as f:
+            words = [w for _, chunk in iter_assemble(f) for w in chunk]
+        assert words == assemble(self.CODE)["words"]
+
+    @pytest.mark.parametrize("lexer", LEXERS)
+    def test_lines_without_newline(self, lexer: str):
+        """Lines should be numbered the same without their newline"""
+        lines = self.CODE.splitlines()
+        words = [w for _, chunk in iter_assemble(lines, lexer=lexer) for w in chunk]
+        assert words == assemble(self.CODE)["words"]
+        assert [w.lineno for w in words if w.is_instruction] == [2, 3, 4, 5, 7, 8, 9]
+        sourcemap = SourceMap.from_words(words, {"start": 5})
+        assert sourcemap.line_of(5) == 7
+        assert sourcemap.addresses(9) == [7]
+
+        assert list(iter_assemble(["inc ax", "halt"], lexer=lexer)) == [
+            (0, [IWord(17, 0, 0x80, lineno=1), IWord(1, 0, 0, lineno=2)])
+        ]
+        with pytest.raises(AssembleException, match="Invalid token '1' at line 2"):
+            list(iter_assemble(["inc ax", "1 halt"], lexer=lexer))
+        with pytest.raises(AssembleException, match="Invalid label 'nowhere' at line 2"):
+            list(iter_assemble(["nop", "jmp nowhere", "halt"], lexer=lexer))
+
+    def test_error_missing_label(self):
+        with pytest.raises(AssembleException, match="Invalid label 'nowhere' at line 2"):
+            list(iter_assemble("nop\njmp nowhere\nhalt", chunk_size=1))
+
+
 class Test_memory_words:
     def test_memory_words(self):
         """#memory_words should return a tuple of Word objects (two at max)"""
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import os
+
+from array import array
+from pathlib import Path
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.asm.batch import FileError, assemble_files, main
+from austro.asm.sourcemap import SourceMap
+
+
+PROGRAM = "mov ax, 5\ninc ax\nhalt\n"
+
+
+@pytest.fixture
+def sources(tmp_path: Path) -> Path:
+    root = tmp_path / "src"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.asm").write_text(PROGRAM)
+    (root / "sub" / "b.asm").write_text("nop\nhalt\n")
+    (root / "sub" / "c.asm").write_text("nop\nmov ax, ex\n")
+    (root / "notes.txt").write_text("not a source")
+    return root
+
+
+class Test_assemble_files:
+    def test_results(self, sources: Path, tmp_path: Path):
+        """#assemble_files should assemble every source, keeping the errors"""
+        results = assemble_files([sources], output=tmp_path / "out", jobs=2)
+
+        assert [r.path for r in results] == [
+            str(sources / "a.asm"),
+            str(sources / "sub" / "b.asm"),
+            str(sources / "sub" / "c.asm"),
+        ]
+        assert [r.words for r in results] == [4, 2, 0]
+        assert results[2].errors == [
+            FileError(2, "Error: bad register name 'ex' at line 2"),
+        ]
+        assert not results[2].ok
+        assert all(r.seconds > 0 for r in results)
+
+    def test_images(self, sources: Path, tmp_path: Path):
+        """Binary images should be written in the same relative paths"""
+        assemble_files([sources], output=tmp_path / "out", jobs=1)
+
+        image = array("H", (tmp_path / "out" / "a.bin").read_bytes())
+        assert image.tolist() == [w.value for w in assemble(PROGRAM)["words"]]
+        assert (tmp_path / "out" / "sub" / "b.bin").exists()
+        assert not (tmp_path / "out" / "sub" / "c.bin").exists()
+
+        sourcemap = SourceMap.load(tmp_path / "out" / "a.map")
+        assert sourcemap == assemble(PROGRAM)["sourcemap"]
+
+    def test_cache(self, sources: Path, tmp_path: Path):
+        """Unchanged files should be taken from the cache, even if touched"""
+        cache = tmp_path / "cache.json"
+        first = assemble_files([sources], jobs=1, cache=cache)
+        assert not any(r.cached for r in first)
+
+        a = sources / "a.asm"
+        os.utime(a, ns=(a.stat().st_atime_ns, a.stat().st_mtime_ns + 10**9))
+        (sources / "sub" / "b.asm").write_text("halt\n")
+
+        second = assemble_files([sources], jobs=1, cache=cache)
+        assert [r.cached for r in second] == [True, False, True]
+        assert [r.words for r in second] == [4, 1, 0]
+        assert second[2].errors == first[2].errors
+
+    def test_unreadable(self, sources: Path, tmp_path: Path):
+        """A file that can't be read should be reported without stopping the others"""
+        missing = sources / "missing.asm"
+        results = assemble_files([sources, missing], output=tmp_path / "out", jobs=2)
+
+        assert [r.words for r in results] == [4, 2, 0, 0]
+        assert results[3].path == str(missing)
+        assert results[3].errors == [FileError(0, "Can't read (No such file or directory)")]
+        assert (tmp_path / "out" / "a.bin").exists()
+
+    def test_unreadable_cached(
+        self, sources: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        """A touched file that can't be read should be reported, not taken from the cache"""
+        cache = tmp_path / "cache.json"
+        assemble_files([sources], jobs=1, cache=cache)
+
+        a = sources / "a.asm"
+        os.utime(a, ns=(a.stat().st_atime_ns, a.stat().st_mtime_ns + 10**9))
+        read_bytes = Path.read_bytes
+
+        def unreadable(path: Path) -> bytes:
+            if path == a:
+                raise PermissionError(13, "Permission denied")
+            return read_bytes(path)
+
+        monkeypatch.setattr(Path, "read_bytes", unreadable)
+        results = assemble_files([sources], jobs=1, cache=cache)
+
+        assert results[0].errors == [FileError(0, "Can't read (Permission denied)")]
+        assert [r.cached for r in results[1:]] == [True, True]
+
+
+class Test_main:
+    def test_report(self, sources: Path, capsys: pytest.CaptureFixture[str]):
+        assert main([str(sources), "--no-cache", "-j", "1"]) == 1
+
+        out = capsys.readouterr().out
+        assert f"{sources / 'a.asm'}: 4 words" in out
+        assert f"{sources / 'sub' / 'c.asm'}: Error: bad register name 'ex' at line 2\n" in out
+        assert "3 files, 1 failed" in out
+
+    @pytest.mark.parametrize("jobs", ["0", "-2", "many"])
+    def test_invalid_jobs(self, sources: Path, jobs: str, capsys: pytest.CaptureFixture[str]):
+        with pytest.raises(SystemExit):
+            main([str(sources), "--no-cache", "-j", jobs])
+        assert f"not a positive integer: '{jobs}'" in capsys.readouterr().err
+
+    def test_json(self, sources: Path, capsys: pytest.CaptureFixture[str]):
+        assert main([str(sources / "a.asm"), "--no-cache", "--json", "-"]) == 0
+
+        summary = json.loads(capsys.readouterr().out)
+        assert summary["failed"] == 0
+        assert summary["files"][0]["words"] == 4
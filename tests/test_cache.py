@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.simulator.cache import FIFO, WRITE_THROUGH, Cache, CacheStats
+from austro.simulator.cpu import CPU, CostModel, CPUException
+
+
+if TYPE_CHECKING:
+    from tests.conftest import Run
+
+
+# Reads two addresses mapped to the same set of a small direct-mapped cache
+CONFLICT = """
+    mov cx, 4
+loop:
+    mov ax, [108]
+    mov bx, [140]
+    dec cx
+    jnz loop
+    halt
+"""
+
+
+class TestCache:
+    def test_conflict_misses(self, run: Run):
+        """Lines mapped to the same set should evict each other in a direct-mapped cache"""
+        direct = run(CONFLICT, Cache, size=32, line_size=4)
+        assert (direct.stats.read_hits, direct.stats.read_misses) == (0, 8)
+
+        associative = run(CONFLICT, Cache, size=32, line_size=4, ways=2)
+        assert (associative.stats.read_hits, associative.stats.read_misses) == (6, 2)
+
+        fully = run(CONFLICT, Cache, size=32, line_size=4, ways=0)
+        assert fully.ways == 8
+        assert (fully.stats.read_hits, fully.stats.read_misses) == (6, 2)
+
+    def test_fetches(self, run: Run):
+        """Both words of an instruction should be fetched, counted apart from data"""
+        cache = run(CONFLICT, Cache, size=64, line_size=4)
+
+        # Program of 10 words in 3 lines, the loop body fetched 4 times
+        assert cache.stats.fetch_misses == 3
+        assert cache.stats.fetch_hits + cache.stats.fetch_misses == 2 + 4 * 6 + 1
+        assert cache.stats.fetch_hit_rate == pytest.approx(24 / 27)
+
+    def test_replacement(self):
+        """LRU should keep the line used last, FIFO the line filled last"""
+        for replacement, expected in (("lru", (2, 3)), (FIFO, (1, 4))):
+            cache = Cache(CPU(), size=8, line_size=4, ways=0, replacement=replacement)
+            for address in (0, 4, 0, 8, 0):
+                cache.read(address)
+            assert (cache.stats.read_hits, cache.stats.read_misses) == expected, replacement
+
+    def test_write_policies(self):
+        """Write-back should allocate lines and write them back when evicted"""
+        cpu = CPU()
+        cache = Cache(cpu, size=4, line_size=4)
+        cache.write(0)
+        cache.write(1)
+        cache.read(4)
+        assert cache.stats == CacheStats(
+            write_hits=1, write_misses=1, read_misses=1, writebacks=1
+        )
+        assert cpu.cycles == 3 * CostModel().cache_miss
+
+        cache = Cache(CPU(), size=4, line_size=4, write_policy=WRITE_THROUGH)
+        cache.write(0)
+        cache.read(0)
+        cache.write(1)
+        cache.read(4)
+        assert cache.stats == CacheStats(write_hits=1, write_misses=1, read_misses=2)
+
+    def test_cycles(self):
+        """Misses should cost cycles of the cost model, and reset should empty the cache"""
+        cpu = CPU()
+        cpu.set_memory_block(assemble(CONFLICT)["words"])
+        cpu.start()
+        cycles = cpu.cycles
+
+        cpu.cost_model = CostModel(cache_miss=5)
+        cache = Cache(cpu, size=32, line_size=4)
+        cpu.reset(to_image=True)
+        cpu.start()
+        misses = cache.stats.fetch_misses + cache.stats.read_misses
+        assert cpu.cycles == cycles + 5 * misses
+
+        cpu.reset(to_image=True)
+        assert cache.stats == CacheStats()
+
+    def test_report(self, run: Run):
+        report = run(CONFLICT, Cache, size=32, line_size=4, ways=2).report()
+
+        assert report["ways"] == 2
+        assert report["write_policy"] == "write-back"
+        assert report["read_hits"] == 6
+        assert report["data_hit_rate"] == 0.75
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"size": 24},
+            {"line_size": 128},
+            {"ways": 3},
+            {"ways": 32},
+            {"write_policy": "write-around"},
+            {"replacement": "random"},
+        ],
+    )
+    def test_invalid(self, options: dict):
+        with pytest.raises(CPUException):
+            Cache(CPU(), **options)
+
+    def test_detach(self):
+        cpu = CPU()
+        cache = Cache(cpu)
+        cache.detach()
+
+        assert cpu.cache is None
+        cpu.set_memory_block(assemble(CONFLICT)["words"])
+        cpu.start()
+        assert cache.stats == CacheStats()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from austro.asm.assembler import assemble
+from austro.simulator.cfg import FALLTHROUGH, JUMP, TAKEN, UNKNOWN, Edge, build_cfg
+from austro.simulator.cpu import CPU
+
+
+NESTED_LOOPS = """
+    mov cx, 3
+outer:
+    mov bx, 2
+inner:
+    dec bx
+    jnz inner
+    dec cx
+    jnz outer
+    halt
+"""
+
+
+class Test_build_cfg:
+    def test_basic_blocks(self):
+        """#build_cfg should split the program at jump targets and after jumps"""
+        cfg = build_cfg(assemble(NESTED_LOOPS))
+
+        assert sorted(cfg.blocks) == [0, 2, 4, 6, 8]
+        assert cfg.blocks[4].instructions == [4, 5]
+        assert cfg.blocks[4].end == 6
+        assert (cfg.blocks[4].first_line, cfg.blocks[4].last_line) == (6, 7)
+        assert cfg.block_at(5) is cfg.blocks[4]
+        assert cfg.block_at(1) is None  # data word of 'mov cx, 3'
+
+    def test_edges(self):
+        """#build_cfg should link blocks by fall through and jumps"""
+        cfg = build_cfg(assemble(NESTED_LOOPS))
+
+        assert cfg.blocks[4].successors == [Edge(4, 4, TAKEN), Edge(4, 6, FALLTHROUGH)]
+        assert cfg.blocks[6].successors == [Edge(6, 2, TAKEN), Edge(6, 8, FALLTHROUGH)]
+        assert cfg.blocks[8].successors == []
+        assert Edge(4, 4, TAKEN) in cfg.blocks[4].predecessors
+
+    def test_unknown_edges(self):
+        """Jumps to a register or a memory address have unknown targets"""
+        cfg = build_cfg(
+            assemble(
+                """
+                jmp ax
+                jz [100]
+                jmp 0
+                """
+            )
+        )
+
+        assert cfg.blocks[0].successors == [Edge(0, None, UNKNOWN)]
+        assert cfg.blocks[1].successors == [Edge(1, None, UNKNOWN), Edge(1, 2, FALLTHROUGH)]
+        assert cfg.blocks[2].successors == [Edge(2, 0, JUMP)]
+
+    def test_loops(self):
+        """Loops should be identified by their back edges"""
+        cfg = build_cfg(assemble(NESTED_LOOPS))
+
+        assert cfg.back_edges == [Edge(4, 4, TAKEN), Edge(6, 2, TAKEN)]
+        assert [(loop.header, sorted(loop.blocks)) for loop in cfg.loops] == [
+            (2, [2, 4, 6]),
+            (4, [4]),
+        ]
+        assert (cfg.loops[0].first_line, cfg.loops[0].last_line) == (4, 9)
+        assert cfg.is_back_edge_source(5)
+        assert cfg.is_back_edge_source(7)
+        assert not cfg.is_back_edge_source(4)
+
+    def test_from_memory(self):
+        """A loaded memory should give the same graph, taken from the cache"""
+        asmd = assemble(NESTED_LOOPS)
+        cpu = CPU()
+        cpu.set_memory_block(asmd["words"])
+
+        assert build_cfg(cpu.memory) is build_cfg(asmd)
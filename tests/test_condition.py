@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.simulator.condition import compile_condition
+from austro.simulator.cpu import CPU, CPUException
+
+
+class Test_compile_condition:
+    def test_registers_and_memory(self):
+        """A condition should read the current registers and memory"""
+        cpu = CPU()
+        condition = compile_condition("AX == 7 and [0x80] > 3", cpu.registers, cpu.memory)
+        assert not condition(1)
+
+        cpu.registers["AX"] = 7
+        cpu.memory[0x80] = 4
+        assert condition(1)
+
+        cpu.memory[0x80] = 3
+        assert not condition(1)
+
+    def test_expressions(self):
+        cpu = CPU()
+        cpu.registers["BX"] = 0x1234
+        cpu.memory[0x12] = 5
+
+        def check(expression: str) -> bool:
+            return compile_condition(expression, cpu.registers, cpu.memory)(10)
+
+        assert check("bh == 0x12 and bl == 0x34")
+        assert check("[bh] + 1 == 6")
+        assert check("not (Z or N)")
+        assert check("HITS % 5 == 0")
+        assert check("(bx >> 4) & 0xf == 3")
+
+    def test_division_by_zero(self):
+        """Division and modulo by zero should give 0 rather than fail the run"""
+        cpu = CPU()
+        cpu.registers["AX"] = 7
+
+        def check(expression: str) -> bool:
+            return compile_condition(expression, cpu.registers, cpu.memory)(1)
+
+        assert check("ax // bx == 0")
+        assert check("ax % [0x80] == 0")
+        assert check("(ax + 1) // 2 == 4 and ax % 4 == 3")
+
+        cpu.set_memory_block(assemble("mov cx, 3\nloop:\ndec cx\njnz loop\nhalt")["words"])
+        cpu.add_breakpoint(2, "ax // bx > 0")
+        assert cpu.start()
+
+    def test_invalid(self):
+        cpu = CPU()
+
+        def compile(expression: str) -> None:
+            compile_condition(expression, cpu.registers, cpu.memory)
+
+        with pytest.raises(CPUException, match="unknown name 'ex'"):
+            compile("ex == 1")
+        with pytest.raises(CPUException, match="unknown name 'TMP'"):
+            compile("TMP == 1")
+        with pytest.raises(CPUException, match="one address"):
+            compile("[1, 2] == 0")
+        with pytest.raises(CPUException, match="unsupported syntax 'print\\(1\\)'"):
+            compile("print(1)")
+        with pytest.raises(CPUException, match="unsupported syntax 'Pow'"):
+            compile("AX ** 2")
+        with pytest.raises(CPUException, match="unsupported value 'a'"):
+            compile("AX == 'a'")
+        with pytest.raises(CPUException, match="invalid condition 'AX ='"):
+            compile("AX =")
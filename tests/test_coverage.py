@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import pickle
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.simulator.coverage import (
+    CoverageMap,
+    LineCoverage,
+    json_report,
+    lcov_report,
+    line_coverage,
+    text_report,
+)
+from austro.simulator.cpu import CPU, CPUException
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tests.conftest import Run
+
+
+PROGRAM = """
+    mov ax, [100]
+    cmp ax, 0
+    jz zero
+    mov bx, 1
+    halt
+zero:
+    mov bx, 2
+    halt
+"""
+WORDS = assemble(PROGRAM)["words"]
+
+
+def cover(cpu: CPU, value: int, coverage: None | CoverageMap = None) -> CoverageMap:
+    """Attach a coverage map to the CPU, with the value the program reads"""
+    cpu.coverage = coverage or CoverageMap(cpu.memory.size)
+    cpu.memory[100] = value
+    return cpu.coverage
+
+
+class TestCoverageMap:
+    def test_executed(self, run: Run):
+        """Only the address of each instruction should be marked"""
+        coverage = run(WORDS, cover, 0)
+
+        assert [a for a in range(12) if coverage.is_executed(a)] == [0, 2, 4, 8, 10]
+        assert coverage.outcomes(4) == (True, False)
+        assert run(WORDS, cover, 5).outcomes(4) == (False, True)
+
+    def test_fused_pairs(self, run: Run):
+        """Jumps fused with the compare should be covered the same"""
+        assert run(WORDS, cover, 0, stepping=True) == run(WORDS, cover, 0)
+        assert run(WORDS, cover, 5, stepping=True) == run(WORDS, cover, 5)
+
+    def test_merge(self, run: Run):
+        """Coverage of many runs should add up, also from another process"""
+        coverage = run(WORDS, cover, 0)
+        coverage.merge(pickle.loads(pickle.dumps(run(WORDS, cover, 5))))
+
+        assert all(coverage.is_executed(a) for a in (0, 2, 4, 5, 7, 8, 10))
+        assert coverage.outcomes(4) == (True, True)
+        assert run(WORDS, cover, 5, run(WORDS, cover, 0)) == coverage
+
+        with pytest.raises(CPUException):
+            coverage.merge(CoverageMap(16))
+
+    def test_kept_on_reset(self):
+        cpu = CPU()
+        cpu.coverage = CoverageMap(cpu.memory.size)
+        cpu.set_memory_block(WORDS)
+        cpu.start()
+        cpu.reset(to_image=True)
+        cpu.memory[100] = 5
+        cpu.start()
+
+        assert cpu.coverage.outcomes(4) == (True, True)
+
+    def test_save_and_load(self, tmp_path: Path, run: Run):
+        path = tmp_path / "coverage.json"
+        coverage = run(WORDS, cover, 0)
+        coverage.save(path)
+
+        assert CoverageMap.load(path) == coverage
+        assert CoverageMap.load(path) != run(WORDS, cover, 5)
+
+    def test_clear(self, run: Run):
+        coverage = run(WORDS, cover, 0)
+        coverage.clear()
+        assert coverage == CoverageMap(coverage.size)
+
+
+class TestReports:
+    def test_line_coverage(self, run: Run):
+        lines = line_coverage(run(WORDS, cover, 0), WORDS)
+
+        assert lines == {
+            2: LineCoverage(1, 1, 0, 0),
+            3: LineCoverage(1, 1, 0, 0),
+            4: LineCoverage(1, 1, 2, 1),
+            5: LineCoverage(1, 0, 0, 0),
+            6: LineCoverage(1, 0, 0, 0),
+            8: LineCoverage(1, 1, 0, 0),
+            9: LineCoverage(1, 1, 0, 0),
+        }
+
+    def test_text_report(self, run: Run):
+        report = text_report(line_coverage(run(WORDS, cover, 0), WORDS), "program.asm")
+
+        assert report.splitlines() == [
+            "program.asm: 5/7 lines (71.4%), 1/2 branches (50.0%)",
+            "lines not run: 5-6",
+            "branches not covered: 4",
+        ]
+
+    def test_json_report(self, run: Run):
+        report = json_report(line_coverage(run(WORDS, cover, 5), WORDS))
+
+        assert report[2] == {
+            "line": 4,
+            "instructions": 1,
+            "executed": 1,
+            "branches": 2,
+            "branches_covered": 1,
+        }
+
+    def test_lcov_report(self, run: Run):
+        report = lcov_report(run(WORDS, cover, 0), WORDS, "/src/program.asm", "unit")
+
+        assert report.splitlines() == [
+            "TN:unit",
+            "SF:/src/program.asm",
+            "BRDA:4,4,0,1",
+            "BRDA:4,4,1,0",
+            "BRF:2",
+            "BRH:1",
+            "DA:2,1",
+            "DA:3,1",
+            "DA:4,1",
+            "DA:5,0",
+            "DA:6,0",
+            "DA:8,1",
+            "DA:9,1",
+            "LF:7",
+            "LH:5",
+            "end_of_record",
+        ]
@@ -2,21 +2,32 @@ from __future__ import annotations
 
 import re
 
+from array import array
+from ctypes import c_int8, c_int16
 from typing import Sequence, override
 
 import pytest
 
-from austro.asm.assembler import REGISTERS, assemble
-from austro.asm.memword import DWord
+from austro.asm.assembler import OPCODES, REGISTERS, assemble
+from austro.asm.memword import DWord, IWord
 from austro.simulator.cpu import (
+    BREAKPOINT,
     CPU,
+    WATCH_CHANGE,
+    WATCH_READ,
+    WATCH_WRITE,
+    Break,
+    CostModel,
     CPUException,
+    Event,
     Memory,
+    MemoryObserver,
     Registers,
     RegisterWord,
     Stage,
     StepListener,
 )
+from austro.simulator.loopdetect import InfiniteLoopDetector
 from austro.simulator.register import Reg16
 
 
@@ -784,6 +795,60 @@ class TestCPU__ALU:
         assert_cpu_history(assembly, registers, history)
 
 
+class TestCPU__ALU_tables:
+    """CPU (ALU lookup tables)"""
+
+    @staticmethod
+    def reference_alu(registers: Registers, operation: int, in1: int, in2: int) -> int | None:
+        # The ALU as implemented with ctypes, before the lookup tables
+        opcode = operation >> 2
+        bits = 8 if operation & 0b10 else 16
+        signed = operation & 0b1
+        if signed:
+            ctype = c_int8 if bits == 8 else c_int16
+            in1, in2 = ctype(in1).value, ctype(in2).value
+
+        result = None
+        if opcode in (OPCODES["ADD"], OPCODES["SUB"], OPCODES["INC"], OPCODES["DEC"]):
+            result = {
+                OPCODES["ADD"]: in1 + in2,
+                OPCODES["SUB"]: in1 - in2,
+                OPCODES["INC"]: in1 + 1,
+                OPCODES["DEC"]: in1 - 1,
+            }[opcode]
+            registers["V"] = int(result >> bits != 0)
+        elif opcode == OPCODES["MUL"]:
+            result = in1 * in2
+            if signed:
+                registers["N"] = int(result < 0)
+                registers["V"] = int(result >> bits != 0)
+        elif opcode == OPCODES["CMP"]:
+            registers["N"] = int(in1 - in2 < 0)
+            registers["Z"] = int(in1 - in2 == 0)
+
+        if result is not None:
+            registers["Z"] = int(result & (0xFF if bits == 8 else 0xFFFF) == 0)
+
+        return result
+
+    @pytest.mark.parametrize("opname", ["ADD", "SUB", "INC", "DEC", "CMP", "IMUL"])
+    @pytest.mark.parametrize("alu_flags", [0b00, 0b01, 0b10, 0b11])
+    def test_alu_matches_reference(self, cpu: CPU, opname: str, alu_flags: int):
+        """ALU results and flags should be bit-identical to the ctypes implementation"""
+        operation = OPCODES[opname] << 2 | alu_flags
+        if opname == "IMUL":
+            operation |= 0b1  # IMUL is MUL always signed
+        values = [*range(0, 0x100, 5), 0xFF, 0x100, 0x7FFF, 0x8000, 0xFFFF]
+        expected = Registers()
+
+        for in1 in values:
+            for in2 in values:
+                result = cpu.alu(operation, in1, in2)
+                assert result == self.reference_alu(expected, operation, in1, in2)
+                for flag in "N", "Z", "V":
+                    assert cpu.registers[flag] == expected[flag], (opname, in1, in2, flag)
+
+
 class TestCPU__UC:
     """CPU (Control Unit)"""
 
@@ -1386,6 +1451,492 @@ class TestCPU__SHIFT:
         assert_cpu_history(assembly, registers, history)
 
 
+class TestCPU__fusion:
+    """CPU (fused compare/increment/decrement and jump)"""
+
+    assembly = """
+            mov cx, 4
+            mov bx, 2
+        outer:
+            mov al, 253
+        inner:
+            inc al
+            jnz inner       # INC Reg + JNZ
+            icmp bx, -1
+            jlt done        # ICMP Reg, Const + JLT
+            cmp cx, bx
+            je skip         # CMP Reg, Reg + JE
+            inc dx
+            jmp cont        # INC Reg + JMP
+        skip:
+            mov [200], cx
+        cont:
+            dec cx
+            jnz outer       # DEC Reg + JNZ
+        done:
+            halt
+    """
+
+    @staticmethod
+    def run(assembly: str, *listeners: StepListener, patch: None | tuple[int, int] = None):
+        cpu = CPU(*listeners)
+        cpu.set_memory_block(assemble(assembly)["words"])
+        if patch is not None:
+            cpu.memory[patch[0]] = patch[1]
+        assert cpu.start() is True
+        return cpu
+
+    @staticmethod
+    def state(cpu: CPU):
+        return [r.value for _, r in cpu.registers], [w.value for _, w in cpu.memory]
+
+    def test_pairs_found_on_load(self):
+        cpu = CPU()
+        cpu.set_memory_block(assemble(self.assembly)["words"])
+
+        assert sorted(cpu._fused) == [6, 8, 11, 13, 17]
+
+    def test_same_state_as_unfused(self):
+        """Fused run should leave the same registers and memory as running every instruction"""
+        fused = self.run(self.assembly)
+        unfused = self.run(self.assembly, ShowCpuState("PC"))
+
+        assert self.state(fused) == self.state(unfused)
+        assert fused.registers["DX"] == 3
+        assert fused.memory[200] == 2
+
+    def test_overwritten_code_is_not_fused(self):
+        """Pairs are verified against memory before being executed"""
+        # replace 'jnz inner' with 'jmp done'
+        jmp_done = IWord(OPCODES["JMP"], flags=2, operand=19).value
+
+        fused = self.run(self.assembly, patch=(7, jmp_done))
+        unfused = self.run(self.assembly, ShowCpuState("PC"), patch=(7, jmp_done))
+
+        assert self.state(fused) == self.state(unfused)
+        assert fused.registers["AL"] == 254
+
+    def test_no_fusion_when_stepping(self):
+        listener = ShowCpuState("PC")
+        self.run(self.assembly, listener)
+
+        cpu = CPU()
+        cpu.set_memory_block(assemble(self.assembly)["words"])
+        steps = 0
+        while cpu.stage != Stage.HALTED:
+            next(cpu)
+            steps += 1
+
+        # one step to fetch the first instruction, then one per instruction
+        assert steps == 1 + len(listener.history)
+
+
+class TestCPU__snapshot:
+    """CPU snapshots and forks"""
+
+    PROGRAM = """
+        mov cx, 5
+        loop:
+        add [300], cx
+        dec cx
+        jnz loop
+        mov ax, [300]
+        halt
+    """
+
+    def load(self) -> CPU:
+        cpu = CPU(address_space=1024)
+        cpu.set_memory_block(assemble(self.PROGRAM)["words"])
+        cpu.memory[300] = 0
+        return cpu
+
+    def test_restore(self):
+        """Restoring a snapshot should bring back registers, memory and stage"""
+        cpu = self.load()
+        for _ in range(12):
+            next(cpu)
+        snapshot = cpu.snapshot()
+        state = (cpu.registers.snapshot(), cpu.memory[300], cpu.stage)
+
+        cpu.start()
+        assert cpu.registers["AX"] == 15
+
+        cpu.restore(snapshot)
+        assert (cpu.registers.snapshot(), cpu.memory[300], cpu.stage) == state
+
+        cpu.start()
+        assert cpu.registers["AX"] == 15
+
+    def test_copy_on_write(self):
+        """Writing after a snapshot should copy only the page written"""
+        cpu = self.load()
+        snapshot = cpu.snapshot()
+
+        cpu.memory[300] = 42
+        assert cpu.memory._pages[0] is snapshot.memory._pages[0]
+        assert cpu.memory._pages[1] is not snapshot.memory._pages[1]
+        assert snapshot.memory._pages[1] is not None
+        assert snapshot.memory._pages[1].values[300 - 256] == 0
+
+    def test_fork(self):
+        """A fork should run on its own from the state of the original"""
+        cpu = self.load()
+        for _ in range(6):
+            next(cpu)
+
+        added = cpu.memory[300]
+        fork = cpu.fork()
+        fork.memory[300] = 100
+        fork.start()
+        cpu.start()
+
+        assert 0 < added < 15
+        assert fork.registers["AX"] == 100 + 15 - added
+        assert cpu.registers["AX"] == 15
+        assert fork.memory.size == 1024
+
+    def test_reset_to_image(self):
+        """Reset to image should bring back the memory as loaded, for another run"""
+        cpu = CPU(address_space=1024)
+        cpu.set_memory_block(assemble(self.PROGRAM)["words"])
+        program_page = cpu.memory._pages[0]
+        cpu.memory[300] = 10
+        cpu.start()
+        assert cpu.registers["AX"] == 25
+
+        cpu.reset(to_image=True)
+        assert cpu.stage == Stage.INITIAL
+        assert all(r.value == 0 for _, r in cpu.registers)
+        assert cpu.memory[300] == 0
+        # Only the page written since the load is replaced
+        assert cpu.memory._pages[0] is program_page
+        assert cpu.memory._pages[1] is None
+
+        cpu.memory[300] = 1
+        cpu.start()
+        assert cpu.registers["AX"] == 16
+
+        cpu.reset()
+        assert cpu.memory.extent == 0
+
+    def test_restore_notifies_observers(self):
+        """Observers should see the words changed by a restore"""
+
+        class Recorder(MemoryObserver):
+            def __init__(self) -> None:
+                self.writes: list[tuple[int, int, int]] = []
+
+            @override
+            def on_write(self, address: int, old: int, new: int) -> None:
+                self.writes.append((address, old, new))
+
+            @override
+            def on_clear(self) -> None:
+                pass
+
+        cpu = self.load()
+        snapshot = cpu.snapshot()
+        cpu.memory[300] = 7
+        cpu.memory[301] = 8
+
+        recorder = Recorder()
+        cpu.memory.attach(recorder)
+        cpu.restore(snapshot)
+
+        assert recorder.writes == [(300, 7, 0), (301, 8, 0)]
+
+
+class TestCPU__breakpoints:
+    """Breakpoints and watchpoints"""
+
+    PROGRAM = """
+        mov cx, 3
+        loop:
+        add [300], cx
+        dec cx
+        jnz loop
+        mov ax, [300]
+        halt
+    """
+
+    def load(self) -> CPU:
+        cpu = CPU(address_space=1024)
+        cpu.set_memory_block(assemble(self.PROGRAM)["words"])
+        return cpu
+
+    def test_breakpoint(self):
+        """A run should stop before executing the instruction at a breakpoint"""
+        cpu = self.load()
+        cpu.add_breakpoint(4)
+
+        hits = []
+        while not cpu.start():
+            assert cpu.last_break == Break(4, BREAKPOINT)
+            assert cpu.stage == Stage.DECODE
+            hits.append((cpu.registers["PC"], cpu.registers["CX"]))
+
+        assert hits == [(4, 3), (4, 2), (4, 1)]
+        assert cpu.last_break is None
+        assert cpu.registers["AX"] == 6
+
+    def test_breakpoint_after_snapshot(self):
+        """A breakpoint added to a fused jump after a snapshot should be kept by restore"""
+        cpu = self.load()
+        snapshot = cpu.snapshot()
+        cpu.add_breakpoint(5)
+        cpu.restore(snapshot)
+
+        assert not cpu.start()
+        assert cpu.last_break == Break(5, BREAKPOINT)
+        assert cpu.registers["CX"] == 2
+
+    def test_conditional_breakpoint(self):
+        """A conditional breakpoint should stop only when its condition holds"""
+        cpu = self.load()
+        cpu.add_breakpoint(4, "CX == 1 or [300] == 3")
+
+        hits = []
+        while not cpu.start():
+            hits.append(cpu.registers["CX"])
+        assert hits == [3, 1]
+
+        cpu.reset(to_image=True)
+        cpu.add_breakpoint(4, "HITS == 2")
+        assert not cpu.start()
+        assert cpu.registers["CX"] == 2
+        assert cpu.start()
+
+        # A breakpoint added again without condition stops always
+        cpu.reset(to_image=True)
+        cpu.add_breakpoint(4)
+        assert not cpu.start()
+        assert cpu.registers["CX"] == 3
+
+    def test_breakpoint_at_entry(self):
+        cpu = self.load()
+        cpu.add_breakpoint(0)
+
+        assert not cpu.start()
+        assert cpu.registers["PC"] == 0
+        assert cpu.start()
+
+    def test_breakpoint_on_fused_jump(self):
+        """A jump at a breakpoint should not be fused with the instruction before it"""
+        cpu = self.load()
+        assert 4 in cpu._fused
+
+        cpu.add_breakpoint(5)
+        assert 4 not in cpu._fused
+        assert not cpu.start()
+        assert cpu.registers["PC"] == 5
+
+        cpu.remove_breakpoint(5)
+        assert 4 in cpu._fused
+        assert cpu.breakpoints == []
+        assert cpu.start()
+
+    def test_watch_write(self):
+        """A run should stop after the instruction writing a watched address"""
+        cpu = self.load()
+        cpu.add_watchpoint(300)
+
+        assert not cpu.start()
+        assert cpu.last_break == Break(2, WATCH_WRITE, 300, 0, 3)
+        assert cpu.registers["PC"] == 4
+
+        assert not cpu.start()
+        assert cpu.last_break == Break(2, WATCH_WRITE, 300, 3, 5)
+
+    def test_watch_change(self):
+        """A change watchpoint should ignore writes of the same value"""
+        cpu = CPU(address_space=1024)
+        cpu.set_memory_block(
+            assemble(
+                """
+                mov [300], ax
+                inc ax
+                mov [300], ax
+                add [300], ax
+                halt
+                """
+            )["words"]
+        )
+        cpu.add_watchpoint(300, WATCH_CHANGE)
+
+        assert not cpu.start()
+        assert cpu.last_break == Break(3, WATCH_CHANGE, 300, 0, 1)
+        assert not cpu.start()
+        assert cpu.last_break == Break(5, WATCH_CHANGE, 300, 1, 2)
+        assert cpu.start()
+
+    def test_watch_read(self):
+        cpu = self.load()
+        cpu.add_watchpoint(300, WATCH_READ)
+
+        # The add reads its memory operand too
+        assert not cpu.start()
+        assert cpu.last_break == Break(2, WATCH_READ, 300, new=0)
+
+        cpu.remove_watchpoint(300)
+        cpu.add_watchpoint(300, WATCH_READ | WATCH_WRITE)
+        assert cpu.watchpoints == {300: WATCH_READ | WATCH_WRITE}
+
+        cpu.clear_watchpoints()
+        assert cpu.start()
+        assert cpu._watched is None
+
+    def test_invalid(self):
+        cpu = CPU()
+        with pytest.raises(CPUException, match="address 256 outside address space"):
+            cpu.add_breakpoint(256)
+        with pytest.raises(CPUException, match="invalid watchpoint kind: 8"):
+            cpu.add_watchpoint(10, 8)
+
+
+class TestCPU__events:
+    """Event bus of the CPU"""
+
+    PROGRAM = """
+        mov ax, 2
+        mov [100], ax
+        loop:
+        dec ax
+        jnz loop
+        halt
+    """
+
+    def run(self, *events: Event, program: str = PROGRAM) -> dict[Event, list[tuple]]:
+        cpu = CPU()
+        cpu.set_memory_block(assemble(program)["words"])
+        received: dict[Event, list[tuple]] = {event: [] for event in events}
+        for event in events:
+            cpu.events.subscribe(event, received[event].append)
+        try:
+            cpu.start()
+        except CPUException:
+            pass
+        return received
+
+    def test_control_events(self):
+        received = self.run(Event.FETCH, Event.JUMP, Event.HALT)
+
+        assert [address for address, _ in received[Event.FETCH]] == [0, 2, 4, 5, 4, 5, 6]
+        assert received[Event.FETCH][0] == (0, assemble(self.PROGRAM)["words"][0].value)
+        assert received[Event.JUMP] == [(5, 4)]
+        assert received[Event.HALT] == [(6,)]
+
+    def test_stage_events(self):
+        received = self.run(Event.DECODE, Event.EXECUTE, Event.STORE)
+        ax = Registers.INDEX["AX"]
+        tmp = Registers.INDEX["TMP"]
+
+        assert [payload[0] for payload in received[Event.DECODE]] == [0, 2, 4, 5, 4, 5, 6]
+        assert received[Event.DECODE][0] == (0, CPU.UC, OPCODES["MOV"], ax, 19)
+        assert received[Event.EXECUTE][2] == (4, CPU.ALU, OPCODES["DEC"] << 2, 1)
+        assert received[Event.STORE] == [(2, tmp, 100, 2), (4, ax, None, 1), (4, ax, None, 0)]
+
+    def test_write_events(self):
+        received = self.run(Event.MEMORY_WRITE, Event.REGISTER_WRITE)
+        ax = Registers.INDEX["AX"]
+
+        assert received[Event.MEMORY_WRITE] == [(100, 0, 2)]
+        assert [p for p in received[Event.REGISTER_WRITE] if p[0] == ax] == [
+            (ax, 0, 2),
+            (ax, 2, 1),
+            (ax, 1, 0),
+        ]
+
+    def test_fault(self):
+        # Runs into the zeroed memory (NOP) until the end of the address space
+        received = self.run(Event.FAULT, program="jmp 250\nhalt")
+
+        assert received[Event.FAULT] == [(256, "PC register greater than address space")]
+
+    def test_unsubscribe(self):
+        """Without subscribers, memory and registers should not be observed"""
+        cpu = CPU()
+        received: list[tuple] = []
+        cpu.events.subscribe(Event.MEMORY_WRITE, received.append)
+        cpu.events.subscribe(Event.REGISTER_WRITE, received.append)
+        cpu.memory[10] = 1
+        cpu.registers["AX"] = 2
+        assert received == [(10, 0, 1), (Registers.INDEX["AX"], 0, 2)]
+
+        cpu.events.unsubscribe(Event.MEMORY_WRITE, received.append)
+        cpu.events.unsubscribe(Event.REGISTER_WRITE, received.append)
+        assert cpu.events not in cpu.memory._observers
+        assert cpu.registers._on_write is None
+
+
+class TestCPU__costs:
+    """Instruction and cycle counters"""
+
+    PROGRAM = """
+        mov cx, 3
+        loop:
+        add [200], cx
+        mul ax, 3
+        dec cx
+        jnz loop
+        mov ax, [200]
+        halt
+    """
+
+    def test_instruction_costs(self):
+        model = CostModel()
+        table = model.table()
+
+        def cost(assembly: str) -> int:
+            return table[assemble(assembly)["words"][0].value >> 8]
+
+        assert cost("mov ax, bx") == model.fetch + model.uc
+        assert cost("mov ax, 5") == model.fetch + model.operand_fetch + model.uc
+        assert cost("mov [10], ax") == 1 + 1 + model.store + model.uc
+        assert cost("add ax, [10]") == 1 + 1 + 1 + model.alu
+        assert cost("add [10], ax") == 1 + 1 + 1 + model.alu + model.store
+        assert cost("cmp [10], ax") == 1 + 1 + 1 + model.alu
+        assert cost("imul ax, bx") == model.fetch + model.mul
+        assert cost("mod ax, bx") == model.fetch + model.div
+        assert cost("shl [10], 2") == 1 + 1 + 1 + model.shift + model.store
+        assert cost("inc [10]") == 1 + 1 + model.alu + model.store
+        assert cost("jmp [10]") == 1 + 1 + model.uc
+        assert cost("halt") == model.fetch + model.uc
+
+    def test_counters(self):
+        """Counters should be the same whether instructions are fused or not"""
+        cpu = CPU()
+        cpu.set_memory_block(assemble(self.PROGRAM)["words"])
+        cpu.start()
+        assert (cpu.instructions, cpu.cycles) == (15, 3 + 3 * (5 + 6 + 2 + 2) + 4 + 2)
+
+        stepped = CPU(ShowCpuState("PC"))
+        stepped.set_memory_block(assemble(self.PROGRAM)["words"])
+        stepped.start()
+        assert (stepped.instructions, stepped.cycles) == (cpu.instructions, cpu.cycles)
+
+        cpu.reset(to_image=True)
+        assert (cpu.instructions, cpu.cycles) == (0, 0)
+
+    def test_cost_model(self):
+        cpu = CPU()
+        cpu.cost_model = CostModel(mul=10)
+        cpu.set_memory_block(assemble(self.PROGRAM)["words"])
+        for _ in range(4):
+            next(cpu)
+        snapshot = cpu.snapshot()
+        cpu.start()
+        assert cpu.cycles == 3 + 3 * (5 + 12 + 2 + 2) + 4 + 2
+
+        cpu.restore(snapshot)
+        assert (cpu.instructions, cpu.cycles) == (4, 3 + 5 + 12 + 2)
+        assert cpu.fork().cost_model == CostModel(mul=10)
+
+    def test_invalid_cost_model(self):
+        for cost in -1, 1 << 16, 1.5, True:
+            with pytest.raises(CPUException, match="invalid cost model, 'mul'"):
+                CostModel(mul=cost)  # type: ignore[arg-type]
+
+
 class TestRegisters:
     @pytest.fixture
     def registers(self):
@@ -1431,6 +1982,198 @@ class TestMemory:
             memory[9] = 42
 
 
+class TestMemory__pages:
+    def test_pages_allocated_on_write(self):
+        """Memory pages should be allocated only when written"""
+        memory = Memory(size=0x10000)
+        assert memory.extent == 0
+
+        assert memory[40000] == 0
+        assert memory.get_word(40000).value == 0
+        assert memory.extent == 0
+
+        memory[1000] = 42
+        assert memory.extent == 1024
+        assert memory[1000] == 42
+
+    def test_word_view(self):
+        """Words got from memory should read and write through the memory"""
+        memory = Memory(size=512)
+        word = memory.get_word(300)
+
+        memory.set_word(300, IWord(OPCODES["INC"], 0, 0x10, lineno=7))
+        assert word.is_instruction
+        assert word.lineno == 7
+        assert word.opcode == OPCODES["INC"]
+
+        word.value = 0x1FFFF
+        assert memory[300] == 0xFFFF
+
+    def test_clear_drops_pages(self):
+        memory = Memory(size=512)
+        memory.set_word(300, IWord(OPCODES["INC"], 0, 0x10, lineno=7))
+        memory.clear()
+
+        assert memory.extent == 0
+        assert memory[300] == 0
+        assert not memory.get_word(300).is_instruction
+
+    def test_cpu_address_space(self):
+        """CPU should run programs using the configured address space"""
+        cpu = CPU(address_space=2048)
+        cpu.set_memory_block(
+            assemble(
+                """
+                mov ax, 7
+                mov [1500], ax
+                mov cx, 1
+                add [1500], cx
+                mov bx, [1500]
+                halt
+                """
+            )["words"]
+        )
+        cpu.start()
+
+        assert cpu.memory.size == 2048
+        assert cpu.registers["BX"] == 8
+
+        with pytest.raises(CPUException, match="Address out of memory range"):
+            cpu.memory[2048]
+
+    def test_pc_wraps_in_full_address_space(self):
+        """PC should wrap from the last word to 0, as there is no address past it"""
+        cpu = CPU(address_space=0x10000)
+        cpu.set_memory_block(
+            assemble(
+                """
+                inc cx
+                cmp cx, 2
+                jz done
+                mov bx, 0xFFFF
+                jmp bx
+                done:
+                halt
+                """
+            )["words"]
+        )
+        cpu.set_memory_block(assemble("inc ax")["words"], start=0xFFFF)
+
+        assert cpu.start()
+        assert (cpu.registers["AX"], cpu.registers["CX"]) == (1, 2)
+
+    def test_error_address_space_too_large(self):
+        with pytest.raises(CPUException, match="address space must be from 1 to 65536 words"):
+            CPU(address_space=0x10001)
+
+
+class TestMemory__bulk:
+    """Memory bulk operations"""
+
+    def test_load_and_read(self):
+        """Data loaded across pages should be read back the same"""
+        memory = Memory(size=1024)
+        memory.load(250, range(1, 21))
+
+        assert memory.read(250, 20) == array("H", range(1, 21))
+        assert memory.read(240, 10) == array("H", [0] * 10)
+        assert memory[269] == 20
+        assert not memory.get_word(260).is_instruction
+
+    def test_load_buffer(self):
+        """Buffers of 16-bit words should be loaded as they are"""
+        memory = Memory(size=1024)
+        memory.load(10, array("H", [1, 0xFFFF]))
+        memory.load(20, memoryview(array("H", [3, 4])).cast("B"))
+
+        assert memory.read(10, 2).tolist() == [1, 0xFFFF]
+        assert memory.read(20, 2).tolist() == [3, 4]
+
+    def test_load_truncates_ints(self):
+        """Ints should be truncated to 16 bits, as when written one by one"""
+        memory = Memory(size=1024)
+        memory.load(10, [0x12345, -1])
+        memory[20] = 0x12345
+
+        assert memory.read(10, 2).tolist() == [0x2345, 0xFFFF]
+        assert memory[20] == 0x2345
+
+    def test_load_signed_words(self):
+        memory = Memory(size=1024)
+        memory.load(10, array("h", [-1, 2]))
+
+        assert memory.read(10, 2).tolist() == [0xFFFF, 2]
+
+    def test_error_not_words(self):
+        """Buffers of other item sizes and odd bytes should be rejected"""
+        memory = Memory(size=1024)
+
+        with pytest.raises(CPUException, match="not of 16-bit words"):
+            memory.load(0, array("i", [1, 2]))
+        with pytest.raises(CPUException, match="not of 16-bit words"):
+            memory.load(0, array("d", [1.0]))
+        with pytest.raises(CPUException, match="not of 16-bit words"):
+            memory.load(0, b"abc")
+        with pytest.raises(CPUException, match="not contiguous"):
+            memory.load(0, memoryview(array("h", [1, 2, 3, 4]))[::2])
+        assert memory.extent == 0
+
+    def test_error_not_one_dimension(self):
+        """Buffers of many dimensions should be rejected, not taken by their first one"""
+        memory = Memory(size=1024)
+        matrix = memoryview(array("H", [1, 2, 3, 4])).cast("B").cast("H", (2, 2))
+
+        with pytest.raises(CPUException, match="not one-dimensional"):
+            memory.load(0, matrix)
+        with pytest.raises(CPUException, match="not one-dimensional"):
+            memory.compare(0, matrix)
+        assert memory.extent == 0
+
+    def test_view(self):
+        """A range in a single page should be viewed without copying"""
+        memory = Memory(size=1024)
+        memory.load(300, [5, 6, 7])
+        view = memory.view(300, 3)
+
+        assert view.tolist() == [5, 6, 7]
+        assert view.readonly
+        assert view.obj is memory._pages[1].values
+        assert memory.view(250, 10).tolist() == [0] * 10
+
+    def test_fill_copy_compare(self):
+        memory = Memory(size=1024)
+        memory.fill(100, 300, 9)
+        memory.copy(100, 398, 4)
+
+        assert memory.compare(100, [9] * 302) is None
+        assert memory.compare(399, [9, 9, 9, 9]) == 402
+        assert memory.compare(100, memory.read(398, 4)) is None
+
+        memory.fill(0, 1024, 0)
+        assert memory.compare(0, bytes(2048)) is None
+
+    def test_observers_notified(self):
+        """Every word written in bulk should be seen by observers"""
+        cpu = CPU()
+        detector = InfiniteLoopDetector(cpu)
+        cpu.memory.load(10, [1, 2, 3])
+        cpu.memory.fill(12, 2, 5)
+
+        expected = InfiniteLoopDetector(CPU())
+        for address, value in (10, 1), (11, 2), (12, 5), (13, 5):
+            expected.on_write(address, 0, value)
+        assert detector._memory_hash == expected._memory_hash
+
+    def test_error_out_of_memory_range(self):
+        memory = Memory(size=8)
+
+        with pytest.raises(CPUException, match="Address out of memory range"):
+            memory.load(6, [1, 2, 3])
+        with pytest.raises(CPUException, match="Address out of memory range"):
+            memory.read(-1, 2)
+        assert memory.extent == 0
+
+
 class TestRegisterWord:
     def test_reg_word_wraps_register(self):
         reg = Reg16()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU
+from austro.simulator.flight import FlightRecord, FlightRecorder
+
+
+if TYPE_CHECKING:
+    from tests.conftest import Run
+
+
+PROGRAM = """
+    mov ax, 5
+    mov bx, 7
+    add ax, bx
+    mov al, 3
+    mov [200], ax
+    jmp 250
+"""
+FAULT = "PC register greater than address space"
+
+LOOP = """
+    mov cx, 10
+loop:
+    add ax, 2
+    dec cx
+    jnz loop
+    halt
+"""
+
+
+class TestFlightRecorder:
+    def test_records(self, run: Run):
+        """The instructions run should be kept with their lines and register changes"""
+        records = run(PROGRAM, FlightRecorder, size=64, fault=FAULT).records()
+        words = assemble(PROGRAM)["words"]
+
+        assert [r.pc for r in records] == [0, 2, 4, 5, 7, 9, *range(250, 256)]
+        assert records[0] == FlightRecord(0, words[0].value, 2, {"AX": (0, 5)})
+        assert records[2].deltas == {"AX": (5, 12)}  # flags not changed
+        assert records[3].deltas == {"AL": (12, 3)}
+        assert records[4].deltas == {}
+        assert records[-1] == FlightRecord(255, 0, 0, {})
+
+    def test_circular(self, run: Run):
+        """Only the last instructions should be kept"""
+        records = run(PROGRAM, FlightRecorder, size=4, fault=FAULT).records()
+
+        assert [r.pc for r in records] == [252, 253, 254, 255]
+
+    def test_replay(self, run: Run):
+        """Register changes should be found for the instructions kept of a long run"""
+        recorder = run(LOOP, FlightRecorder, size=5)
+
+        assert [(r.pc, r.deltas) for r in recorder.records()] == [
+            (5, {}),
+            (2, {"AX": (18, 20)}),
+            (4, {"CX": (1, 0), "Z": (0, 1)}),
+            (5, {}),
+            (6, {}),
+        ]
+
+    def test_paused(self):
+        """An instruction fetched but not run yet has no changes"""
+        cpu = CPU()
+        recorder = FlightRecorder(cpu, size=5)
+        cpu.set_memory_block(assemble(LOOP)["words"])
+        cpu.add_breakpoint(2, "CX == 3")
+        cpu.start()
+
+        records = recorder.records()
+        assert (records[-1].pc, records[-1].deltas) == (2, {})
+        assert (records[-2].pc, records[-2].deltas) == (5, {})
+        assert (records[-3].pc, records[-3].deltas) == (4, {"CX": (4, 3)})
+
+    def test_restored(self):
+        """Changes are not known if the machine was restored after a state was taken"""
+        cpu = CPU()
+        recorder = FlightRecorder(cpu, size=5)
+        cpu.set_memory_block(assemble(LOOP)["words"])
+        snapshot = cpu.snapshot()
+        for _ in range(7):
+            next(cpu)
+        cpu.restore(snapshot)
+        next(cpu)
+        next(cpu)
+
+        records = recorder.records()
+        assert [record.pc for record in records] == [2, 4, 5, 0, 2]
+        assert all(record.deltas == {} for record in records)
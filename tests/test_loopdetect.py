@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU, Stage
+from austro.simulator.loopdetect import InfiniteLoopDetector, InfiniteLoopException, _word_hash
+
+
+def run(assembly: str) -> CPU:
+    cpu = CPU()
+    InfiniteLoopDetector(cpu)
+    cpu.set_memory_block(assemble(assembly)["words"])
+    cpu.start()
+    return cpu
+
+
+class TestInfiniteLoopDetector:
+    def test_spinning_loop(self):
+        """A jump to itself is an infinite loop"""
+        with pytest.raises(InfiniteLoopException) as e_info:
+            run(
+                """
+                mov ax, 1
+                spin:
+                jmp spin
+                """
+            )
+
+        assert e_info.value.pc == 2
+        assert e_info.value.lineno == 4
+        e_info.match("Infinite loop detected at address 2 \\(line 4\\)")
+
+    def test_loop_with_changing_registers(self):
+        """A loop is detected when the whole state repeats, even if registers change"""
+        with pytest.raises(InfiniteLoopException) as e_info:
+            run(
+                """
+                loop:
+                inc al
+                dec bl
+                cmp al, 0
+                jmp loop
+                """
+            )
+
+        assert e_info.value.pc == 4
+        assert e_info.value.lines == (3, 6)
+
+    def test_loop_writing_memory(self):
+        """Memory is part of the state, a counter in memory makes a finite loop"""
+        cpu = run(
+            """
+            loop:
+            mov ax, [200]
+            inc ax
+            mov [200], ax
+            cmp ax, 1000
+            jnz loop
+            halt
+            """
+        )
+
+        assert cpu.stage == Stage.HALTED
+        assert cpu.memory[200] == 1000
+
+    def test_memory_hash_is_incremental(self):
+        """Memory hash follows every write, as if calculated from scratch"""
+        cpu = CPU()
+        detector = InfiniteLoopDetector(cpu)
+        cpu.memory[10] = 5
+        cpu.memory[10] = 7
+        cpu.memory[20] = 9
+        cpu.memory[20] = 0
+
+        assert detector._memory_hash == _word_hash(10, 7)
+
+        cpu.reset()
+        assert detector._memory_hash == 0
+
+    def test_detach(self):
+        cpu = CPU()
+        detector = InfiniteLoopDetector(cpu)
+        detector.detach()
+
+        assert cpu.loop_detector is None
+        cpu.set_memory_block(assemble("spin: jmp spin")["words"])
+        for _ in range(10):
+            next(cpu)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from austro.simulator.pipeline import PipelineModel, PipelineStats
+
+
+if TYPE_CHECKING:
+    from tests.conftest import Run
+
+
+PROGRAM = """
+    mov cx, 3
+loop:
+    add [200], cx
+    mov ax, [200]
+    imul ax, cx
+    dec cx
+    jnz loop
+    halt
+"""
+
+
+class TestPipelineModel:
+    def test_overlap(self, run: Run):
+        """Independent instructions should complete one by cycle, after filling the pipeline"""
+        model = run("mov ax, bx \n mov cx, dx \n halt", PipelineModel)
+
+        assert model.stats == PipelineStats(3, 6, 0, 0, 0)
+        assert model.stats.cpi == 2.0
+
+    def test_data_hazard(self, run: Run):
+        """A register should be read only after the previous instruction stored it"""
+        model = run("mov ax, bx \n add cx, ax \n halt", PipelineModel)
+
+        assert model.stats == PipelineStats(3, 8, 2, 0, 0)
+        assert model.by_address() == {0: (1, 0, 0), 1: (1, 2, 0), 2: (1, 0, 0)}
+
+    def test_8bit_registers(self, run: Run):
+        """An 8-bit register is a part of its X register"""
+        assert run("mov al, bl \n add cx, ax \n halt", PipelineModel).stats.data_stalls == 2
+        assert run("mov al, bl \n add cx, bx \n halt", PipelineModel).stats.data_stalls == 0
+
+    def test_structural_hazard(self, run: Run):
+        """The second word of an instruction should delay the next fetch"""
+        model = run("mov ax, 5 \n mov bx, 6 \n halt", PipelineModel)
+
+        assert model.stats == PipelineStats(3, 8, 0, 2, 0)
+
+    def test_control_hazard(self, run: Run):
+        """The instructions fetched after a jump taken should be discarded"""
+        model = run("jmp end \n nop \n end: halt", PipelineModel)
+
+        assert model.stats == PipelineStats(2, 7, 0, 0, 2)
+        assert model.by_address()[0] == (1, 0, 2)
+
+        # Jumps not taken don't stall
+        assert run("jz end \n nop \n end: halt", PipelineModel).stats.bubbles == 0
+
+    def test_same_results(self, run: Run):
+        """The program should run as without the model"""
+        sequential = run(PROGRAM, lambda cpu: cpu)
+        model = run(PROGRAM, PipelineModel)
+        cpu = model.cpu
+
+        assert cpu.registers.snapshot() == sequential.registers.snapshot()
+        assert cpu.memory.read(0, 256) == sequential.memory.read(0, 256)
+        assert (cpu.instructions, cpu.cycles) == (sequential.instructions, sequential.cycles)
+        assert model.instructions == cpu.instructions
+        assert model.stats.cpi > 1
+
+    def test_report(self, run: Run):
+        report = run(PROGRAM, PipelineModel).report()
+
+        assert report["instructions"] == 17
+        assert report["cpi"] == report["cycles"] / 17
+        assert report["addresses"][0] == {
+            "pc": 0,
+            "line": 2,
+            "count": 1,
+            "stalls": 0,
+            "bubbles": 0,
+        }
+        loop_jump = report["addresses"][-2]
+        assert (loop_jump["line"], loop_jump["count"], loop_jump["bubbles"]) == (8, 3, 4)
+
+    def test_clear_and_detach(self, run: Run):
+        model = run(PROGRAM, PipelineModel)
+        cpu = model.cpu
+        model.clear()
+        assert model.stats == PipelineStats(0, 0, 0, 0, 0)
+        assert model.by_address() == {}
+
+        cpu.reset(to_image=True)
+        cpu.start()
+        assert model.stats == run(PROGRAM, PipelineModel).stats
+
+        model.detach()
+        assert not cpu.events.stepping
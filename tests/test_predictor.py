@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU, CPUException
+from austro.simulator.predictor import (
+    BranchStats,
+    GsharePredictor,
+    OneBitPredictor,
+    StaticPredictor,
+    TwoBitPredictor,
+    create_predictor,
+)
+
+
+if TYPE_CHECKING:
+    from tests.conftest import Run
+
+
+# The inner jump is taken 3 times and then falls through, 3 times
+NESTED_LOOPS = """
+    mov cx, 3
+outer:
+    mov bx, 4
+inner:
+    dec bx
+    jnz inner
+    dec cx
+    jnz outer
+    jmp end
+end:
+    halt
+"""
+
+
+class TestBranchPredictor:
+    def test_static(self, run: Run):
+        taken = run(NESTED_LOOPS, StaticPredictor)
+        assert taken.stats == BranchStats(15, 11)
+        assert run(NESTED_LOOPS, StaticPredictor, False).stats == BranchStats(15, 4)
+
+    def test_by_address(self, run: Run):
+        """Conditional jumps should be counted by address and line, JMP is not a branch"""
+        predictor = run(NESTED_LOOPS, StaticPredictor)
+
+        assert predictor.by_address() == {5: BranchStats(12, 9), 7: BranchStats(3, 2)}
+        assert predictor.by_line() == {7: BranchStats(12, 9), 9: BranchStats(3, 2)}
+        assert predictor.by_line()[7].accuracy == 0.75
+
+    def test_one_bit(self, run: Run):
+        """A single bit mispredicts the first and the last iteration of every loop"""
+        predictor = run(NESTED_LOOPS, OneBitPredictor)
+        assert predictor.by_address()[5] == BranchStats(12, 6)
+
+    def test_two_bits(self, run: Run):
+        """Two bits mispredict only the last iteration, once the loop was seen"""
+        predictor = run(NESTED_LOOPS, TwoBitPredictor)
+        assert predictor.by_address()[5] == BranchStats(12, 8)
+
+    def test_gshare(self, run: Run):
+        """The global history should predict a pattern repeated by the outer loop"""
+        assembly = NESTED_LOOPS.replace("mov cx, 3", "mov cx, 20")
+        gshare = run(assembly, GsharePredictor, 16)
+        assert gshare.by_address()[5] == BranchStats(80, 73)
+        assert run(assembly, TwoBitPredictor).by_address()[5] == BranchStats(80, 59)
+
+    def test_fused_pairs(self, run: Run):
+        """Jumps fused with the previous instruction should be seen the same"""
+        stepped = run(NESTED_LOOPS, TwoBitPredictor, stepping=True)
+        assert stepped.by_address() == run(NESTED_LOOPS, TwoBitPredictor).by_address()
+
+    def test_reset(self, run: Run):
+        predictor = run(NESTED_LOOPS, TwoBitPredictor)
+        predictor.cpu.reset(to_image=True)
+        assert predictor.stats == BranchStats(0, 0)
+
+        predictor.cpu.start()
+        assert predictor.stats == BranchStats(15, 9)
+
+    def test_report(self, run: Run):
+        report = run(NESTED_LOOPS, StaticPredictor).report()
+
+        assert (report["predictor"], report["branches"], report["correct"]) == ("taken", 15, 11)
+        assert report["lines"][0] == {"line": 7, "branches": 12, "correct": 9, "accuracy": 0.75}
+        assert report["addresses"][1]["pc"] == 7
+
+    def test_detach(self):
+        cpu = CPU()
+        predictor = TwoBitPredictor(cpu)
+        predictor.detach()
+
+        assert cpu.predictor is None
+        cpu.set_memory_block(assemble(NESTED_LOOPS)["words"])
+        cpu.start()
+        assert predictor.stats == BranchStats(0, 0)
+
+
+class Test_create_predictor:
+    def test_names(self):
+        cpu = CPU()
+        assert isinstance(create_predictor(cpu, "not-taken"), StaticPredictor)
+        assert cpu.predictor is not None and not cpu.predictor.predict(0, True)
+
+        predictor = create_predictor(cpu, "gshare:0x40")
+        assert isinstance(predictor, GsharePredictor)
+        assert predictor.size == 64
+        assert cpu.predictor is predictor
+
+    @pytest.mark.parametrize("spec", ["3bit", "taken:16", "2bit:100", "2bit:x"])
+    def test_invalid(self, spec: str):
+        with pytest.raises(CPUException):
+            create_predictor(CPU(), spec)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU
+from austro.simulator.profiler import LoopProfile, LoopProfiler
+
+
+if TYPE_CHECKING:
+    from tests.conftest import Run
+
+
+NESTED_LOOPS = """
+    mov cx, 3
+outer:
+    mov bx, 2
+inner:
+    dec bx
+    jnz inner
+    dec cx
+    jnz outer
+    halt
+"""
+
+
+class TestLoopProfiler:
+    def test_loops(self, run: Run):
+        """Loops should be ranked by their instructions, nested loops included"""
+        assert run(NESTED_LOOPS, LoopProfiler).loops() == [
+            LoopProfile(
+                jump=7, header=2, first_line=4, last_line=9, iterations=2, instructions=21
+            ),
+            LoopProfile(
+                jump=5, header=4, first_line=6, last_line=7, iterations=3, instructions=12
+            ),
+        ]
+
+    def test_counts(self, run: Run):
+        """Every instruction fetched should be counted once, at its address"""
+        profiler = run(NESTED_LOOPS, LoopProfiler)
+        counts = profiler.counts()
+
+        assert counts[:10] == [1, 1, 3, 3, 6, 6, 3, 3, 1, 0]
+        instructions = [0, 2, 4, 5, 6, 7, 8]
+        assert sum(counts[a] for a in instructions) == profiler.cpu.instructions
+
+    def test_same_with_events(self, run: Run):
+        """Instructions fused with a jump should be counted the same"""
+        stepped = run(NESTED_LOOPS, LoopProfiler, stepping=True)
+        assert stepped.loops() == run(NESTED_LOOPS, LoopProfiler).loops()
+
+    def test_partial_run(self):
+        """Counts should go up to the instruction fetched when stopped"""
+        cpu = CPU()
+        profiler = LoopProfiler(cpu)
+        cpu.set_memory_block(assemble(NESTED_LOOPS)["words"])
+        assert profiler.counts()[0] == 0
+
+        cpu.add_breakpoint(6)
+        cpu.start()
+        assert profiler.counts()[:8] == [1, 1, 1, 1, 2, 2, 1, 0]
+        assert profiler.loops()[0].instructions == 4
+
+    def test_report(self, run: Run):
+        report = run(NESTED_LOOPS, LoopProfiler).report()
+
+        assert [loop["jump"] for loop in report] == [7, 5]
+        assert report[1]["share"] == 12 / 23
+
+    def test_reset_and_detach(self, run: Run):
+        profiler = run(NESTED_LOOPS, LoopProfiler)
+        cpu = profiler.cpu
+        cpu.reset(to_image=True)
+        assert profiler.loops() == []
+
+        cpu.start()
+        assert profiler.loops() == run(NESTED_LOOPS, LoopProfiler).loops()
+
+        profiler.detach()
+        assert cpu.profiler is None
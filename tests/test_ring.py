@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import sys
+
+from typing import TYPE_CHECKING, override
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU, Registers, StepListener
+from austro.simulator.ring import RECORD_SIZE, BatchListener, EventRing
+
+
+if TYPE_CHECKING:
+    from austro.simulator.cpu import Memory
+    from tests.conftest import Run
+
+
+PROGRAM = """
+    mov cx, 3
+loop:
+    dec cx
+    jnz loop
+    halt
+"""
+
+
+class Collector(BatchListener):
+    def __init__(self) -> None:
+        self.batches: list[list[tuple[int, ...]]] = []
+
+    @override
+    def on_batch(self, records: memoryview) -> None:
+        flat = records.tolist()
+        self.batches.append(
+            [tuple(flat[i : i + RECORD_SIZE]) for i in range(0, len(flat), RECORD_SIZE)]
+        )
+
+
+def mask(*names: str) -> int:
+    return sum(1 << Registers.INDEX[name] for name in names)
+
+
+class TestEventRing:
+    def test_records(self, run: Run):
+        """Each instruction should be recorded with the registers it changed"""
+        collector = Collector()
+        run(PROGRAM, EventRing, collector, size=100)
+        words = assemble(PROGRAM)["words"]
+
+        assert len(collector.batches) == 1  # delivered on halt
+        records = collector.batches[0]
+        assert [r[0] for r in records] == [0, 2, 3, 2, 3, 2, 3, 4]
+        assert records[0] == (0, words[0].value, mask("CX", "PC"))
+        assert records[1] == (2, words[2].value, mask("CX", "PC"))
+        # Jump taken, Z unchanged
+        assert records[2][2] == mask("PC")
+        assert records[5] == (2, words[2].value, mask("CX", "PC", "Z"))
+        assert records[-1] == (4, words[4].value, 0)
+
+    def test_batches(self, run: Run):
+        """A full buffer should be delivered before recording more"""
+        collector = Collector()
+        run(PROGRAM, EventRing, collector, size=3)
+
+        assert [len(batch) for batch in collector.batches] == [3, 3, 2]
+        assert collector.batches[0][2][2] == mask("PC")
+        assert [r[0] for batch in collector.batches for r in batch] == [0, 2, 3, 2, 3, 2, 3, 4]
+
+    def test_fault(self, run: Run):
+        """Records should be delivered when the program faults"""
+        collector = Collector()
+        run("jmp 254", EventRing, collector, size=100, fault="PC register greater")
+
+        assert [r[0] for r in collector.batches[0]] == [0, 254, 255]
+
+    def test_detach(self):
+        cpu = CPU()
+        cpu.set_memory_block(assemble(PROGRAM)["words"])
+        collector = Collector()
+        ring = EventRing(cpu, collector)
+        for _ in range(3):
+            next(cpu)
+
+        ring.detach()
+        assert [r[0] for r in collector.batches[0]] == [0, 2, 3]
+        assert cpu.ring is None
+        assert not cpu.registers._hooked
+
+    def test_no_call_by_instruction(self):
+        """The ring should cost fewer Python calls than a step listener, with no subscriber"""
+        program = PROGRAM.replace("mov cx, 3", "mov cx, 500")
+
+        class Counter(StepListener):
+            @override
+            def on_fetch(self, registers: Registers, memory: Memory) -> None:
+                pass
+
+        def calls(cpu: CPU) -> int:
+            count = 0
+
+            def profile(frame, event, arg):
+                nonlocal count
+                count += event == "call"
+
+            cpu.set_memory_block(assemble(program)["words"])
+            sys.setprofile(profile)
+            try:
+                cpu.start()
+            finally:
+                sys.setprofile(None)
+            return count
+
+        stepped = CPU()
+        stepped.listeners.append(Counter())
+        batched = CPU()
+        collector = Collector()
+        EventRing(batched, collector, size=100)
+
+        assert calls(batched) < calls(stepped)
+        assert batched.events.fetch == batched.events.register_write == ()
+        assert len(collector.batches) == 11
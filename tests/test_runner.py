@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from austro.simulator.cpu import WATCH_CHANGE, WATCH_READ
+from austro.simulator.runner import main, parse_break, parse_cache, parse_watch
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+PROGRAM = """\
+mov cx, 3
+loop:
+add [200], cx
+dec cx
+
+jnz loop
+mov ax, [200]
+halt
+"""
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    path = tmp_path / "program.asm"
+    path.write_text(PROGRAM)
+    return path
+
+
+class Test_main:
+    def test_breaks(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        """Breakpoints by line and watchpoints should be reported until the program halts"""
+        assert main([str(source), "-b", "4", "-w", "200:c"]) == 0
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[:2] == [
+            "change of [200] at line 3 (address 2): 0 -> 3",
+            "break at line 4 (address 4): AX=0 BX=0 CX=3 DX=0",
+        ]
+        assert len(lines) == 8
+        assert lines[-2].startswith("halted: AX=6 ")
+        assert lines[-1] == "12 instructions, 36 cycles"
+
+    def test_json(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        """A line without instructions should break at the next line"""
+        assert main([str(source), "-b", "5", "--json"]) == 0
+
+        report = json.loads(capsys.readouterr().out)
+        assert report["breaks"] == [{"kind": "breakpoint", "pc": 5, "line": 6}] * 3
+        assert report["registers"]["AX"] == 6
+        assert (report["instructions"], report["cycles"]) == (12, 36)
+
+    def test_costs(self, source: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+        """The cycles should follow the cost model given"""
+        costs = tmp_path / "costs.json"
+        costs.write_text('{"fetch": 2, "store": 3}')
+        assert main([str(source), "--costs", str(costs)]) == 0
+        assert capsys.readouterr().out.splitlines()[-1] == "12 instructions, 54 cycles"
+
+        costs.write_text('{"cache": 2}')
+        assert main([str(source), "--costs", str(costs)]) == 1
+        assert "invalid cost model" in capsys.readouterr().err
+
+        costs.write_text('{"fetch": -1}')
+        assert main([str(source), "--costs", str(costs)]) == 1
+        assert "'fetch' must be an integer from 0 to 65535, not -1" in capsys.readouterr().err
+
+    def test_cache(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        """The cache statistics should be reported, the misses taking cycles"""
+        assert main([str(source), "--cache", "size=16,line=4,replacement=fifo"]) == 0
+        assert capsys.readouterr().out.splitlines()[-2:] == [
+            "12 instructions, 86 cycles",
+            "cache: 82.4% of fetches and 85.7% of data accesses hit, 1 lines written back",
+        ]
+
+        assert main([str(source), "--cache", "size=16,ways=0,write=through", "--json"]) == 0
+        report = json.loads(capsys.readouterr().out)["cache"]
+        assert (report["ways"], report["write_policy"]) == (4, "write-through")
+        assert (report["read_hits"], report["read_misses"], report["writebacks"]) == (3, 1, 0)
+
+        assert main([str(source), "--cache", "size=24"]) == 1
+        assert "powers of two" in capsys.readouterr().err
+
+    def test_predictor(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        """The accuracy of the predictor should be reported by line"""
+        assert main([str(source), "--predictor", "2bit"]) == 0
+        assert capsys.readouterr().out.splitlines()[-2:] == [
+            "2bit: 33.3% of 3 branches predicted",
+            "  line 6: 33.3% of 3",
+        ]
+
+        assert main([str(source), "--predictor", "taken", "--json"]) == 0
+        report = json.loads(capsys.readouterr().out)["predictor"]
+        assert report["addresses"] == [
+            {"pc": 5, "branches": 3, "correct": 2, "accuracy": 2 / 3}
+        ]
+
+        assert main([str(source), "--predictor", "2bit:3"]) == 1
+        assert "power of two" in capsys.readouterr().err
+
+    def test_pipeline(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        assert main([str(source), "--pipeline"]) == 0
+        assert capsys.readouterr().out.splitlines()[-1] == (
+            "pipeline: 30 cycles, CPI 2.50, 1 data stalls, 9 structural stalls, 4 bubbles"
+        )
+
+        assert main([str(source), "--pipeline", "--json"]) == 0
+        report = json.loads(capsys.readouterr().out)["pipeline"]
+        assert report["instructions"] == 12
+        assert report["bubbles"] == 4
+
+    def test_profile(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        assert main([str(source), "--profile"]) == 0
+        assert capsys.readouterr().out.splitlines()[-2:] == [
+            "Hot loops:",
+            "  lines 3-6: 2 iterations, 9 instructions (75.0%)",
+        ]
+
+        assert main([str(source), "--profile", "--json"]) == 0
+        report = json.loads(capsys.readouterr().out)["loops"]
+        assert [(loop["jump"], loop["header"]) for loop in report] == [(5, 2)]
+
+    def test_coverage(self, source: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+        """Coverage should be added to the file of previous runs"""
+        coverage, lcov = tmp_path / "coverage.json", tmp_path / "program.info"
+        args = [str(source), "--coverage", str(coverage), "--lcov", str(lcov)]
+        assert main(args) == 0
+        assert capsys.readouterr().out.splitlines()[-1] == (
+            f"{source}: 6/6 lines (100.0%), 2/2 branches (100.0%)"
+        )
+        assert "DA:6,1\n" in lcov.read_text()
+
+        source.write_text(PROGRAM.replace("mov cx, 3", "mov cx, 1"))
+        assert main([*args, "--json"]) == 0
+        report = json.loads(capsys.readouterr().out)["coverage"]
+        assert report[3]["branches_covered"] == 2
+
+        coverage.write_text("{}")
+        assert main(args) == 1
+        assert "invalid coverage" in capsys.readouterr().err
+
+    def test_trace(self, source: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+        """The trace should be written and closed, also on faults"""
+        trace = tmp_path / "trace.json"
+        assert main([str(source), "--trace", str(trace), "--trace-slices", "loop"]) == 0
+        slices = [e for e in json.loads(trace.read_text()) if e["ph"] == "X"]
+        assert [e["name"] for e in slices] == ["loop 2 (lines 3-6)"] * 3
+
+        source.write_text("mov ax, 5\njmp 254\n")
+        assert main([str(source), "--trace", str(trace)]) == 1
+        assert [e["name"] for e in json.loads(trace.read_text()) if e["ph"] == "X"] == [
+            "MOV",
+            "JMP",
+            "NOP",
+            "NOP",
+        ]
+
+    def test_condition(self, source: Path, capsys: pytest.CaptureFixture[str]):
+        assert main([str(source), "-b", "4 if [200] == 5"]) == 0
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == "break at line 4 (address 4): AX=0 BX=0 CX=2 DX=0"
+        assert len(lines) == 3
+
+    def test_errors(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+        path = tmp_path / "bad.asm"
+        path.write_text("mov ax, ex\n")
+        assert main([str(path)]) == 1
+        assert "bad.asm:1: Error: bad register name 'ex'" in capsys.readouterr().err
+
+        path.write_text("spin: jmp spin\n")
+        assert main([str(path)]) == 1
+        assert "Infinite loop detected" in capsys.readouterr().err
+
+        assert main([str(tmp_path / "missing.asm")]) == 1
+        assert "missing.asm: No such file or directory" in capsys.readouterr().err
+
+    def test_fault(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+        """A fault should be reported with the last instructions run"""
+        path = tmp_path / "fault.asm"
+        path.write_text("mov ax, 5\njmp 254\n")
+        assert main([str(path)]) == 1
+
+        err = capsys.readouterr().err.splitlines()
+        assert err[0].endswith("fault.asm: PC register greater than address space")
+        assert err[1:] == [
+            "Last instructions:",
+            "      0  0x1280  line 1      AX: 0 -> 5",
+            "      2  0x5AFE  line 2",
+            "    254  0x0000  no line",
+            "    255  0x0000  no line",
+        ]
+
+        assert main([str(path), "--json"]) == 1
+        report = json.loads(capsys.readouterr().out)
+        assert report["error"] == "PC register greater than address space"
+        assert report["trace"][0] == {
+            "pc": 0,
+            "word": 0x1280,
+            "lineno": 1,
+            "deltas": {"AX": [0, 5]},
+        }
+
+
+class Test_parse_watch:
+    def test_kinds(self):
+        assert parse_watch("0x10:rc") == (16, WATCH_READ | WATCH_CHANGE)
+
+    def test_cache(self):
+        assert parse_cache("size=0x20,line=8,ways=2,write=through,replacement=fifo") == {
+            "size": 32,
+            "line_size": 8,
+            "ways": 2,
+            "write_policy": "write-through",
+            "replacement": "fifo",
+        }
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_cache("assoc=2")
+
+    def test_break(self):
+        assert parse_break("12") == (12, None)
+        assert parse_break("0x10 if AX == 7") == (16, "AX == 7")
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from austro.asm.asm_lexer import get_lexer
+from austro.asm.assembler import assemble
+from austro.asm.scanner import LexerException, Scanner
+
+
+SOURCES = [
+    "",
+    "mov ax, 0xffff\nhalt",
+    "  loop :\n\tadd [ 0b101 ], ax  # comment\r\n jnz loop\n",
+    "mov ax, -12\nshl [017], 0o17\nnot [ 0x1F ]\n",
+    "label:mov ax,bx#no space\n.dot.label: halt",
+    "# only a comment",
+    "jmp\nmov\n\n\n   \t\n  ",
+    "MOV Ax, [10]\nHaLt\nfoo bar, baz",
+]
+
+# Pieces to build random sources, including invalid ones
+PIECES = [
+    "mov", "add", "jmp", "HALT", "ax", "bl", "lbl", "x:", " :", ",", " ", "\t", "\n", "\r\n",
+    "[", "]", "[ 3 ]", "[0x1f]", "10", "-5", "0b11", "017", "0o7", "0x", "#c", "@", "$", "\r",
+]  # fmt: skip
+
+
+def scan(lexer, source: str) -> list[tuple] | str:
+    lexer.input(source)
+    try:
+        return [(t.type, t.value, t.lineno, t.lexpos) for t in lexer]
+    except LexerException as e:
+        return f"{e.message} ({e.lineno})"
+    except ValueError as e:
+        return f"ValueError: {e}"
+
+
+class TestScanner:
+    @pytest.mark.parametrize("source", SOURCES)
+    def test_same_tokens_as_ply(self, source: str):
+        """Scanner should give the same tokens of the PLY lexer"""
+        assert scan(Scanner(), source) == scan(get_lexer(), source)
+
+    def test_same_tokens_as_ply_random(self):
+        """Scanner should give the same tokens or errors of the PLY lexer for any input"""
+        rng = random.Random(42)
+        for _ in range(500):
+            source = "".join(rng.choices(PIECES, k=rng.randint(1, 20)))
+            assert scan(Scanner(), source) == scan(get_lexer(), source), repr(source)
+
+    def test_error(self):
+        scanner = Scanner()
+        scanner.input("nop\nmov ax, @")
+
+        with pytest.raises(LexerException, match="Illegal character '@' at line 2") as e_info:
+            list(scanner)
+        assert e_info.value.lineno == 2
+
+    def test_lineno_kept_between_inputs(self):
+        scanner = Scanner()
+        scanner.input("nop\n")
+        assert [t.lineno for t in scanner] == [1]
+        scanner.input("halt\n")
+        assert scanner.token().lineno == 2  # type: ignore[union-attr]
+        assert scanner.token() is None
+
+
+class Test_assemble__lexer:
+    CODE = """
+        mov cx, 3
+        loop:
+        add [200], cx   # sum
+        dec cx
+        jnz loop
+        halt
+    """
+
+    def test_same_result(self):
+        """#assemble should give the same result with both lexers"""
+        assert assemble(self.CODE, lexer="regex") == assemble(self.CODE, lexer="ply")
+
+    def test_error_unknown_lexer(self):
+        with pytest.raises(ValueError, match="Unknown lexer 'lex'"):
+            assemble(self.CODE, lexer="lex")
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from austro.asm.assembler import assemble
+from austro.simulator.cpu import CPU
+from austro.simulator.shadow import ShadowMemory, UninitializedRead
+
+
+class TestShadowMemory:
+    def test_uninitialized_reads(self):
+        """Memory operands never written should be recorded with PC and line"""
+        cpu = CPU()
+        shadow = ShadowMemory(cpu)
+        cpu.set_memory_block(
+            assemble(
+                """
+                mov ax, [200]
+                mov [201], ax
+                add ax, [201]
+                add [202], ax
+                shl [203], 1
+                inc [204]
+                jz [205]
+                mov bx, [1]
+                halt
+                """
+            )["words"]
+        )
+        cpu.start()
+
+        assert shadow.reads == [
+            UninitializedRead(pc=0, address=200, lineno=2),
+            UninitializedRead(pc=6, address=202, lineno=5),
+            UninitializedRead(pc=8, address=203, lineno=6),
+            UninitializedRead(pc=10, address=204, lineno=7),
+            UninitializedRead(pc=11, address=205, lineno=8),
+        ]
+        assert shadow.is_initialized(1)  # loaded with the program
+        assert shadow.is_initialized(201)  # written at runtime
+        assert not shadow.is_initialized(200)
+
+    def test_read_recorded_once(self):
+        cpu = CPU()
+        shadow = ShadowMemory(cpu)
+        cpu.set_memory_block(
+            assemble(
+                """
+                mov cx, 3
+                loop:
+                add ax, [100]
+                dec cx
+                jnz loop
+                halt
+                """
+            )["words"]
+        )
+        cpu.start()
+
+        assert shadow.reads == [UninitializedRead(pc=2, address=100, lineno=4)]
+
+    def test_reset_to_image(self):
+        """Each run from the image should start from the addresses initialized by the load"""
+        cpu = CPU()
+        shadow = ShadowMemory(cpu)
+        cpu.set_memory_block(
+            assemble(
+                """
+                mov ax, [200]
+                mov bx, 5
+                mov [200], bx
+                mov cx, [1]
+                halt
+                """
+            )["words"]
+        )
+        cpu.start()
+        first = list(shadow.reads)
+
+        cpu.reset(to_image=True)
+        assert not shadow.is_initialized(200)
+        assert shadow.is_initialized(1)
+        cpu.start()
+
+        assert first == [UninitializedRead(pc=0, address=200, lineno=2)]
+        assert shadow.reads == first
+
+    def test_mark_and_reset(self):
+        cpu = CPU()
+        shadow = ShadowMemory(cpu)
+        shadow.mark(100, 10)
+        assert shadow.is_initialized(100)
+        assert shadow.is_initialized(109)
+        assert not shadow.is_initialized(110)
+
+        cpu.reset()
+        assert not shadow.is_initialized(100)
+
+    def test_detach(self):
+        cpu = CPU()
+        shadow = ShadowMemory(cpu)
+        shadow.detach()
+        cpu.set_memory_block(assemble("mov ax, [200]\nhalt")["words"])
+        cpu.start()
+
+        assert cpu.shadow is None
+        assert shadow.reads == []
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from austro.asm.assembler import assemble
+from austro.asm.sourcemap import SourceMap
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+PROGRAM = """
+    mov cx, 3
+loop:
+    dec cx
+
+    jnz loop
+    halt
+"""
+
+
+class TestSourceMap:
+    def test_line_of(self):
+        """Every word of an instruction should map to the line of the instruction"""
+        sourcemap = assemble(PROGRAM)["sourcemap"]
+
+        assert [sourcemap.line_of(address) for address in range(5)] == [2, 2, 4, 6, 7]
+        assert sourcemap.line_of(5) == 0
+        assert sourcemap.line_of(-1) == 0
+
+    def test_ranges(self):
+        """A line should give the address ranges of its instructions"""
+        sourcemap = assemble(PROGRAM)["sourcemap"]
+
+        assert sourcemap.ranges(2) == [range(0, 2)]
+        assert sourcemap.ranges(4) == [range(2, 3)]
+        assert sourcemap.ranges(3) == []
+        assert sourcemap.addresses(2) == [0]
+
+    def test_next_line(self):
+        """Lines without instructions should move to the next line having them"""
+        sourcemap = assemble(PROGRAM)["sourcemap"]
+
+        assert sourcemap.next_line(1) == 2
+        assert sourcemap.next_line(3) == 4
+        assert sourcemap.next_line(5) == 6
+        assert sourcemap.next_line(7) == 7
+        assert sourcemap.next_line(8) == 0
+
+    def test_labels(self):
+        sourcemap = assemble(PROGRAM)["sourcemap"]
+
+        assert sourcemap.labels == {"loop": 2}
+        assert sourcemap.label_at(2) == "loop"
+        assert sourcemap.label_at(0) is None
+
+    def test_save_and_load(self, tmp_path: Path):
+        sourcemap = assemble(PROGRAM)["sourcemap"]
+        sourcemap.save(tmp_path / "program.map")
+
+        assert SourceMap.load(tmp_path / "program.map") == sourcemap
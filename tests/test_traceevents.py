@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from austro.simulator.cpu import CPU, CPUException
+from austro.simulator.traceevents import TraceExporter
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tests.conftest import Run
+
+
+NESTED_LOOPS = """
+    mov cx, 3
+outer:
+    mov bx, 2
+inner:
+    dec bx
+    jnz inner
+    dec cx
+    jnz outer
+    halt
+"""
+
+
+def load(exporter: TraceExporter, path: Path) -> list[dict]:
+    exporter.close()
+    return json.loads(path.read_text())
+
+
+def slices(events: list[dict]) -> list[tuple[str, int, int]]:
+    return [(e["name"], e["ts"], e["dur"]) for e in events if e["ph"] == "X"]
+
+
+class TestTraceExporter:
+    def test_instructions(self, tmp_path: Path, run: Run):
+        """Each instruction should last its cycles, one after the other"""
+        path = tmp_path / "trace.json"
+        exporter = run(NESTED_LOOPS, TraceExporter, path)
+        cpu, events = exporter.cpu, load(exporter, path)
+        timeline = slices(events)
+
+        assert timeline[:4] == [("MOV", 0, 3), ("MOV", 3, 3), ("DEC", 6, 2), ("JNZ", 8, 2)]
+        assert timeline[-1] == ("HALT", 48, 2)
+        assert len(timeline) == cpu.instructions
+        assert sum(dur for _, _, dur in timeline) == cpu.cycles == 50
+        assert all(
+            ts + dur == after for (_, ts, dur), (_, after, _) in zip(timeline, timeline[1:])
+        )
+        dec = next(e for e in events if e["name"] == "DEC")
+        assert dec["args"] == {"pc": 4, "line": 6}
+
+    def test_blocks(self, tmp_path: Path, run: Run):
+        """Instructions should be added up by block, a block jumping to itself starting again"""
+        path = tmp_path / "trace.json"
+        exporter = run(NESTED_LOOPS, TraceExporter, path, "block")
+        cpu, events = exporter.cpu, load(exporter, path)
+        timeline = slices(events)
+
+        assert timeline[:5] == [
+            ("block 0 (line 2)", 0, 3),
+            ("block 2 (line 4)", 3, 3),
+            ("block 4 (lines 6-7)", 6, 4),
+            ("block 4 (lines 6-7)", 10, 4),
+            ("block 6 (lines 8-9)", 14, 4),
+        ]
+        assert sum(dur for _, _, dur in timeline) == cpu.cycles
+
+    def test_loops(self, tmp_path: Path, run: Run):
+        """Iterations of the inner loop should nest in the iterations of the outer one"""
+        path = tmp_path / "trace.json"
+        events = load(run(NESTED_LOOPS, TraceExporter, path, "loop"), path)
+
+        assert slices(events)[:3] == [
+            ("loop 4 (lines 6-7)", 6, 4),
+            ("loop 4 (lines 6-7)", 10, 4),
+            ("loop 2 (lines 4-9)", 3, 15),
+        ]
+        assert len(slices(events)) == 9
+
+    def test_counters(self, tmp_path: Path, run: Run):
+        """Registers and flags should be written when changed, at the end of the instruction"""
+        path = tmp_path / "trace.json"
+        events = load(run(NESTED_LOOPS, TraceExporter, path, "block"), path)
+        registers = [(e["ts"], e["args"]) for e in events if e["name"] == "registers"]
+        flags = [(e["ts"], e["args"]["Z"]) for e in events if e["name"] == "flags"]
+
+        assert [(ts, args["BX"], args["CX"]) for ts, args in registers[:4]] == [
+            (0, 0, 0),
+            (3, 0, 3),
+            (6, 2, 3),
+            (8, 1, 3),
+        ]
+        assert flags[:3] == [(0, 0), (12, 1), (16, 0)]
+
+    def test_same_with_events(self, tmp_path: Path, run: Run):
+        """Instructions fused with a jump should be traced the same"""
+        fused, stepped = tmp_path / "fused.json", tmp_path / "stepped.json"
+        fused_events = load(run(NESTED_LOOPS, TraceExporter, fused), fused)
+        stepped_events = load(run(NESTED_LOOPS, TraceExporter, stepped, stepping=True), stepped)
+
+        assert fused_events == stepped_events
+
+    def test_invalid_slices(self, tmp_path: Path):
+        with pytest.raises(CPUException):
+            TraceExporter(CPU(), tmp_path / "trace.json", "function")